@@ -1,13 +1,158 @@
 # app.py
+import collections
+import hashlib
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 
 # --- Importaciones de Módulos ---
 from src.features import procesar_datos
-from src.model import entrenar_y_predecir
+from src.model import calcular_embeddings, agregar_rasgos_coordinacion, ajustar_modelo, puntuar, aplicar_umbral, precargar_modelo_beto, FEATURES_CONDUCTA, BACKENDS
+from src.instrumentacion import RegistroEtapas, medir, iniciar_perfil, volcar_perfil
+from src.sintetico import generar_dataset
+from src.textos import TextosUsuarios
+
+# ================= ETAPAS CACHEADAS DEL PIPELINE =================
+# Todas las etapas se indexan por la huella (hash de contenido) de los datos de entrada.
+# Los argumentos con "_" no los hashea Streamlit: la huella ya identifica los datos,
+# así un cambio de umbral o de usuario seleccionado no repite ningún cálculo pesado.
+
+# Cuántas veces se ejecutó de verdad cada etapa en esta pasada del script (no desde caché)
+EJECUCIONES = collections.Counter()
+
+def ejecutar_etapa(nombre, etapa, *args, filas=None):
+    """Llama a una etapa cacheada midiendo su tiempo y si Streamlit la sirvió desde caché."""
+    antes = EJECUCIONES[nombre]
+    with medir(nombre, filas=filas) as medida:
+        resultado = etapa(*args)
+    medida['cache_app'] = 'calculada' if EJECUCIONES[nombre] > antes else 'desde caché'
+    return resultado
+
+def huella_dataframe(df):
+    """Hash de contenido de un DataFrame (para el dataset de ejemplo)."""
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+
+@st.cache_resource
+def iniciar_precarga(backend):
+    """Una sola precarga del modelo por proceso (y backend), lanzada en cuanto arranca la app."""
+    return precargar_modelo_beto(backend)
+
+@st.cache_data(show_spinner=False)
+def leer_csv(huella, _contenido):
+    return pd.read_csv(io.BytesIO(_contenido))
+
+@st.cache_data(show_spinner='🎲 Generando dataset sintético...')
+def dataset_sintetico(n_usuarios):
+    return generar_dataset(n_usuarios)
+
+@st.cache_data(show_spinner='⚙️ Procesando textos y calculando métricas de comportamiento...')
+def etapa_features(huella, _df_raw):
+    EJECUCIONES['features'] += 1
+    df_users, df_processed_posts = procesar_datos(_df_raw)
+    # Validación de nulos (Crucial para no romper sklearn)
+    return df_users.fillna(0), df_processed_posts
+
+@st.cache_data(show_spinner='🧠 Generando Embeddings con BETO (esto puede tardar)...')
+def etapa_embeddings(huella, backend, _textos):
+    EJECUCIONES['embeddings'] += 1
+    return calcular_embeddings(_textos, backend)
+
+@st.cache_data(show_spinner='🕸️ Buscando usuarios coordinados (grafo de vecinos semánticos)...')
+def etapa_coordinacion(huella, backend, _df_users, _X_embeddings):
+    EJECUCIONES['coordinacion'] += 1
+    return agregar_rasgos_coordinacion(_df_users, _X_embeddings)
+
+@st.cache_resource(show_spinner='🌲 Entrenando Isolation Forest...')
+def etapa_modelo(huella, backend, _df_users, _X_embeddings):
+    EJECUCIONES['modelo'] += 1
+    return ajustar_modelo(_df_users, _X_embeddings, backend)
+
+@st.cache_data(show_spinner=False)
+def etapa_scores(huella, backend, _df_users, _X_embeddings, _modelo):
+    EJECUCIONES['scores'] += 1
+    return puntuar(_df_users.copy(), _X_embeddings, _modelo)
+
+# ================= PRESENTACIÓN A ESCALA =================
+# Con 100k+ usuarios el coste está en el navegador: al cliente sólo se envía una página de
+# cada tabla, un único gráfico con los promedios ya agregados y, en las secciones
+# desplegables, nada hasta que el usuario las abre.
+FILAS_POR_PAGINA = 50
+MAX_SUGERENCIAS = 50 # Usuarios ofrecidos en el buscador de la auditoría
+
+def mostrar_paginado(df, clave, formatear=None, filas_por_pagina=FILAS_POR_PAGINA, **kwargs_dataframe):
+    """Muestra sólo la página elegida de df; `formatear` se aplica a esa página, no a la tabla entera."""
+    n_paginas = max(1, -(-len(df) // filas_por_pagina))
+    col_pagina, col_info = st.columns([1, 4])
+    pagina = col_pagina.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1, key=f"pagina_{clave}")
+    inicio = (int(pagina) - 1) * filas_por_pagina
+    fin = min(inicio + filas_por_pagina, len(df))
+    col_info.caption(f"Filas {min(inicio + 1, fin):,}–{fin:,} de {len(df):,} · {n_paginas:,} páginas")
+    pagina_df = df.iloc[inicio:fin]
+    st.dataframe(formatear(pagina_df.copy()) if formatear else pagina_df, **kwargs_dataframe)
+
+@st.cache_data(show_spinner=False)
+def indice_usuarios(huella, _user_ids):
+    """user_id como texto, ordenados, y su posición en df_users: búsqueda por prefijo O(log n)."""
+    ids = np.asarray(_user_ids).astype(str)
+    orden = np.argsort(ids, kind='stable')
+    return ids, ids[orden], orden
+
+def buscar_usuarios(indice, consulta, limite=MAX_SUGERENCIAS):
+    """Posiciones (en df_users) de los user_id que empiezan por `consulta`."""
+    _, ids_ordenados, orden = indice
+    desde = np.searchsorted(ids_ordenados, consulta, side='left')
+    hasta = np.searchsorted(ids_ordenados, consulta + '\U0010ffff', side='left')
+    return orden[desde:min(hasta, desde + limite)]
+
+def resumen_por_clase(df_users, metricas):
+    """Media de cada métrica por clase: filas = métricas, columnas = Usuario Normal / Bot Detectado."""
+    resumen = df_users.groupby('es_bot')[metricas].mean().T
+    return resumen.reindex(columns=[False, True]).fillna(0).set_axis(['Usuario Normal', 'Bot Detectado'], axis=1)
+
+def figura_comparacion(resumen, nombres):
+    """Una sola figura con un subgráfico de barras por métrica (escala propia en cada uno)."""
+    import plotly.graph_objects as go # Importación diferida: sólo hace falta al mostrar resultados
+    from plotly.subplots import make_subplots
+    n_filas = -(-len(resumen) // 2)
+    fig = make_subplots(rows=n_filas, cols=2, subplot_titles=[f'<b>{nombres.get(m, m)}</b>' for m in resumen.index],
+                        vertical_spacing=min(0.06, 1 / max(n_filas - 1, 1)))
+    colores = {'Usuario Normal': 'lightseagreen', 'Bot Detectado': 'salmon'}
+    for i, metrica in enumerate(resumen.index):
+        for clase, color in colores.items():
+            fig.add_trace(go.Bar(x=[clase], y=[resumen.at[metrica, clase]], name=clase, marker_color=color,
+                                 legendgroup=clase, showlegend=i == 0),
+                          row=i // 2 + 1, col=i % 2 + 1)
+    fig.update_xaxes(showticklabels=False)
+    fig.update_layout(height=220 * n_filas, legend_title_text='Tipo de Usuario', margin=dict(t=60, b=20),
+                      legend=dict(orientation='h', y=1.02, yanchor='bottom'))
+    return fig
+
+@st.cache_data(show_spinner=False)
+def csv_resultados(huella, backend, umbral, _df_export):
+    return _df_export.to_csv(index=False).encode('utf-8')
+
+# ================= MONITOREO EN VIVO =================
+# vigilar_comentarios.py puntúa los comentarios a medida que llegan y reescribe una
+# instantánea JSON del Top Sospechosos; la app sólo la lee (no mantiene estado propio).
+BYTES_COLA_ALERTAS = 64 * 1024
+
+def leer_instantanea(ruta):
+    import json
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+def ultimas_alertas(ruta, n=20):
+    """Las n alertas más recientes leyendo sólo el final del log (que sólo crece)."""
+    import json
+    import os
+    if not os.path.exists(ruta):
+        return pd.DataFrame()
+    with open(ruta, 'rb') as f:
+        inicio = max(0, os.path.getsize(ruta) - BYTES_COLA_ALERTAS)
+        f.seek(inicio)
+        lineas = f.read().splitlines()[1 if inicio else 0:] # La primera puede estar cortada
+    return pd.DataFrame([json.loads(l) for l in lineas[-n:] if l.strip()][::-1])
 
 # ================= CONFIGURACIÓN DE PÁGINA =================
 st.set_page_config(
@@ -33,7 +178,16 @@ st.markdown('<div class="sub-header">Análisis semántico y conductual para dete
 
 # --- Sidebar ---
 st.sidebar.header("📂 Configuración")
-opcion = st.sidebar.radio("Datos de entrada:", ["Dataset de Ejemplo", "Subir CSV"])
+opcion = st.sidebar.radio("Datos de entrada:", ["Dataset de Ejemplo", "Dataset sintético", "Subir CSV", "Monitoreo en vivo"])
+
+backend = st.sidebar.selectbox(
+    "Motor de Embeddings",
+    options=list(BACKENDS),
+    format_func=lambda b: f"{b}: {BACKENDS[b][0]}",
+    help="Las opciones ligeras son más rápidas en CPU a costa de algo de calidad semántica."
+)
+# El modelo empieza a cargar en segundo plano mientras el usuario elige/sube los datos
+iniciar_precarga(backend)
 
 # Slider para el umbral de riesgo (Rango ajustado de 0.0 a 1.0)
 umbral_risk_score = st.sidebar.slider(
@@ -46,6 +200,14 @@ umbral_risk_score = st.sidebar.slider(
 )
 st.sidebar.info(f"Un usuario se clasifica como Bot si su Risk Score es > {umbral_risk_score*100:.0f}%")
 
+# Instrumentación de esta pasada del script (panel "Rendimiento por etapa" al final)
+perfilar_ejecucion = st.sidebar.checkbox(
+    "🔬 Perfilar esta ejecución (cProfile)",
+    help="Genera un perfil descargable (.prof) de esta pasada; abrir con snakeviz o pstats."
+)
+registro_etapas = RegistroEtapas(backend=backend).fijar_como_actual()
+perfil = iniciar_perfil() if perfilar_ejecucion else None
+
 df_raw = None
 
 if opcion == "Dataset de Ejemplo":
@@ -63,11 +225,63 @@ if opcion == "Dataset de Ejemplo":
         'replies': [0]*5 + [2,1,4] + [0]*10 + [1,0,2,3]
     }
     df_raw = pd.DataFrame(data)
+    huella = huella_dataframe(df_raw)
     st.info("ℹ️ Usando dataset de demostración generado.")
+elif opcion == "Dataset sintético":
+    # Carga reproducible bots/humanos a escala (src/sintetico.py); los bots son los user_id "bot_*"
+    n_sinteticos = st.sidebar.select_slider("Usuarios sintéticos", options=[100, 1_000, 10_000, 50_000], value=1_000)
+    df_raw = dataset_sintetico(n_sinteticos)
+    huella = f"sintetico-{n_sinteticos}"
+    st.info(f"ℹ️ Usando {len(df_raw):,} posts sintéticos de {n_sinteticos:,} usuarios (10% bots: user_id \"bot_*\").")
+elif opcion == "Monitoreo en vivo":
+    # Lee lo que publica vigilar_comentarios.py (el umbral es el del monitor, no el del slider)
+    ruta_top = st.sidebar.text_input("Instantánea del monitor", value="top_sospechosos.json")
+    ruta_alertas = st.sidebar.text_input("Log de alertas", value="alertas.jsonl")
+    refresco = st.sidebar.number_input("Actualizar cada (s)", min_value=0, max_value=300, value=5,
+                                       help="0 = sólo al pulsar el botón")
+    st.header("📡 Top Sospechosos en vivo")
+
+    # Sólo este fragmento se vuelve a ejecutar cada `refresco` segundos: el hilo del script
+    # no queda bloqueado esperando y el resto de la página no se recalcula.
+    @st.fragment(run_every=refresco or None)
+    def panel_en_vivo():
+        try:
+            instantanea = leer_instantanea(ruta_top)
+        except (OSError, ValueError):
+            st.warning("Todavía no hay instantánea. Lanza: python vigilar_comentarios.py comentarios.jsonl --modelo modelo.joblib")
+            return
+        st.caption(f"Actualizado: {instantanea['actualizado']} · umbral del monitor {instantanea['umbral']:.2f}")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Comentarios procesados", f"{instantanea['comentarios']:,}")
+        col2.metric("Usuarios en estado", f"{instantanea['usuarios_en_estado']:,}",
+                    help=f"{instantanea['desalojados']:,} desalojados por LRU/inactividad")
+        col3.metric("Alertas", f"{instantanea['alertas']:,}")
+        col4.metric("Latencia p50 / p99", f"{instantanea['latencia_p50_ms'] or 0:.0f} / {instantanea['latencia_p99_ms'] or 0:.0f} ms")
+        st.dataframe(
+            pd.DataFrame(instantanea['top']),
+            column_config={
+                "risk_score": st.column_config.ProgressColumn("Risk Score", format="%.2f", min_value=0, max_value=1),
+                "es_bot": st.column_config.CheckboxColumn("¿Sobre el umbral?"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        st.subheader("🚨 Últimas alertas")
+        alertas = ultimas_alertas(ruta_alertas)
+        if alertas.empty:
+            st.write("Sin alertas todavía.")
+        else:
+            st.dataframe(alertas, hide_index=True, use_container_width=True)
+        st.button("🔄 Actualizar")
+
+    panel_en_vivo()
+    st.stop()
 else:
     file = st.sidebar.file_uploader("Sube tu CSV (cols: user_id, text, timestamp, likes, replies)", type="csv")
     if file:
-        df_raw = pd.read_csv(file)
+        contenido = file.getvalue()
+        huella = hashlib.sha256(contenido).hexdigest()
+        df_raw = leer_csv(huella, contenido)
     else:
         st.warning("Sube un archivo para continuar.")
         st.stop()
@@ -75,29 +289,29 @@ else:
 # ================= 5. DETALLE DEL PIPELINE DE PROCESAMIENTO (DIDÁCTICO) =================
 if df_raw is not None:
     # 1. LLAMADA A INGENIERÍA DE RASGOS (features.py)
-    with st.spinner('⚙️ Procesando textos y calculando métricas de comportamiento...'):
-        df_users, df_processed_posts = procesar_datos(df_raw)
-        
-        # Validación de nulos (Crucial para no romper sklearn)
-        df_users = df_users.fillna(0)
+    df_users, df_processed_posts = ejecutar_etapa('features', etapa_features, huella, df_raw, filas=len(df_raw))
+    # Textos por usuario como vista CSR sobre df_processed_posts (sin copiar ni listas por fila)
+    textos_usuarios = TextosUsuarios.desde_posts(df_users, df_processed_posts)
 
     st.header("Detalle del Pipeline de Procesamiento")
     st.markdown("Esta sección muestra los datos antes de la detección de anomalías.")
 
+    # Secciones desplegables con st.toggle: a diferencia de st.expander, su contenido
+    # no se calcula ni se envía al navegador mientras están cerradas.
     # --- Tabla 1: Datos Crudos ---
-    with st.expander("▶️ 4.1. Visualización de Datos Crudos (Input)"):
+    if st.toggle("▶️ 4.1. Visualización de Datos Crudos (Input)", key='ver_crudos'):
         st.subheader("Datos de Entrada Originales")
-        st.dataframe(df_raw, use_container_width=True)
+        mostrar_paginado(df_raw, 'crudos', use_container_width=True)
 
     # --- Tabla 2: Métrica de Post Limpio (Detalle por fila) ---
-    with st.expander("▶️ 4.2. Preprocesamiento (Textos Limpios)"):
+    if st.toggle("▶️ 4.2. Preprocesamiento (Textos Limpios)", key='ver_limpios'):
         st.subheader("Texto Después de la Limpieza")
         st.markdown("URLs, menciones, hashtags y emojis han sido eliminados.")
-        st.dataframe(df_processed_posts, use_container_width=True, hide_index=True)
+        mostrar_paginado(df_processed_posts, 'limpios', use_container_width=True, hide_index=True)
 
 
     # --- Tabla 3: Ingeniería de Rasgos (Agrupado por usuario) ---
-    with st.expander("▶️ 4.3. Ingeniería de Rasgos (Métricas Agrupadas por Usuario)"):
+    if st.toggle("▶️ 4.3. Ingeniería de Rasgos (Métricas Agrupadas por Usuario)", key='ver_rasgos'):
         st.subheader("Variables de Comportamiento y Léxicas")
         st.markdown("Estas variables se usan para entrenar el modelo de detección de anomalías, junto con los *embeddings*.")
         
@@ -106,32 +320,39 @@ if df_raw is not None:
             'user_id', 'num_posts', 
             'intervalo_medio', 
             'frecuencia_diaria', 'nocturnidad', 
+            'max_posts_1min', 'max_posts_10min', 'max_posts_60min',
+            'cv_intervalos', 'entropia_intervalos', 'entropia_horas',
             'avg_likes', 'avg_replies', 
-            'ttr', 'tasa_repeticion', 'longitud_promedio'
+            'ttr', 'tasa_repeticion', 'longitud_promedio',
+            'posts_campana', 'cuentas_campana'
         ]
         
-        df_metrics_display = df_users[cols_to_display].copy()
-        
-        # IMPORTANTE: Eliminamos el formateo a STRING de nocturnidad y tasa_repeticion
-        # para que Streamlit pueda usar column_config.NumberColumn
-        df_metrics_display['intervalo_medio'] = df_metrics_display['intervalo_medio'].map(lambda x: f'{x:.2f}')
-        df_metrics_display['frecuencia_diaria'] = df_metrics_display['frecuencia_diaria'].map(lambda x: f'{x:.2f}')
-        df_metrics_display['nocturnidad'] = df_metrics_display['nocturnidad'].map(lambda x: f'{x:.2%}')
-        df_metrics_display['tasa_repeticion'] = df_metrics_display['tasa_repeticion'].map(lambda x: f'{x:.2%}')
-        # Los demás valores (nocturnidad, tasa_repeticion) se dejan como float (0 a 1)
-        
-        st.dataframe(
-            df_metrics_display, 
+        # Formato con column_config (numérico, sin convertir a texto); los porcentajes se
+        # escalan sólo en la página visible
+        def porcentajes(pagina):
+            pagina[['nocturnidad', 'tasa_repeticion']] *= 100
+            return pagina
+
+        mostrar_paginado(
+            df_users[cols_to_display], 'rasgos', formatear=porcentajes,
             use_container_width=True,
             column_config={
                 "intervalo_medio": st.column_config.NumberColumn("Intervalo Medio (min)", format="%.2f min"),
                 "frecuencia_diaria": st.column_config.NumberColumn("Posts/Día (Aprox)", format="%.2f"),
-                "nocturnidad": "Actividad Nocturna",
+                "nocturnidad": st.column_config.NumberColumn("Actividad Nocturna", format="%.2f%%"),
+                "max_posts_1min": st.column_config.NumberColumn("Pico Posts/1 min", format="%d"),
+                "max_posts_10min": st.column_config.NumberColumn("Pico Posts/10 min", format="%d"),
+                "max_posts_60min": st.column_config.NumberColumn("Pico Posts/60 min", format="%d"),
+                "cv_intervalos": st.column_config.NumberColumn("CV Intervalos", help="Coeficiente de variación entre posts (≈0 = cadencia de reloj)", format="%.2f"),
+                "entropia_intervalos": st.column_config.NumberColumn("Entropía Intervalos", format="%.2f bits"),
+                "entropia_horas": st.column_config.NumberColumn("Entropía Horaria", help="0 = publica siempre a la misma hora", format="%.2f bits"),
                 "ttr": "Diversidad Léxica",
-                "tasa_repeticion": "Tasa de Repetición",
+                "tasa_repeticion": st.column_config.NumberColumn("Tasa de Repetición", format="%.2f%%"),
                 "longitud_promedio": "Longitud Promedio",
                 "avg_likes": "Likes Promedio",
-                "avg_replies": "Respuestas Promedio"
+                "avg_replies": "Respuestas Promedio",
+                "posts_campana": st.column_config.NumberColumn("Posts en Campaña", help="Posts casi idénticos (de todas las cuentas) en la mayor campaña del usuario", format="%d"),
+                "cuentas_campana": st.column_config.NumberColumn("Cuentas en Campaña", help="Cuentas distintas que publicaron esa campaña", format="%d")
             },
             hide_index=True
         )
@@ -139,7 +360,14 @@ if df_raw is not None:
     st.divider()
     
     # 2. LLAMADA AL MODELO (model.py)
-    df_users, features_conducta = entrenar_y_predecir(df_users, umbral_risk_score)
+    # Embeddings, modelo y scores salen de caché; sólo el umbral se recalcula en cada rerun
+    n_usuarios = len(df_users)
+    X_embeddings = ejecutar_etapa('embeddings', etapa_embeddings, huella, backend, textos_usuarios, filas=n_usuarios)
+    df_users = ejecutar_etapa('coordinacion', etapa_coordinacion, huella, backend, df_users, X_embeddings, filas=n_usuarios)
+    modelo = ejecutar_etapa('modelo', etapa_modelo, huella, backend, df_users, X_embeddings, filas=n_usuarios)
+    df_scores = ejecutar_etapa('scores', etapa_scores, huella, backend, df_users, X_embeddings, modelo, filas=n_usuarios)
+    df_users = aplicar_umbral(df_scores, umbral_risk_score)
+    features_conducta = FEATURES_CONDUCTA
 
     st.header("Resultados del Modelo de Detección de Anomalías")
 
@@ -148,59 +376,38 @@ if df_raw is not None:
     st.subheader("📊 Comparación Individualizada de Métricas: Bots vs. Usuarios Normales")
     st.markdown("Promedio de cada métrica de comportamiento y léxica, agrupado por la clasificación final. **(Escalas ajustadas por métrica)**")
     
-    # --- Preparación de datos para el gráfico de comparación ---
-    df_comparison = df_users.groupby('es_bot')[features_conducta].mean().T.reset_index()
-    df_comparison.columns = ['Metrica', 'Usuario Normal', 'Bot Detectado']
-    
     metric_map = {
         'num_posts': 'Posts Totales',
         'intervalo_medio': 'Intervalo Medio (min)',
         'frecuencia_diaria': 'Frecuencia Diaria',
         'nocturnidad': 'Actividad Nocturna (00-06h)',
+        'max_posts_1min': 'Pico de Posts en 1 min',
+        'max_posts_10min': 'Pico de Posts en 10 min',
+        'max_posts_60min': 'Pico de Posts en 60 min',
+        'cv_intervalos': 'CV de Intervalos entre Posts',
+        'entropia_intervalos': 'Entropía de Intervalos',
+        'entropia_horas': 'Entropía de Hora del Día',
         'ttr': 'Diversidad Léxica (TTR)',
         'tasa_repeticion': 'Tasa de Repetición',
         'avg_likes': 'Likes Promedio',
         'avg_replies': 'Respuestas Promedio',
-        'longitud_promedio': 'Longitud Promedio'
+        'longitud_promedio': 'Longitud Promedio',
+        'posts_campana': 'Posts en Campaña (casi duplicados)',
+        'cuentas_campana': 'Cuentas en Campaña',
+        'vecinos_coordinados': 'Vecinos Semánticos Coordinados',
+        'similitud_vecinos': 'Similitud Media con Vecinos'
     }
     
-    # --- Creación de Gráficos Individuales ---
+    # --- Un único gráfico con subgráficos, desde el resumen ya agregado (2 filas por métrica) ---
     col1_graficos, col2_top = st.columns([2, 1])
     
-    with col1_graficos:
-        cols = st.columns(2)
-        col_index = 0
-        
-        for original_metric, display_name in metric_map.items():
-            df_plot = df_comparison[df_comparison['Metrica'] == original_metric].copy()
-            df_long_single = pd.melt(df_plot, id_vars='Metrica', var_name='Clasificación', value_name='Valor Promedio')
-            
-            with cols[col_index % 2]:
-                fig_bar_single = px.bar(
-                    df_long_single, 
-                    x='Clasificación', 
-                    y='Valor Promedio', 
-                    color='Clasificación', 
-                    height=300,
-                    title=f'**{display_name}**',
-                    color_discrete_map={
-                        'Bot Detectado': 'salmon', 
-                        'Usuario Normal': 'lightseagreen'
-                    },
-                    labels={'Valor Promedio': 'Valor Promedio', 'Clasificación': 'Tipo de Usuario'}
-                )
-                fig_bar_single.update_layout(
-                    xaxis_title=None,
-                    title_x=0.5,
-                    legend_title_text='Tipo de Usuario',
-                    showlegend=True if col_index == 0 else False
-                )
-                st.plotly_chart(fig_bar_single, use_container_width=True)
-            col_index += 1
+    with col1_graficos, medir('render_graficos', filas=len(metric_map)):
+        resumen_clases = resumen_por_clase(df_users, [m for m in metric_map if m in features_conducta])
+        st.plotly_chart(figura_comparacion(resumen_clases, metric_map), use_container_width=True)
 
     with col2_top:
         st.subheader("🚨 Top Sospechosos")
-        sospechosos = df_users.sort_values('risk_score', ascending=False).head(10)
+        sospechosos = df_users.nlargest(10, 'risk_score')
         
         st.dataframe(
             sospechosos[['user_id', 'risk_score', 'num_posts']],
@@ -233,19 +440,27 @@ if df_raw is not None:
         'num_posts', 
         'intervalo_medio', 
         'frecuencia_diaria', 
+        'max_posts_10min', 
         'avg_likes', 
         'avg_replies', 
         'ttr', 
-        'longitud_promedio'
+        'longitud_promedio',
+        'cuentas_campana',
+        'vecinos_coordinados'
     ]
     
     cols_to_show_final = ['user_id', 'risk_score', 'es_bot'] + features_conducta_display
-    df_final_detailed = df_users[cols_to_show_final].copy()
-    
-    df_final_detailed['Clasificación'] = df_final_detailed['es_bot'].map({
-        True: '🤖 Bot Detectado', 
-        False: '👤 Usuario Normal'
-    })
+    # Orden por riesgo con argsort (sin reordenar el DataFrame); el filtro se aplica sobre las posiciones
+    orden_riesgo = np.argsort(-df_users['risk_score'].to_numpy(), kind='stable')
+    if st.checkbox("Mostrar sólo los bots detectados", key='solo_bots'):
+        orden_riesgo = orden_riesgo[df_users['es_bot'].to_numpy()[orden_riesgo]]
+    df_final_detailed = df_users[cols_to_show_final].iloc[orden_riesgo]
+
+    display_order = ['user_id', 'Clasificación', 'risk_score'] + features_conducta_display
+
+    def clasificacion(pagina, columnas=display_order):
+        pagina['Clasificación'] = np.where(pagina['es_bot'], '🤖 Bot Detectado', '👤 Usuario Normal')
+        return pagina[columnas]
     
     column_config_map = {
         "user_id": "ID de Usuario",
@@ -260,45 +475,65 @@ if df_raw is not None:
         ),
         "intervalo_medio": st.column_config.NumberColumn("Intervalo Medio (min)", format="%.2f min"),
         "frecuencia_diaria": st.column_config.NumberColumn("Posts/Día (Aprox)", format="%.2f"),
+        "max_posts_10min": st.column_config.NumberColumn("Pico Posts/10 min", format="%d"),
         "ttr": st.column_config.NumberColumn("Diversidad Léxica (TTR)", format="%.2f"),
         "longitud_promedio": st.column_config.NumberColumn("Longitud Promedio", format="%.1f"),
         "avg_likes": st.column_config.NumberColumn("Likes Promedio", format="%.1f"),
         "avg_replies": st.column_config.NumberColumn("Respuestas Promedio", format="%.1f"),
         "num_posts": st.column_config.NumberColumn("Posts Totales", format="%d"),
+        "cuentas_campana": st.column_config.NumberColumn("Cuentas en Campaña", format="%d"),
+        "vecinos_coordinados": st.column_config.NumberColumn("Vecinos Coordinados", help="Usuarios casi idénticos en embeddings y activos en la misma ventana de tiempo", format="%d"),
         "es_bot": None
     }
     
-    display_order = ['user_id', 'Clasificación', 'risk_score'] + features_conducta_display
-    
-    st.dataframe(
-        df_final_detailed[display_order].sort_values(by='risk_score', ascending=False),
-        column_config=column_config_map,
-        hide_index=True,
-        use_container_width=True
-    )
+    with medir('render_tabla_final', filas=len(df_final_detailed)):
+        mostrar_paginado(
+            df_final_detailed, 'final', formatear=clasificacion,
+            column_config=column_config_map,
+            hide_index=True,
+            use_container_width=True
+        )
     
     st.divider()
 
     # ================= 7. ANÁLISIS INDIVIDUAL (SOLO MÉTRICAS) =================
     st.subheader("Análisis Detallado por Usuario")
-    usuario_selec = st.selectbox("Seleccionar Usuario para auditar:", df_users['user_id'].unique())
+    # Índice ordenado de user_id: el buscador filtra en el servidor y el selectbox sólo
+    # recibe las coincidencias (o los más sospechosos), nunca todos los usuarios
+    indice = indice_usuarios(huella, df_users['user_id'])
+    consulta = st.text_input("Buscar usuario (inicio del ID):", key='busqueda_usuario',
+                             placeholder="Vacío = los más sospechosos")
+    candidatos = buscar_usuarios(indice, consulta) if consulta else np.argsort(-df_users['risk_score'].to_numpy(), kind='stable')[:MAX_SUGERENCIAS]
+    if consulta and len(candidatos) == 0:
+        st.info(f"Ningún usuario empieza por \"{consulta}\".")
+    posicion = st.selectbox("Seleccionar Usuario para auditar:", candidatos, format_func=lambda p: str(indice[0][p]))
     
-    if usuario_selec:
-        user_data = df_users[df_users['user_id'] == usuario_selec].iloc[0]
+    if posicion is not None:
+        user_data = df_users.iloc[int(posicion)]
         
         # --- FILA 1: Risk Score, Posts Totales y Rasgos de Comportamiento ---
         st.markdown('**Comportamiento y Métricas Generales**')
         col_r1_1, col_r1_2, col_r1_3, col_r1_4, col_r1_5 = st.columns(5)
         
-        clasificacion = '🤖 BOT' if user_data['es_bot'] else '👤 Usuario'
-        col_r1_1.metric(f"Risk Score ({clasificacion})", f"{user_data['risk_score']:.2%}", delta_color="inverse")
+        etiqueta = '🤖 BOT' if user_data['es_bot'] else '👤 Usuario'
+        col_r1_1.metric(f"Risk Score ({etiqueta})", f"{user_data['risk_score']:.2%}", delta_color="inverse")
         col_r1_2.metric("Posts Totales", user_data['num_posts'])
         col_r1_3.metric("Intervalo Medio", f"{user_data['intervalo_medio']:.2f} min")
         col_r1_4.metric("Frecuencia Diaria", f"{user_data['frecuencia_diaria']:.2f}")
         col_r1_5.metric("Actividad Nocturna", f"{user_data['nocturnidad']:.2%}", delta_color="inverse") 
         
+        st.markdown('**Ráfagas y Cadencia**')
+        # --- FILA 2: Picos por ventana deslizante y regularidad temporal ---
+        col_t_1, col_t_2, col_t_3, col_t_4, col_t_5, col_t_6 = st.columns(6)
+        col_t_1.metric("Pico Posts/1 min", int(user_data['max_posts_1min']))
+        col_t_2.metric("Pico Posts/10 min", int(user_data['max_posts_10min']))
+        col_t_3.metric("Pico Posts/60 min", int(user_data['max_posts_60min']))
+        col_t_4.metric("CV Intervalos", f"{user_data['cv_intervalos']:.2f}")
+        col_t_5.metric("Entropía Intervalos", f"{user_data['entropia_intervalos']:.2f}")
+        col_t_6.metric("Entropía Horaria", f"{user_data['entropia_horas']:.2f}")
+
         st.markdown('**Rasgos Léxicos y de Interacción**')
-        # --- FILA 2: Rasgos Léxicos y de Interacción ---
+        # --- FILA 3: Rasgos Léxicos y de Interacción ---
         col_r2_1, col_r2_2, col_r2_3, col_r2_4, col_r2_5 = st.columns(5)
         
         col_r2_1.metric("Diversidad Léxica (TTR)", f"{user_data['ttr']:.2f}") 
@@ -307,9 +542,19 @@ if df_raw is not None:
         col_r2_4.metric("Likes Promedio", f"{user_data['avg_likes']:.2f}")
         col_r2_5.metric("Respuestas Promedio", f"{user_data['avg_replies']:.2f}")
 
+        st.markdown('**Coordinación (Campañas Casi Duplicadas y Vecinos Semánticos)**')
+        # --- FILA 4: Mayor campaña MinHash/LSH y vecinos del grafo de coordinación ---
+        col_r3_1, col_r3_2, col_r3_3, col_r3_4 = st.columns(4)
+        col_r3_1.metric("Posts en su Mayor Campaña", int(user_data['posts_campana']))
+        col_r3_2.metric("Cuentas en esa Campaña", int(user_data['cuentas_campana']), delta_color="inverse")
+        col_r3_3.metric("Vecinos Semánticos Coordinados", int(user_data['vecinos_coordinados']), delta_color="inverse")
+        col_r3_4.metric("Similitud Media con Vecinos", f"{user_data['similitud_vecinos']:.2f}")
+
         # Muestra de textos
-        with st.expander("Ver contenido textual del usuario"):
-            st.write(user_data['textos_raw'])
+        # textos_usuarios está en el orden de df_users: la posición sirve directamente
+        if st.toggle("Ver contenido textual del usuario", key='ver_textos'):
+            mostrar_paginado(pd.DataFrame({'texto_limpio': textos_usuarios[int(posicion)]}), 'textos',
+                             use_container_width=True, hide_index=True)
             
     # ================= 8. DESCARGA DE RESULTADOS FINALES =================
     st.divider()
@@ -319,10 +564,7 @@ if df_raw is not None:
     # 1. Preparar el DataFrame para la descarga
     df_download = df_users[['user_id', 'risk_score', 'es_bot']].copy()
 
-    df_download['Clasificacion_Final'] = df_download['es_bot'].map({
-        True: 'BOT DETECTADO', 
-        False: 'USUARIO NORMAL'
-    })
+    df_download['Clasificacion_Final'] = np.where(df_download['es_bot'], 'BOT DETECTADO', 'USUARIO NORMAL')
     
     df_download.rename(columns={
         'user_id': 'ID_Usuario',
@@ -331,12 +573,8 @@ if df_raw is not None:
     
     df_export = df_download[['ID_Usuario', 'Nivel_Riesgo', 'Clasificacion_Final']]
 
-    # 2. Convertir el DataFrame a CSV
-    @st.cache_data
-    def convert_df_to_csv(df):
-        return df.to_csv(index=False).encode('utf-8')
-
-    csv_data = convert_df_to_csv(df_export)
+    # 2. Convertir el DataFrame a CSV (caché por datos, backend y umbral: no se re-hashea la tabla)
+    csv_data = csv_resultados(huella, backend, umbral_risk_score, df_export)
     
     # 3. Mostrar el botón de descarga
     st.download_button(
@@ -345,4 +583,28 @@ if df_raw is not None:
         file_name='BotBuster_Resultados_Clasificacion.csv',
         mime='text/csv',
         type="primary"
-    )
\ No newline at end of file
+    )
+
+# ================= 9. RENDIMIENTO POR ETAPA =================
+with st.sidebar.expander("⏱️ Rendimiento por etapa"):
+    st.caption("Tiempo, filas/s, RSS pico y aciertos de caché de cada etapa en esta pasada.")
+    tabla_etapas = registro_etapas.tabla()
+    if 'tasa_aciertos' in tabla_etapas:
+        tabla_etapas['tasa_aciertos'] = tabla_etapas['tasa_aciertos'] * 100
+    if tabla_etapas.empty:
+        st.write("Sin etapas medidas todavía.")
+    else:
+        st.dataframe(
+            tabla_etapas,
+            column_config={
+                "segundos": st.column_config.NumberColumn("Tiempo (s)", format="%.3f"),
+                "filas_por_s": st.column_config.NumberColumn("Filas/s", format="%.0f"),
+                "rss_pico_mb": st.column_config.NumberColumn("RSS pico (MB)", format="%.0f"),
+                "tasa_aciertos": st.column_config.NumberColumn("Aciertos caché", format="%.0f%%"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    if perfil is not None:
+        st.download_button("Descargar perfil cProfile (.prof)", data=volcar_perfil(perfil),
+                           file_name='botbuster_perfil.prof', mime='application/octet-stream')
@@ -0,0 +1,112 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+from src.anomalias import MotorAnomalias, TAM_BLOQUE_SCORING
+from src.model import FEATURES_CONDUCTA
+
+# Tiempo y memoria del Isolation Forest a 10k / 100k / 1M usuarios sobre datos sintéticos
+# con la forma de X_final (features de conducta escaladas + 2 componentes PCA):
+#   python bench_anomalias.py
+#   python bench_anomalias.py --guardar bench_anomalias.json          (fijar referencia)
+#   python bench_anomalias.py --base bench_anomalias.json             (falla si hay regresión)
+#   python bench_anomalias.py --muestras-ajuste 100000 --bosques 3
+# Cada tiempo es la mediana de --repeticiones ajustes/scorings tras uno de calentamiento descartado.
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+N_COLUMNAS = len(FEATURES_CONDUCTA) + 2
+TOLERANCIA = 0.5  # Regresión = más de un 50% peor que la referencia
+REPETICIONES = 5
+
+
+def datos_sinteticos(n, semilla=0):
+    """Mayoría normal estándar + un 5% de cuentas desplazadas (bots)."""
+    rng = np.random.default_rng(semilla)
+    X = rng.standard_normal((n, N_COLUMNAS))
+    n_bots = n // 20
+    X[:n_bots] += rng.uniform(2, 4, N_COLUMNAS)
+    return X
+
+
+def _cronometrar(X, config):
+    inicio = time.perf_counter()
+    motor = MotorAnomalias(**config).fit(X)
+    ajuste_s = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    motor.decision_function(X)
+    return ajuste_s, time.perf_counter() - inicio
+
+
+def medir(n, config, repeticiones=REPETICIONES):
+    """Mediana de `repeticiones` pasadas tras una de calentamiento (imports, cachés, asignador)."""
+    X = datos_sinteticos(n)
+    _cronometrar(X, config)
+    ajuste_s, scoring_s = np.median([_cronometrar(X, config) for _ in range(max(repeticiones, 1))], axis=0)
+    ajuste_s, scoring_s = float(ajuste_s), float(scoring_s)
+
+    # Memoria en una segunda pasada: tracemalloc ralentiza y falsearía los tiempos
+    tracemalloc.start()
+    motor = MotorAnomalias(**config).fit(X)
+    motor.decision_function(X)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ajuste_s': ajuste_s,
+        'scoring_s': scoring_s,
+        'usuarios_por_s': n / scoring_s if scoring_s > 0 else float('inf'),
+        'pico_mb': pico / 2**20,
+    }
+
+
+def regresiones(informe, base, tolerancia=TOLERANCIA):
+    """Métricas (tiempo, memoria) que empeoran más de `tolerancia` respecto a la base."""
+    avisos = []
+    for n, r in informe.items():
+        ref = base.get(n)
+        if ref is None:
+            continue
+        for metrica in ('ajuste_s', 'scoring_s', 'pico_mb'):
+            if r[metrica] > ref[metrica] * (1 + tolerancia):
+                avisos.append(f"{n} usuarios: {metrica} {r[metrica]:.2f} > {ref[metrica]:.2f} (+{tolerancia:.0%})")
+    return avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo y memoria del motor de anomalías.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS, help="Nº de usuarios a medir")
+    parser.add_argument('--muestras-ajuste', type=int, default=None)
+    parser.add_argument('--bosques', type=int, default=1)
+    parser.add_argument('--tam-bloque', type=int, default=TAM_BLOQUE_SCORING)
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES, help="Pasadas medidas (se informa la mediana)")
+    parser.add_argument('--guardar', help="Guardar el informe como referencia en este JSON")
+    parser.add_argument('--base', help="JSON de referencia: termina con código 1 si hay regresión")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args(argv)
+
+    config = {'max_muestras_ajuste': args.muestras_ajuste, 'n_bosques': args.bosques,
+              'tam_bloque': args.tam_bloque}
+    informe = {}
+    print(f"{'usuarios':>10} {'ajuste (s)':>11} {'scoring (s)':>12} {'usuarios/s':>11} {'pico (MB)':>10}")
+    for n in args.tamanos:
+        r = informe[str(n)] = medir(n, config, args.repeticiones)
+        print(f"{n:>10} {r['ajuste_s']:>11.2f} {r['scoring_s']:>12.2f} {r['usuarios_por_s']:>11.0f} {r['pico_mb']:>10.1f}")
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            avisos = regresiones(informe, json.load(f), args.tolerancia)
+        for aviso in avisos:
+            print(f"REGRESIÓN {aviso}")
+        if avisos:
+            sys.exit(1)
+        print("Sin regresiones respecto a la referencia")
+
+
+if __name__ == '__main__':
+    main()
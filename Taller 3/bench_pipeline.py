@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Caché de embeddings temporal y vacía en cada ejecución (antes de importar src):
+# los tiempos no dependen de lo que haya quedado en disco de ejecuciones anteriores.
+_DIR_CACHE = tempfile.mkdtemp(prefix='bench_botbuster_')
+os.environ['BOTBUSTER_CACHE'] = _DIR_CACHE
+
+from src.preprocess import limpiar_texto
+from src.features import procesar_datos
+from src.model import calcular_embeddings, cargar_backend, entrenar_y_predecir
+from src.instrumentacion import RegistroEtapas, medir
+from src.sintetico import generar_dataset, CodificadorSintetico
+from src.textos import TextosUsuarios
+
+# Benchmark reproducible del pipeline completo sobre cargas sintéticas (src/sintetico.py):
+#   python bench_pipeline.py                                         (codificador sintético, sin red)
+#   python bench_pipeline.py --usuarios 1000 10000 --codificador hash-svd
+#   python bench_pipeline.py --guardar bench_pipeline.json           (fijar referencia)
+#   python bench_pipeline.py --base bench_pipeline.json              (falla si hay regresión)
+# Cada etapa: tiempo, filas/s y RSS pico. "embeddings" es con caché fría;
+# "entrenar_y_predecir" incluye de nuevo los embeddings, ya con caché caliente.
+
+TAMANOS = [1_000, 10_000, 50_000]
+ETAPAS = ['limpiar_texto', 'procesar_datos', 'embeddings', 'entrenar_y_predecir']
+TOLERANCIA = 0.5  # Regresión = más de un 50% peor que la referencia
+UMBRAL = 0.75
+
+
+def medir_escala(n_usuarios, codificador, backend, semilla=0):
+    """Genera la carga de n_usuarios y mide cada etapa con un RegistroEtapas propio."""
+    df_raw = generar_dataset(n_usuarios, semilla=semilla)
+    registro = RegistroEtapas(usuarios=n_usuarios, posts=len(df_raw))
+    with registro.activar():
+        with medir('limpiar_texto', filas=len(df_raw)):
+            for texto in df_raw['text'].values:
+                limpiar_texto(texto)
+        df_users, df_posts = procesar_datos(df_raw) # procesar_datos y calcular_embeddings ya se miden solas
+        textos = TextosUsuarios.desde_posts(df_users, df_posts)
+        calcular_embeddings(textos, backend, codificador)
+        with medir('entrenar_y_predecir', filas=len(df_users)):
+            entrenar_y_predecir(df_users, textos, UMBRAL, backend, codificador)
+
+    informe = {'posts': len(df_raw)}
+    for e in registro.etapas:
+        if e['etapa'] in ETAPAS: # Sólo las etapas de primer nivel (el detalle queda en registro.tabla())
+            informe[e['etapa']] = {'segundos': e['segundos'], 'filas_por_s': e['filas_por_s'],
+                                   'rss_pico_mb': e['rss_pico_mb']}
+    return informe, registro
+
+
+def regresiones(informe, base, tolerancia=TOLERANCIA):
+    """Etapas cuyo tiempo o memoria empeora más de `tolerancia` respecto a la base."""
+    avisos = []
+    for n, r in informe.items():
+        ref = base.get(n)
+        if ref is None:
+            continue
+        for etapa in ETAPAS:
+            for metrica in ('segundos', 'rss_pico_mb'):
+                actual, previo = r.get(etapa, {}).get(metrica), ref.get(etapa, {}).get(metrica)
+                if actual is not None and previo is not None and actual > previo * (1 + tolerancia):
+                    avisos.append(f"{n} usuarios, {etapa}: {metrica} {actual:.2f} > {previo:.2f} (+{tolerancia:.0%})")
+    return avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline sobre cargas sintéticas bots/humanos.")
+    parser.add_argument('--usuarios', type=int, nargs='+', default=TAMANOS, help="Nº de usuarios a medir")
+    parser.add_argument('--codificador', default='sintetico', choices=['sintetico', 'hash-svd', 'beto', 'beto-int8', 'beto-128'],
+                        help="'sintetico' no usa red neuronal ni descargas (por defecto)")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--detalle', action='store_true', help="Mostrar también las sub-etapas")
+    parser.add_argument('--guardar', help="Guardar el informe como referencia en este JSON")
+    parser.add_argument('--base', help="JSON de referencia: termina con código 1 si hay regresión")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args(argv)
+
+    if args.codificador == 'sintetico':
+        backend, codificador = 'beto', CodificadorSintetico() # Misma dimensión que BETO
+    else:
+        backend, codificador = args.codificador, cargar_backend(args.codificador)
+
+    informe = {}
+    try:
+        print(f"{'usuarios':>9} {'posts':>9} {'etapa':<40} {'tiempo (s)':>10} {'filas/s':>10} {'RSS pico (MB)':>14}")
+        for n in args.usuarios:
+            r, registro = medir_escala(n, codificador, backend, args.semilla)
+            informe[str(n)] = r
+            etapas = registro.etapas if args.detalle else [e for e in registro.etapas if e['etapa'] in ETAPAS]
+            for e in etapas:
+                filas_s = f"{e['filas_por_s']:>10.0f}" if e['filas_por_s'] else f"{'-':>10}"
+                pico = f"{e['rss_pico_mb']:>14.0f}" if e['rss_pico_mb'] is not None else f"{'-':>14}"
+                print(f"{n:>9} {r['posts']:>9} {e['etapa']:<40} {e['segundos']:>10.2f} {filas_s} {pico}")
+    finally:
+        shutil.rmtree(_DIR_CACHE, ignore_errors=True)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            avisos = regresiones(informe, json.load(f), args.tolerancia)
+        for aviso in avisos:
+            print(f"REGRESIÓN {aviso}")
+        if avisos:
+            sys.exit(1)
+        print("Sin regresiones respecto a la referencia")
+
+
+if __name__ == '__main__':
+    main()
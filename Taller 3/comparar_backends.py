@@ -0,0 +1,73 @@
+import argparse
+import json
+import time
+from src.features import procesar_datos
+from src.embeddings import generar_embeddings
+from src.model import BACKENDS, cargar_backend
+from src.pipeline import leer_entrada, puntuar_usuarios
+from src.textos import TextosUsuarios
+
+# Compara velocidad y calidad de los backends de embeddings sobre un mismo dataset:
+#   python comparar_backends.py youtube_para_streamlit2.csv
+#   python comparar_backends.py datos.csv --backends beto beto-int8 hash-svd --top 50
+# Calidad = cuánto cambia el ranking de sospechosos respecto al backend de referencia.
+
+def comparar(df_raw, backends, referencia='beto', top=20):
+    df_users, df_posts = procesar_datos(df_raw)
+    df_users = df_users.fillna(0)
+    textos = TextosUsuarios.desde_posts(df_users, df_posts)
+    n_textos = len(textos.textos)
+
+    resultados = {}
+    for backend in [referencia] + [b for b in backends if b != referencia]:
+        inicio = time.perf_counter()
+        model = cargar_backend(backend)
+        carga_s = time.perf_counter() - inicio
+
+        # Sin caché: se mide el coste real de codificar
+        inicio = time.perf_counter()
+        X_embeddings = generar_embeddings(model, textos, cache=None)
+        embeddings_s = time.perf_counter() - inicio
+
+        puntuados = puntuar_usuarios(df_users.copy(), X_embeddings, backend=backend)
+        resultados[backend] = {
+            'carga_s': carga_s,
+            'embeddings_s': embeddings_s,
+            'textos_por_s': n_textos / embeddings_s if embeddings_s > 0 else float('inf'),
+            'risk_score': puntuados.set_index('user_id')['risk_score'],
+        }
+
+    riesgo_ref = resultados[referencia]['risk_score']
+    top_ref = set(riesgo_ref.nlargest(top).index)
+    informe = {}
+    for backend, r in resultados.items():
+        riesgo = r.pop('risk_score').reindex(riesgo_ref.index)
+        r['solapamiento_top'] = len(top_ref & set(riesgo.nlargest(top).index)) / max(len(top_ref), 1)
+        r['spearman_vs_ref'] = float(riesgo.corr(riesgo_ref, method='spearman'))
+        informe[backend] = r
+    return informe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara throughput y ranking de sospechosos entre backends de embeddings.")
+    parser.add_argument('entrada', help="CSV/Parquet con user_id, text, timestamp, likes, replies")
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--referencia', choices=list(BACKENDS), default='beto')
+    parser.add_argument('--top', type=int, default=20, help="Tamaño del top de sospechosos a comparar")
+    parser.add_argument('--json', help="Guardar el informe en este archivo")
+    args = parser.parse_args(argv)
+
+    informe = comparar(leer_entrada(args.entrada), args.backends, args.referencia, args.top)
+
+    print(f"{'backend':<10} {'carga (s)':>10} {'embed (s)':>10} {'textos/s':>10} {f'top-{args.top}':>8} {'spearman':>9}")
+    for backend, r in informe.items():
+        print(f"{backend:<10} {r['carga_s']:>10.2f} {r['embeddings_s']:>10.2f} {r['textos_por_s']:>10.0f} "
+              f"{r['solapamiento_top']:>8.0%} {r['spearman_vs_ref']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
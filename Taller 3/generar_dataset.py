@@ -0,0 +1,34 @@
+import argparse
+from src.sintetico import generar_dataset
+
+# Dataset sintético bots/humanos con las columnas de un scrape (user_id, text, timestamp, likes, replies):
+#   python generar_dataset.py sintetico.csv --usuarios 10000
+#   python generar_dataset.py spam.parquet --usuarios 50000 --bots 0.3 --spam 0.9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético de bots y humanos.")
+    parser.add_argument('salida', help="Archivo .csv o .parquet")
+    parser.add_argument('--usuarios', type=int, default=1_000)
+    parser.add_argument('--bots', type=float, default=0.1, help="Proporción de cuentas bot")
+    parser.add_argument('--posts-humano', type=float, default=5, help="Media de posts por humano (lognormal)")
+    parser.add_argument('--posts-bot', type=float, default=40, help="Media de posts por bot (Poisson)")
+    parser.add_argument('--spam', type=float, default=0.7, help="Fracción de posts de bot que copian una campaña")
+    parser.add_argument('--rafagas', type=float, default=0.5, help="Fracción de bots que publican en ráfagas")
+    parser.add_argument('--campanas', type=int, default=5)
+    parser.add_argument('--longitud', type=int, default=80, help="Caracteres medios por texto")
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generar_dataset(args.usuarios, args.bots, args.posts_humano, args.posts_bot, args.spam,
+                         args.rafagas, args.campanas, args.longitud, args.dias, semilla=args.semilla)
+    if args.salida.endswith('.parquet'):
+        df.to_parquet(args.salida, index=False)
+    else:
+        df.to_csv(args.salida, index=False)
+    print(f"{len(df)} posts de {df['user_id'].nunique()} usuarios -> {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
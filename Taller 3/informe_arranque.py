@@ -0,0 +1,153 @@
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import os
+import time
+import urllib.request
+
+# Informe de tiempos de importación y arranque en frío (cada medida en un proceso nuevo):
+#   python informe_arranque.py
+#   python informe_arranque.py --csv youtube_para_streamlit2.csv --json informe.json
+# La app se mide sin navegador: `streamlit run` headless hasta que responde /_stcore/health
+# y AppTest (streamlit.testing) hasta que termina la primera ejecución completa de app.py,
+# que es lo que tarda en aparecer la primera página (opción por defecto del panel lateral).
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(DIRECTORIO, 'app.py')
+TIMEOUT_S = 600
+MODULOS = [
+    'src.features', 'src.model', 'src.pipeline',
+    'pandas', 'scipy.sparse', 'emoji', 'streamlit', 'plotly.express',
+    'sklearn.ensemble', 'sentence_transformers',
+]
+
+SCRIPT_ARRANQUE = """
+import json, sys, time
+t0 = time.perf_counter()
+from src.pipeline import leer_entrada, puntuar_dataframe
+t_import = time.perf_counter()
+df_raw = leer_entrada(sys.argv[1])
+df_users = puntuar_dataframe(df_raw)
+t_score = time.perf_counter()
+print(json.dumps({
+    'importar_pipeline_s': t_import - t0,
+    'primer_score_s': t_score - t0,
+    'usuarios': len(df_users),
+}))
+"""
+
+SCRIPT_RENDER = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_import = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+app.run()
+t_render = time.perf_counter()
+print(json.dumps({
+    'importar_streamlit_s': t_import - t0,
+    'primer_render_s': t_render - t0,
+    'excepciones': len(app.exception),
+}))
+"""
+
+
+def tiempo_importacion(modulo):
+    """Tiempo acumulado (s) de importar `modulo` en un intérprete limpio, o None si no está instalado."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                          cwd=DIRECTORIO, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    # Formato de -X importtime: "import time: self [us] | cumulative | nombre"
+    acumulado = 0
+    for linea in proc.stderr.splitlines():
+        partes = [p.strip() for p in linea.split('|')]
+        if len(partes) == 3 and partes[2] == modulo:
+            acumulado = max(acumulado, int(partes[1]))
+    return acumulado / 1e6
+
+
+def _ejecutar_script(script, *args):
+    """Ejecuta `script` en un proceso nuevo y devuelve el JSON de su última línea (o el error)."""
+    proc = subprocess.run([sys.executable, '-c', script, *map(str, args)],
+                          cwd=DIRECTORIO, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr else 'falló'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def arranque_en_frio(ruta_csv):
+    """Importación + carga de BETO + primer scoring completo en un proceso nuevo."""
+    return _ejecutar_script(SCRIPT_ARRANQUE, ruta_csv)
+
+
+def primer_render(ruta_app=APP, timeout=TIMEOUT_S):
+    """Proceso nuevo -> primera ejecución completa de la app con AppTest (sin navegador)."""
+    return _ejecutar_script(SCRIPT_RENDER, ruta_app, timeout)
+
+
+def servidor_listo(ruta_app=APP, timeout=TIMEOUT_S):
+    """`streamlit run` headless -> primera respuesta de /_stcore/health (servidor aceptando sesiones)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto = s.getsockname()[1]
+    inicio = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', ruta_app, '--server.headless', 'true',
+                             '--server.port', str(puerto), '--browser.gatherUsageStats', 'false'],
+                            cwd=DIRECTORIO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - inicio < timeout:
+            if proc.poll() is not None:
+                return {'error': f"streamlit run terminó con código {proc.returncode}"}
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{puerto}/_stcore/health', timeout=1).read()
+                return {'servidor_listo_s': time.perf_counter() - inicio}
+            except OSError:
+                time.sleep(0.05)
+        return {'error': f"sin respuesta en {timeout} s"}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _imprimir(titulo, resultado):
+    print(titulo)
+    for clave, valor in resultado.items():
+        print(f"  {clave:<24} {valor:.3f}" if isinstance(valor, float) else f"  {clave:<24} {valor}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempos de importación y de arranque en frío.")
+    parser.add_argument('--csv', default=os.path.join(DIRECTORIO, 'youtube_para_streamlit2.csv'))
+    parser.add_argument('--json', help="Guardar el informe en este archivo")
+    parser.add_argument('--sin-scoring', action='store_true', help="No medir el primer score")
+    parser.add_argument('--sin-app', action='store_true', help="No medir el arranque de la app Streamlit")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_S, help="Segundos máximos por medida de la app")
+    args = parser.parse_args(argv)
+
+    informe = {'importacion_s': {m: tiempo_importacion(m) for m in MODULOS}}
+    print("Tiempo de importación (proceso limpio):")
+    for modulo, segundos in informe['importacion_s'].items():
+        texto = 'no instalado' if segundos is None else f'{segundos:7.3f} s'
+        print(f"  {modulo:<24} {texto}")
+
+    if not args.sin_scoring:
+        informe['arranque_en_frio'] = arranque_en_frio(args.csv)
+        _imprimir("Arranque en frío (importar + cargar BETO + primer score):", informe['arranque_en_frio'])
+
+    if not args.sin_app:
+        if informe['importacion_s'].get('streamlit') is None:
+            informe['app'] = {'error': 'streamlit no instalado'}
+        else:
+            informe['app'] = {**servidor_listo(timeout=args.timeout), **primer_render(timeout=args.timeout)}
+        _imprimir("App Streamlit (headless, hasta la primera página completa):", informe['app'])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.sintetico import generar_dataset
+
+# Prueba de carga del servicio de scoring con usuarios sintéticos (src/sintetico.py):
+#   python prueba_carga.py --url http://127.0.0.1:8765 --clientes 16 --peticiones 500
+#   python prueba_carga.py --modelo modelo.joblib --espera-ms 0     (levanta el servicio en este proceso)
+# Mide latencia p50/p99 vista por el cliente y throughput, y muestra las métricas del servidor.
+
+
+def peticiones_sinteticas(n_peticiones, usuarios_por_peticion, semilla=0):
+    """Cuerpos JSON de /puntuar: cada uno con todos los posts de usuarios_por_peticion usuarios."""
+    df = generar_dataset(max(n_peticiones * usuarios_por_peticion, 10), semilla=semilla)
+    df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    usuarios = np.random.default_rng(semilla).permutation(df['user_id'].unique().astype(object))
+    grupos = df.groupby('user_id', sort=False)
+    cuerpos = []
+    for i in range(n_peticiones):
+        ids = usuarios[(i * usuarios_por_peticion + np.arange(usuarios_por_peticion)) % len(usuarios)]
+        posts = [p for u in ids for p in grupos.get_group(u).to_dict(orient='records')]
+        cuerpos.append(json.dumps({'posts': posts}, ensure_ascii=False).encode('utf-8'))
+    return cuerpos
+
+
+def lanzar_carga(url, cuerpos, n_clientes):
+    """Envía los cuerpos desde n_clientes hilos. Devuelve (latencias ms, errores, segundos)."""
+    latencias, errores = [], []
+    lock = threading.Lock()
+
+    def enviar(cuerpo):
+        inicio = time.perf_counter()
+        try:
+            peticion = urllib.request.Request(url + '/puntuar', data=cuerpo, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(peticion, timeout=120) as respuesta:
+                respuesta.read()
+        except Exception as e:
+            with lock:
+                errores.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clientes) as pool:
+        list(pool.map(enviar, cuerpos))
+    return np.asarray(latencias), errores, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP de scoring.")
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--modelo', help="Levantar el servicio en este proceso con este artefacto (puerto libre)")
+    parser.add_argument('--espera-ms', type=float, default=None, help="Con --modelo: presupuesto de micro-lotes")
+    parser.add_argument('--clientes', type=int, default=8, help="Peticiones concurrentes")
+    parser.add_argument('--peticiones', type=int, default=200)
+    parser.add_argument('--usuarios-por-peticion', type=int, default=1)
+    parser.add_argument('--calentamiento', type=int, default=5, help="Peticiones previas que no se miden")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    servidor = None
+    if args.modelo:
+        from src.model import cargar_modelo
+        from src.servicio import ServicioPuntuacion, crear_servidor, MAX_ESPERA_MS
+        espera = MAX_ESPERA_MS if args.espera_ms is None else args.espera_ms
+        servidor = crear_servidor(ServicioPuntuacion(cargar_modelo(args.modelo), max_espera_ms=espera), puerto=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        args.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    cuerpos = peticiones_sinteticas(args.peticiones + args.calentamiento, args.usuarios_por_peticion, args.semilla)
+    lanzar_carga(args.url, cuerpos[:args.calentamiento], 1)
+    with urllib.request.urlopen(args.url + '/metricas') as respuesta:
+        antes = json.load(respuesta)
+    latencias, errores, segundos = lanzar_carga(args.url, cuerpos[args.calentamiento:], args.clientes)
+    with urllib.request.urlopen(args.url + '/metricas') as respuesta:
+        despues = json.load(respuesta)
+
+    print(f"{len(latencias)} peticiones OK, {len(errores)} errores, {args.clientes} clientes, "
+          f"{args.usuarios_por_peticion} usuario(s) por petición")
+    if len(latencias):
+        print(f"Latencia cliente: p50 {np.percentile(latencias, 50):.1f} ms | p99 {np.percentile(latencias, 99):.1f} ms "
+              f"| media {latencias.mean():.1f} ms")
+        print(f"Throughput: {len(latencias) / segundos:.1f} peticiones/s, "
+              f"{len(latencias) * args.usuarios_por_peticion / segundos:.1f} usuarios/s")
+    lotes = despues['lotes_codificacion'] - antes['lotes_codificacion']
+    llamadas = despues['peticiones'] - antes['peticiones']
+    if lotes:
+        print(f"Codificación: {lotes} lotes para {llamadas} peticiones ({llamadas / lotes:.2f} peticiones por lote)")
+    print("Servidor:", json.dumps(despues, ensure_ascii=False))
+    for error in errores[:5]:
+        print("  error:", error)
+    if servidor:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
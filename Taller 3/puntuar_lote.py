@@ -0,0 +1,61 @@
+import argparse
+import time
+from src.pipeline import listar_entradas, puntuar_archivos, UMBRAL_POR_DEFECTO
+from src.ingesta import TAM_BLOQUE
+from src.model import BACKENDS
+from src.instrumentacion import perfilar
+
+# Scoring por lotes sin Streamlit (p. ej. para jobs nocturnos):
+#   python puntuar_lote.py comentarios.csv -o resultados/
+#   python puntuar_lote.py carpeta_scrapes/ -o resultados/ --procesos 4 --formato parquet
+#   python puntuar_lote.py referencia.csv --guardar-modelo modelo.joblib   (entrenar y guardar)
+#   python puntuar_lote.py nuevos.csv --modelo modelo.joblib              (sólo scoring)
+#   python puntuar_lote.py datos.csv --metricas etapas.jsonl --perfil run.prof   (instrumentación)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Puntúa usuarios (Risk Score) de uno o varios CSV/Parquet.")
+    parser.add_argument("entrada", help="Archivo CSV/Parquet/JSONL o directorio con varios")
+    parser.add_argument("-o", "--salida", default="resultados", help="Directorio de salida")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_POR_DEFECTO, help="Umbral de Risk Score para es_bot")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--procesos", type=int, default=None, help="Archivos en paralelo (por defecto, un proceso por núcleo)")
+    parser.add_argument("--procesos-embeddings", type=int, default=1,
+                        help="Procesos para codificar embeddings, cada uno con su copia del modelo (0 = todos los núcleos)")
+    parser.add_argument("--por-bloques", action="store_true", help="Ingesta por bloques para CSV que no caben en memoria")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE)
+    parser.add_argument("--backend", choices=list(BACKENDS), default=None,
+                        help="Motor de embeddings (por defecto beto, o el del modelo cargado)")
+    parser.add_argument("--muestras-ajuste", type=int, default=None,
+                        help="Ajustar el Isolation Forest sobre una submuestra de N usuarios (por defecto, todos)")
+    parser.add_argument("--bosques", type=int, default=1,
+                        help="Promediar N Isolation Forest con semillas distintas (Risk Score más estable)")
+    parser.add_argument("--metricas", help="Añadir tiempo, filas/s, RSS pico y aciertos de caché por etapa (JSON lines)")
+    parser.add_argument("--perfil", help="Volcar un perfil cProfile de la ejecución (.prof); fuerza un solo proceso")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--modelo", help="Artefacto de modelo ya entrenado: sólo se puntúa, sin reentrenar")
+    modo.add_argument("--guardar-modelo", help="Entrena sobre la entrada y guarda el artefacto en esta ruta")
+    args = parser.parse_args(argv)
+
+    rutas = listar_entradas(args.entrada)
+    if not rutas:
+        parser.error(f"No hay archivos CSV/Parquet/JSONL en {args.entrada}")
+    if args.guardar_modelo and len(rutas) > 1:
+        parser.error("--guardar-modelo requiere un único archivo de entrada")
+
+    inicio = time.perf_counter()
+    with perfilar(args.perfil):
+        salidas = puntuar_archivos(
+            rutas, args.salida, n_procesos=1 if args.perfil else args.procesos, umbral=args.umbral,
+            formato=args.formato, por_bloques=args.por_bloques, tam_bloque=args.tam_bloque,
+            ruta_modelo=args.modelo, ruta_guardar_modelo=args.guardar_modelo, backend=args.backend,
+            procesos_embeddings=args.procesos_embeddings or None,
+            config_anomalias={'max_muestras_ajuste': args.muestras_ajuste, 'n_bosques': args.bosques},
+            ruta_metricas=args.metricas,
+        )
+    for entrada, salida in zip(rutas, salidas):
+        print(f"{entrada} -> {salida}")
+    print(f"{len(salidas)} archivo(s) puntuados en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
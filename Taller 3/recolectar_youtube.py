@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+from src.recolector import (abrir_salida, cliente_youtube, consolidar, recolectar, Checkpoint, YouTubeFalso,
+                            PETICIONES_POR_S)
+
+# Recolección concurrente y reanudable de comentarios (sustituye a youtube_scraper2.py):
+#   export YOUTUBE_API_KEY=...        (nunca en el código)
+#   python recolectar_youtube.py VIDEO1 VIDEO2 -o comentarios.jsonl
+#   python recolectar_youtube.py --videos ids.txt -o comentarios.parquet --hilos 8 --csv youtube_para_streamlit.csv
+#   python recolectar_youtube.py VIDEO1 VIDEO2 --falso -o prueba.jsonl     (API falsa local, sin red)
+# Si se interrumpe, repetir el mismo comando: continúa desde el checkpoint (<salida>.checkpoint.json).
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recolecta comentarios de YouTube en el esquema de la app.")
+    parser.add_argument('video_ids', nargs='*', help="IDs de vídeo")
+    parser.add_argument('--videos', help="Archivo con un ID de vídeo por línea")
+    parser.add_argument('-o', '--salida', default='comentarios.jsonl',
+                        help="JSON lines (por defecto) o directorio .parquet con una parte por página")
+    parser.add_argument('--checkpoint', help="Por defecto <salida>.checkpoint.json")
+    parser.add_argument('--hilos', type=int, default=4, help="Vídeos en paralelo")
+    parser.add_argument('--peticiones-por-s', type=float, default=PETICIONES_POR_S,
+                        help="Límite global de peticiones a la API (compartido por todos los hilos)")
+    parser.add_argument('--max-paginas', type=int, default=None, help="Páginas por vídeo en esta ejecución")
+    parser.add_argument('--csv', help="Al terminar, escribir la recolección completa (sin duplicados) en este CSV")
+    parser.add_argument('--api-key', default=os.environ.get('YOUTUBE_API_KEY'), help="Por defecto $YOUTUBE_API_KEY")
+    parser.add_argument('--falso', action='store_true', help="Usar la API falsa local (pruebas sin red)")
+    args = parser.parse_args(argv)
+
+    video_ids = list(args.video_ids)
+    if args.videos:
+        with open(args.videos, encoding='utf-8') as f:
+            video_ids += [linea.strip() for linea in f if linea.strip()]
+    if not video_ids:
+        parser.error("Indica al menos un ID de vídeo")
+    if args.falso:
+        api = YouTubeFalso(latencia=0.05)
+        crear_cliente = lambda: api
+    elif args.api_key:
+        crear_cliente = cliente_youtube(args.api_key)
+    else:
+        parser.error("Falta la API key: --api-key o la variable de entorno YOUTUBE_API_KEY")
+
+    salida = abrir_salida(args.salida)
+    checkpoint = Checkpoint(args.checkpoint or args.salida.rstrip('/\\') + '.checkpoint.json')
+    inicio = time.perf_counter()
+    estados = recolectar(crear_cliente, video_ids, salida, checkpoint, n_hilos=args.hilos,
+                         peticiones_por_s=args.peticiones_por_s, max_paginas=args.max_paginas)
+
+    for video_id, estado in estados.items():
+        situacion = 'completo' if estado['terminado'] else (f"error: {estado['error']}" if estado.get('error') else 'pendiente')
+        print(f"{video_id}: {estado['comentarios']} comentarios en {estado['paginas']} páginas ({situacion})")
+    print(f"Recolección en {time.perf_counter() - inicio:.1f}s -> {args.salida}")
+
+    if args.csv:
+        df = consolidar(salida)
+        df[['user_id', 'text', 'timestamp', 'likes', 'replies']].to_csv(args.csv, index=False)
+        print(f"{len(df)} comentarios -> {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
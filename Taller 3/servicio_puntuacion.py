@@ -0,0 +1,39 @@
+import argparse
+import json
+from src.model import cargar_modelo
+from src.pipeline import UMBRAL_POR_DEFECTO
+from src.servicio import ServicioPuntuacion, crear_servidor, MAX_ESPERA_MS, MAX_TEXTOS_LOTE, PUERTO
+
+# Servicio HTTP local de scoring (el modelo se carga una sola vez):
+#   python puntuar_lote.py referencia.csv --guardar-modelo modelo.joblib
+#   python servicio_puntuacion.py --modelo modelo.joblib
+#   curl -s localhost:8765/puntuar -d '{"posts": [{"user_id": "a", "text": "hola", "timestamp": "2024-01-01T10:00:00Z", "likes": 0, "replies": 0}]}'
+#   curl -s localhost:8765/metricas
+# Prueba de carga: python prueba_carga.py --url http://127.0.0.1:8765
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de scoring de bots.")
+    parser.add_argument('--modelo', required=True, help="Artefacto entrenado (puntuar_lote.py --guardar-modelo)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--umbral', type=float, default=UMBRAL_POR_DEFECTO)
+    parser.add_argument('--espera-ms', type=float, default=MAX_ESPERA_MS,
+                        help="Presupuesto para juntar peticiones concurrentes en un lote de codificación (0 = sin esperar)")
+    parser.add_argument('--max-textos', type=int, default=MAX_TEXTOS_LOTE, help="Textos por lote de codificación como máximo")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioPuntuacion(cargar_modelo(args.modelo), args.umbral, max_espera_ms=args.espera_ms,
+                                  max_textos=args.max_textos)
+    servidor = crear_servidor(servicio, args.host, args.puerto)
+    print(f"Escuchando en http://{args.host}:{servidor.server_address[1]} (backend {servicio.backend}). Ctrl+C para terminar.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    servidor.server_close()
+    print(json.dumps(servicio.metricas(), indent=1, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
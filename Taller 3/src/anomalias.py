@@ -0,0 +1,76 @@
+# src/anomalias.py
+import numpy as np
+
+# Configuración por defecto = la del modelo original:
+# IsolationForest(n_estimators=100, contamination=0.2, random_state=42)
+N_ESTIMADORES = 100
+CONTAMINACION = 0.2
+SEMILLA = 42
+TAM_BLOQUE_SCORING = 50_000  # Filas por bloque en decision_function (memoria plana)
+MIN_FILAS_PARALELO = 1_000   # Por debajo, puntuar en paralelo cuesta más de lo que ahorra
+
+
+class MotorAnomalias:
+    """
+    Isolation Forest escalable con la interfaz que usa model.py (fit, predict,
+    decision_function):
+    - usa todos los núcleos (n_jobs=-1) para ajustar y puntuar;
+    - puede ajustarse sobre una submuestra de `max_muestras_ajuste` usuarios;
+    - puntúa en bloques de `tam_bloque` filas, así la memoria de decision_function
+      no crece con el número de usuarios;
+    - con n_bosques > 1 promedia varios bosques (semillas distintas) para un
+      risk_score más estable.
+    Con los valores por defecto reproduce exactamente el IsolationForest original.
+    """
+
+    def __init__(self, n_estimadores=N_ESTIMADORES, contaminacion=CONTAMINACION,
+                 max_muestras_ajuste=None, n_bosques=1, tam_bloque=TAM_BLOQUE_SCORING,
+                 n_jobs=-1, semilla=SEMILLA):
+        self.n_estimadores = n_estimadores
+        self.contaminacion = contaminacion
+        self.max_muestras_ajuste = max_muestras_ajuste
+        self.n_bosques = n_bosques
+        self.tam_bloque = tam_bloque
+        self.n_jobs = n_jobs
+        self.semilla = semilla
+        self.bosques_ = []
+
+    def fit(self, X):
+        from sklearn.ensemble import IsolationForest
+
+        X = np.asarray(X)
+        if self.max_muestras_ajuste and len(X) > self.max_muestras_ajuste:
+            rng = np.random.default_rng(self.semilla)
+            X = X[np.sort(rng.choice(len(X), self.max_muestras_ajuste, replace=False))]
+
+        self.bosques_ = [
+            IsolationForest(n_estimators=self.n_estimadores, contamination=self.contaminacion,
+                            random_state=self.semilla + i, n_jobs=self.n_jobs).fit(X)
+            for i in range(self.n_bosques)
+        ]
+        return self
+
+    def _por_bloques(self, X, funcion):
+        from joblib import parallel_backend
+
+        X = np.asarray(X)
+        salida = np.empty(len(X), dtype=np.float64)
+        # IsolationForest sólo usa n_jobs al ajustar; al puntuar lo toma del contexto de joblib
+        n_jobs = self.n_jobs if len(X) >= MIN_FILAS_PARALELO else 1
+        with parallel_backend('threading', n_jobs=n_jobs):
+            for inicio in range(0, len(X), self.tam_bloque):
+                fin = inicio + self.tam_bloque
+                salida[inicio:fin] = funcion(X[inicio:fin])
+        return salida
+
+    def decision_function(self, X):
+        """Media de decision_function de los bosques (negativo = anómalo), por bloques."""
+        def decision(bloque):
+            if len(self.bosques_) == 1:
+                return self.bosques_[0].decision_function(bloque)
+            return np.mean([b.decision_function(bloque) for b in self.bosques_], axis=0)
+        return self._por_bloques(X, decision)
+
+    def predict(self, X):
+        """-1 = anomalía, 1 = normal (mismo criterio que IsolationForest.predict)."""
+        return np.where(self.decision_function(X) < 0, -1, 1)
@@ -0,0 +1,231 @@
+# src/cache_embeddings.py
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+
+    def _bloquear_archivo(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _desbloquear_archivo(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _bloquear_archivo(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _desbloquear_archivo(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+RUTA_CACHE = os.environ.get(
+    "BOTBUSTER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "botbuster", "embeddings"),
+)
+MAX_ENTRADAS = 200_000     # Tope de textos almacenados por modelo
+CAPACIDAD_INICIAL = 1024   # El archivo de vectores crece por duplicación hasta el tope
+BYTES_CLAVE = 16
+
+
+def clave_texto(nombre_modelo, texto):
+    """Clave de contenido: hash del texto limpio (salida de limpiar_texto) más el nombre del modelo."""
+    return hashlib.blake2b(f"{nombre_modelo}\x00{texto}".encode("utf-8"),
+                           digest_size=BYTES_CLAVE).digest()
+
+
+class CacheEmbeddings:
+    """
+    Almacén persistente de embeddings direccionado por contenido.
+    Los vectores viven en un archivo float32 mapeado en memoria (np.memmap) y
+    el índice (claves + último uso) en dos .npy pequeños. Al llegar al tope
+    se desalojan los textos menos usados recientemente (LRU).
+    Es seguro compartirla entre hilos y procesos: cada operación toma un
+    bloqueo de archivo y recarga el índice si otro proceso lo modificó.
+    """
+
+    def __init__(self, nombre_modelo, dim, ruta=RUTA_CACHE, max_entradas=MAX_ENTRADAS):
+        self.nombre_modelo = nombre_modelo
+        self.dim = int(dim)
+        self.max_entradas = int(max_entradas)
+        slug = hashlib.blake2b(nombre_modelo.encode("utf-8"), digest_size=8).hexdigest()
+        self.ruta = os.path.join(ruta, slug)
+        os.makedirs(self.ruta, exist_ok=True)
+
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._version = None
+        with self._bloqueo():
+            pass  # Carga inicial del índice
+
+    # ----------------- Persistencia -----------------
+    def _archivo(self, nombre):
+        return os.path.join(self.ruta, nombre)
+
+    @contextmanager
+    def _bloqueo(self):
+        """Exclusión entre hilos y procesos; refresca el índice si cambió en disco."""
+        with self._lock, open(self._archivo("lock"), "a+b") as f:
+            _bloquear_archivo(f)
+            try:
+                if self._leer_meta().get("version") != self._version or self._version is None:
+                    self._cargar()
+                yield
+            finally:
+                _desbloquear_archivo(f)
+
+    def _leer_meta(self):
+        try:
+            with open(self._archivo("meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir_meta(self, version):
+        tmp = self._archivo("meta.tmp.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"modelo": self.nombre_modelo, "dim": self.dim, "version": version}, f)
+        os.replace(tmp, self._archivo("meta.json"))
+        self._version = version
+
+    def _abrir_vectores(self, capacidad):
+        ruta_vectores = self._archivo("vectores.f32")
+        with open(ruta_vectores, "ab") as f:
+            # Nunca se encoge: otro proceso puede tener el archivo mapeado
+            if f.tell() < capacidad * self.dim * 4:
+                f.truncate(capacidad * self.dim * 4)
+        self._vectores = (np.memmap(ruta_vectores, dtype=np.float32, mode="r+",
+                                    shape=(capacidad, self.dim))
+                          if capacidad > 0 else np.zeros((0, self.dim), dtype=np.float32))
+
+    def _cargar(self):
+        claves = np.zeros((0, BYTES_CLAVE), dtype=np.uint8)
+        uso = np.zeros(0, dtype=np.int64)
+        meta = self._leer_meta()
+        try:
+            if meta.get("modelo") == self.nombre_modelo and meta.get("dim") == self.dim:
+                claves = np.load(self._archivo("claves.npy"))
+                uso = np.load(self._archivo("uso.npy"))
+        except (OSError, ValueError):
+            pass  # Caché inexistente o corrupta: se empieza de cero
+
+        capacidad = len(uso)
+        tam_vectores = os.path.getsize(self._archivo("vectores.f32")) \
+            if os.path.exists(self._archivo("vectores.f32")) else 0
+        if len(claves) != capacidad or tam_vectores < capacidad * self.dim * 4:
+            claves = np.zeros((0, BYTES_CLAVE), dtype=np.uint8)
+            uso = np.zeros(0, dtype=np.int64)
+            capacidad = 0
+
+        self._claves = claves
+        self._uso = uso  # -1 = hueco libre
+        self._abrir_vectores(capacidad)
+        self._slots = {claves[i].tobytes(): i for i in np.flatnonzero(uso >= 0)}
+        self._libres = np.flatnonzero(uso < 0).tolist()
+        self._reloj = int(uso.max()) + 1 if len(uso) else 0
+
+        if capacidad == 0 and meta.get("version") is None:
+            self._escribir_meta(0)
+        else:
+            self._version = meta.get("version")
+
+    def _persistir(self):
+        if isinstance(self._vectores, np.memmap):
+            self._vectores.flush()
+        # Escritura atómica del índice para no dejarlo a medias si se interrumpe
+        for nombre, arr in (("claves", self._claves), ("uso", self._uso)):
+            tmp = self._archivo(f"{nombre}.tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, self._archivo(f"{nombre}.npy"))
+        self._escribir_meta((self._version or 0) + 1)
+
+    # ----------------- Gestión de espacio -----------------
+    def _crecer(self, necesarios):
+        capacidad = len(self._uso)
+        nueva = max(capacidad, CAPACIDAD_INICIAL)
+        while nueva - capacidad + len(self._libres) < necesarios and nueva < self.max_entradas:
+            nueva *= 2
+        nueva = min(nueva, self.max_entradas)
+        if nueva <= capacidad:
+            return
+
+        if isinstance(self._vectores, np.memmap):
+            self._vectores.flush()
+        del self._vectores
+        self._abrir_vectores(nueva)
+        self._claves = np.vstack([self._claves,
+                                  np.zeros((nueva - capacidad, BYTES_CLAVE), dtype=np.uint8)])
+        self._uso = np.concatenate([self._uso, np.full(nueva - capacidad, -1, dtype=np.int64)])
+        self._libres.extend(range(capacidad, nueva))
+
+    def _desalojar(self, cantidad):
+        """Libera los `cantidad` slots usados hace más tiempo (LRU)."""
+        ocupados = np.flatnonzero(self._uso >= 0)
+        cantidad = min(cantidad, len(ocupados))
+        if cantidad <= 0:
+            return
+        viejos = ocupados[np.argpartition(self._uso[ocupados], cantidad - 1)[:cantidad]]
+        for slot in viejos:
+            del self._slots[self._claves[slot].tobytes()]
+        self._uso[viejos] = -1
+        self._libres.extend(viejos.tolist())
+
+    def _reservar(self, n):
+        if len(self._libres) < n:
+            self._crecer(n)
+        if len(self._libres) < n:
+            # Se desaloja al menos un 10% para amortizar el coste
+            self._desalojar(max(n - len(self._libres), self.max_entradas // 10))
+        reservados = self._libres[-n:]
+        del self._libres[-n:]
+        return np.asarray(reservados, dtype=np.int64)
+
+    # ----------------- API pública -----------------
+    def buscar(self, textos):
+        """Devuelve (vectores, encontrados): filas en cero y False para los textos no cacheados."""
+        claves = [clave_texto(self.nombre_modelo, t) for t in textos]
+        vectores = np.zeros((len(textos), self.dim), dtype=np.float32)
+        with self._bloqueo():
+            slots = np.fromiter((self._slots.get(c, -1) for c in claves),
+                                dtype=np.int64, count=len(claves))
+            encontrados = slots >= 0
+            if encontrados.any():
+                vectores[encontrados] = self._vectores[slots[encontrados]]
+                self._uso[slots[encontrados]] = self._reloj
+                self._reloj += 1
+            self.aciertos += int(encontrados.sum())
+            self.fallos += int((~encontrados).sum())
+        return vectores, encontrados
+
+    def guardar(self, textos, vectores):
+        """Añade textos nuevos a la caché (los ya presentes se ignoran)."""
+        vectores = np.asarray(vectores, dtype=np.float32)
+        with self._bloqueo():
+            nuevos = {}
+            for texto, vector in zip(textos, vectores):
+                clave = clave_texto(self.nombre_modelo, texto)
+                if clave not in self._slots:
+                    nuevos[clave] = vector
+            if not nuevos:
+                return
+            # Si llegan más textos que el tope, sólo se conservan los últimos
+            items = list(nuevos.items())[-self.max_entradas:]
+
+            slots = self._reservar(len(items))
+            self._vectores[slots] = np.stack([v for _, v in items])
+            for slot, (clave, _) in zip(slots, items):
+                self._claves[slot] = np.frombuffer(clave, dtype=np.uint8)
+                self._slots[clave] = int(slot)
+            self._uso[slots] = self._reloj
+            self._reloj += 1
+            self._persistir()
+
+    def __len__(self):
+        return len(self._slots)
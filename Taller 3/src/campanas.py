@@ -0,0 +1,271 @@
+# src/campanas.py
+import tempfile
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# Detección de campañas: copias casi idénticas del mismo mensaje publicadas desde
+# muchas cuentas. MinHash sobre shingles de caracteres + LSH por bandas encuentra
+# los textos parecidos en tiempo ~lineal, sin comparar todos los pares de usuarios.
+
+TAM_SHINGLE = 5            # Caracteres por shingle
+N_PERMUTACIONES = 64       # Longitud de la firma MinHash
+N_BANDAS = 16              # LSH: 16 bandas de 4 filas -> umbral de Jaccard ~0.5
+UMBRAL_SIMILITUD = 0.7     # Jaccard estimada mínima para unir dos textos del mismo cubo
+MIN_CARACTERES = 30        # Textos más cortos ("gracias", "jajaja") no forman campaña
+CARACTERES_POR_BLOQUE = 25_000  # Bloques pequeños: los buffers de las 64 pasadas caben en caché
+MIN_COMPACTAR = 1 << 16    # Pares (usuario, texto) pendientes antes de deduplicar
+
+# Permutaciones multiply-add-shift: ((a*x + b) mod 2^64) >> 32, sin módulos caros
+_rng = np.random.default_rng(20240101)
+_COEF_A = _rng.integers(0, 2**63, N_PERMUTACIONES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_COEF_B = _rng.integers(0, 2**63, N_PERMUTACIONES, dtype=np.uint64)
+
+COLUMNAS_CAMPANA = ['posts_campana', 'cuentas_campana']
+
+
+def firmas_minhash(textos, k=TAM_SHINGLE):
+    """
+    Firma MinHash (n_textos × N_PERMUTACIONES, uint32) de cada texto, a partir de sus
+    shingles de k caracteres en minúsculas. Todo vectorizado sobre el corpus concatenado:
+    cada texto debe tener al menos k caracteres.
+    """
+    firmas = np.empty((len(textos), N_PERMUTACIONES), dtype=np.uint32)
+    inicio = 0
+    while inicio < len(textos):
+        # Bloques de ~CARACTERES_POR_BLOQUE caracteres
+        fin, caracteres = inicio, 0
+        while fin < len(textos) and (fin == inicio or caracteres < CARACTERES_POR_BLOQUE):
+            caracteres += len(textos[fin])
+            fin += 1
+        firmas[inicio:fin] = _firmas_bloque(textos[inicio:fin], k)
+        inicio = fin
+    return firmas
+
+
+def _firmas_bloque(textos, k):
+    # Minúsculas antes de medir: algunos caracteres cambian de longitud ('İ' -> 'i̇')
+    textos = [t.lower() for t in textos]
+    longitudes = np.fromiter((len(t) for t in textos), dtype=np.int64, count=len(textos))
+    # UTF-32: un código por carácter, así las posiciones coinciden con len()
+    codigos = np.frombuffer(''.join(textos).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+    # Hash polinómico de cada ventana de k caracteres (aritmética uint64 modular)
+    n_ventanas = len(codigos) - k + 1
+    h = np.zeros(n_ventanas, dtype=np.uint64)
+    for j in range(k):
+        h = h * np.uint64(1_000_003) + codigos[j:j + n_ventanas]
+    h ^= h >> np.uint64(29)
+    x = h & np.uint64(0xFFFFFFFF)
+
+    # Sólo ventanas que no cruzan el final de su texto
+    n_shingles = longitudes - k + 1
+    inicios = np.cumsum(longitudes) - longitudes
+    segmentos = np.cumsum(n_shingles) - n_shingles
+    validas = np.repeat(inicios - segmentos, n_shingles) + np.arange(n_shingles.sum())
+    x = x[validas]
+
+    firmas = np.empty((len(textos), N_PERMUTACIONES), dtype=np.uint32)
+    valores = np.empty_like(x)  # Un único buffer reutilizado por las 64 permutaciones
+    for p in range(N_PERMUTACIONES):
+        np.multiply(x, _COEF_A[p], out=valores)
+        valores += _COEF_B[p]
+        valores >>= np.uint64(32)
+        firmas[:, p] = np.minimum.reduceat(valores, segmentos)
+    return firmas
+
+
+def componentes_lsh(firmas, n_bandas=N_BANDAS, umbral=UMBRAL_SIMILITUD, orden=None):
+    """
+    Agrupa textos casi duplicados: dos textos que coinciden en una banda completa de
+    la firma son candidatos; se unen si su Jaccard estimada >= umbral. Cada cubo une
+    sus miembros con su primer elemento (aristas lineales, no pares). `orden` es la
+    permutación de filas que decide cuál es el primero (por defecto, el de las filas),
+    así `firmas` puede ser un memmap sin copiarlo reordenado. Devuelve la etiqueta de
+    componente conexa de cada fila.
+    """
+    n = len(firmas)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    orden = np.arange(n) if orden is None else np.asarray(orden)
+    filas_banda = firmas.shape[1] // n_bandas
+    origen, destino = [], []
+    for b in range(n_bandas):
+        banda = np.asarray(firmas[:, b * filas_banda:(b + 1) * filas_banda]).astype(np.uint64)[orden]
+        clave = banda[:, 0].copy()
+        for j in range(1, filas_banda):
+            clave = clave * np.uint64(0x100000001B3) ^ banda[:, j]
+        codigos, _ = pd.factorize(clave)
+        primero = np.unique(codigos, return_index=True)[1][codigos]
+        candidatos = np.flatnonzero(primero != np.arange(n))
+        if len(candidatos) == 0:
+            continue
+        similitud = (firmas[orden[candidatos]] == firmas[orden[primero[candidatos]]]).mean(axis=1)
+        unir = similitud >= umbral
+        origen.append(candidatos[unir])
+        destino.append(primero[candidatos[unir]])
+
+    origen = np.concatenate(origen) if origen else np.zeros(0, dtype=np.int64)
+    destino = np.concatenate(destino) if destino else np.zeros(0, dtype=np.int64)
+    grafo = sparse.coo_matrix((np.ones(len(origen), dtype=np.int8), (origen, destino)), shape=(n, n))
+    etiquetas = np.empty(n, dtype=np.int64)
+    etiquetas[orden] = connected_components(grafo, directed=False)[1]
+    return etiquetas
+
+
+class IndiceCampanas:
+    """
+    Índice incremental de textos casi duplicados entre usuarios. Guarda por texto
+    distinto (no el texto) su hash, su nº de posts y su firma MinHash, y los pares
+    (usuario, texto) distintos como enteros, así sirve tanto para procesar_datos como
+    para la ingesta por bloques (actualizar por bloque y fusionar acumuladores).
+    Con en_disco=True las firmas (256 bytes por texto) se escriben en un archivo
+    temporal y en memoria quedan ~24 bytes por texto distinto (hash, fila y conteo en
+    arrays) y 8 por par (usuario, texto) distinto: la huella sigue siendo O(textos
+    distintos) pero ya no crece con las repeticiones ni con el tamaño de la firma.
+    """
+
+    def __init__(self, en_disco=False):
+        self._n = 0
+        self._tabla = []      # Tramos (hashes ordenados, filas) para buscar la fila de un hash
+        self._firmas = tempfile.TemporaryFile() if en_disco else []
+        self._conteo = np.zeros(0, dtype=np.int64)
+        self._usuario = {}    # user_id -> código entero
+        self._pares = []      # Claves uint64 (código de usuario << 32 | fila), deduplicadas al compactar
+        self._pares_guardados = self._pares_pendientes = 0
+
+    def __len__(self):
+        return self._n
+
+    # ----------------- Almacenamiento -----------------
+    def _guardar_firmas(self, firmas):
+        if isinstance(self._firmas, list):
+            self._firmas.append(firmas)
+        else:
+            self._firmas.seek(0, 2)
+            self._firmas.write(np.ascontiguousarray(firmas, dtype=np.uint32).tobytes())
+
+    def firmas(self):
+        """Firmas de todas las filas (un memmap de sólo lectura si están en disco)."""
+        if not self._n:
+            return np.zeros((0, N_PERMUTACIONES), dtype=np.uint32)
+        if isinstance(self._firmas, list):
+            self._firmas = [np.concatenate(self._firmas)]
+            return self._firmas[0]
+        self._firmas.flush()
+        return np.memmap(self._firmas, dtype=np.uint32, mode='r', shape=(self._n, N_PERMUTACIONES))
+
+    def hashes(self):
+        """Hash del texto de cada fila."""
+        por_fila = np.empty(self._n, dtype=np.uint64)
+        for hashes, filas in self._tabla:
+            por_fila[filas] = hashes
+        return por_fila
+
+    def _filas(self, hashes, firmas_de):
+        """Fila de cada hash (distintos); los nuevos se añaden con firmas_de(posiciones de los nuevos)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        filas = np.full(len(hashes), -1, dtype=np.int64)
+        for ordenados, filas_tramo in self._tabla:
+            posicion = np.searchsorted(ordenados, hashes).clip(max=len(ordenados) - 1)
+            encontrado = ordenados[posicion] == hashes
+            filas[encontrado] = filas_tramo[posicion[encontrado]]
+        nuevos = np.flatnonzero(filas < 0)
+        if len(nuevos):
+            filas[nuevos] = self._n + np.arange(len(nuevos))
+            self._n += len(nuevos)
+            self._agregar_tramo(hashes[nuevos], filas[nuevos])
+            self._guardar_firmas(firmas_de(nuevos))
+            self._conteo = np.concatenate([self._conteo, np.zeros(len(nuevos), dtype=np.int64)])
+        return filas
+
+    def _agregar_tramo(self, hashes, filas):
+        # Tramos de tamaño decreciente: uno se funde con el anterior al llegar a su mitad (O(log n) tramos)
+        orden = np.argsort(hashes, kind='stable')
+        self._tabla.append((hashes[orden], filas[orden]))
+        while len(self._tabla) > 1 and 2 * len(self._tabla[-1][0]) >= len(self._tabla[-2][0]):
+            (h2, f2), (h1, f1) = self._tabla.pop(), self._tabla.pop()
+            hashes, filas = np.concatenate([h1, h2]), np.concatenate([f1, f2])
+            orden = np.argsort(hashes, kind='stable')
+            self._tabla.append((hashes[orden], filas[orden]))
+
+    def _codigos(self, user_ids):
+        posiciones, usuarios = pd.factorize(pd.Series(user_ids, dtype=object))
+        for u in usuarios:
+            self._usuario.setdefault(u, len(self._usuario))
+        return np.fromiter((self._usuario[u] for u in usuarios), dtype=np.int64, count=len(usuarios))[posiciones]
+
+    def _agregar_pares(self, codigos, filas):
+        self._pares.append(np.unique((codigos.astype(np.uint64) << np.uint64(32)) | filas.astype(np.uint64)))
+        self._pares_pendientes += len(self._pares[-1])
+        if self._pares_pendientes > max(self._pares_guardados, MIN_COMPACTAR):
+            self._compactar_pares()
+
+    def _compactar_pares(self):
+        self._pares = [np.unique(np.concatenate(self._pares))] if self._pares else []
+        self._pares_guardados = len(self._pares[0]) if self._pares else 0
+        self._pares_pendientes = 0
+
+    def pares(self):
+        """(código de usuario, fila) distintos."""
+        self._compactar_pares()
+        claves = self._pares[0] if self._pares else np.zeros(0, dtype=np.uint64)
+        return (claves >> np.uint64(32)).astype(np.int64), (claves & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+    # ----------------- Actualización -----------------
+    def agregar(self, user_ids, textos):
+        """Incorpora posts (user_id, texto limpio). Los textos cortos se ignoran."""
+        textos = pd.Series(np.asarray(textos, dtype=object), dtype=object)
+        largos = (textos.str.len() >= MIN_CARACTERES).fillna(False).values
+        if not largos.any():
+            return self
+        codigos_usuario = self._codigos(np.asarray(user_ids, dtype=object)[largos])
+        codigos, unicos = pd.factorize(textos[largos])
+        unicos = list(unicos)
+        hashes = pd.util.hash_array(np.asarray(unicos, dtype=object))
+
+        filas = self._filas(hashes, lambda nuevos: firmas_minhash([unicos[i] for i in nuevos]))[codigos]
+        self._conteo += np.bincount(filas, minlength=len(self._conteo))
+        self._agregar_pares(codigos_usuario, filas)
+        return self
+
+    def fusionar(self, otro):
+        """Combina el índice de otro acumulador."""
+        if not len(otro):
+            return self
+        firmas = otro.firmas()
+        filas = self._filas(otro.hashes(), lambda nuevos: np.asarray(firmas[nuevos]))
+        self._conteo += np.bincount(filas, weights=otro._conteo, minlength=len(self._conteo)).astype(np.int64)
+        mapa = self._codigos(np.array(list(otro._usuario), dtype=object))
+        codigos, filas_otro = otro.pares()
+        self._agregar_pares(mapa[codigos], filas[filas_otro])
+        return self
+
+    def rasgos_por_usuario(self):
+        """
+        Por usuario, la campaña (grupo de textos casi duplicados) con más posts en la
+        que participa: posts_campana (posts totales del grupo, de todas las cuentas) y
+        cuentas_campana (cuentas distintas que publicaron en él).
+        """
+        if not len(self):
+            return pd.DataFrame(columns=COLUMNAS_CAMPANA, dtype=np.int64)
+        # Orden canónico por hash: el resultado no depende del orden de llegada de los textos
+        etiquetas = componentes_lsh(self.firmas(), orden=np.argsort(self.hashes(), kind='stable'))
+
+        codigos, filas = self.pares()
+        pares = pd.DataFrame({'user_id': np.array(list(self._usuario), dtype=object)[codigos],
+                              'grupo': etiquetas[filas]}).drop_duplicates()
+        n_grupos = etiquetas.max() + 1
+        posts = np.bincount(etiquetas, weights=self._conteo, minlength=n_grupos).astype(np.int64)
+        cuentas = np.bincount(pares['grupo'].values, minlength=n_grupos)
+
+        pares['posts_campana'] = posts[pares['grupo'].values]
+        pares['cuentas_campana'] = cuentas[pares['grupo'].values]
+        mayor = pares.sort_values(['posts_campana', 'cuentas_campana'], ascending=False, kind='stable')
+        return mayor.groupby('user_id', sort=True)[COLUMNAS_CAMPANA].first()
+
+
+def rasgos_campanas(user_ids, textos):
+    """posts_campana y cuentas_campana por user_id para un corpus completo."""
+    return IndiceCampanas().agregar(user_ids, textos).rasgos_por_usuario()
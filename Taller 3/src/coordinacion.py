@@ -0,0 +1,228 @@
+# src/coordinacion.py
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Grafo de coordinación semántica: qué usuarios "hablan casi igual" (embeddings completos,
+# no sólo las 2 componentes PCA) y además publican en la misma ventana de tiempo.
+# La búsqueda de vecinos es aproximada (índice IVF: k-means + búsqueda exacta dentro de
+# las celdas más cercanas), así nunca se construye la matriz de similitud de todos los pares.
+# Al puntuar sin reentrenar, los vecinos se buscan también en la muestra de usuarios de
+# entrenamiento que guarda el artefacto (referencia_coordinacion): un usuario nuevo se
+# compara con el corpus de referencia y no sólo con los que llegan en la misma carga.
+
+VECINOS = 10                 # k del grafo k-NN
+CANDIDATOS_POR_VECINO = 3    # Se buscan k*3 candidatos: algunos caen fuera de la ventana
+VENTANA_HORAS = 24           # Dos usuarios sólo se enlazan si su actividad está a <= 24 h
+UMBRAL_SIMILITUD = 0.9       # Similitud coseno a partir de la cual un vecino cuenta como coordinado
+MIN_USUARIOS_ANN = 5_000     # Por debajo, búsqueda exacta (por bloques) y sin índice
+N_SONDAS = 5                 # Celdas del índice en las que busca cada usuario
+MAX_MUESTRA_KMEANS = 20_000
+MAX_REFERENCIA = 10_000      # Usuarios de entrenamiento que el artefacto guarda para la coordinación
+
+COLUMNAS_COORDINACION = ['vecinos_coordinados', 'similitud_vecinos']
+
+
+def _normalizar(X):
+    X = np.asarray(X, dtype=np.float32)
+    normas = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(normas > 0, normas, 1)
+
+
+def _vecinos_exactos(Xn, k):
+    from sklearn.neighbors import NearestNeighbors
+
+    # Con vectores normalizados, distancia euclídea² = 2 - 2·coseno; sklearn la calcula por bloques
+    nn = NearestNeighbors(n_neighbors=k + 1, algorithm='brute').fit(Xn)
+    distancias, indices = nn.kneighbors(Xn)
+    return 1 - distancias ** 2 / 2, indices
+
+
+def _fusionar_top(sim_a, idx_a, sim_b, idx_b, k):
+    sim = np.hstack([sim_a, sim_b])
+    idx = np.hstack([idx_a, idx_b])
+    top = np.argpartition(-sim, k - 1, axis=1)[:, :k] if sim.shape[1] > k else np.arange(sim.shape[1])[None, :].repeat(len(sim), 0)
+    return np.take_along_axis(sim, top, 1), np.take_along_axis(idx, top, 1)
+
+
+def _indice_ivf(Xn, semilla=42):
+    """Índice IVF: ~sqrt(n) centroides k-means y la celda de cada fila."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    n = len(Xn)
+    rng = np.random.default_rng(semilla)
+    muestra = Xn[rng.choice(n, min(n, MAX_MUESTRA_KMEANS), replace=False)]
+    centroides = MiniBatchKMeans(n_clusters=int(np.sqrt(n)), random_state=semilla, n_init=1).fit(muestra).cluster_centers_
+    celda = np.empty(n, dtype=np.int64)
+    for inicio in range(0, n, 10_000):
+        celda[inicio:inicio + 10_000] = np.argmax(Xn[inicio:inicio + 10_000] @ centroides.T, axis=1)
+    return centroides, celda
+
+
+def _buscar_ivf(Xq, Xn, centroides, celda, k, n_sondas=N_SONDAS, mismo=False):
+    """
+    k-NN aproximado de cada fila de Xq entre las de Xn (indexadas en `celda`): cada
+    consulta se compara con las filas de sus n_sondas celdas más cercanas.
+    mismo=True si Xq es Xn (sin autoenlaces).
+    """
+    n = len(Xq)
+    n_sondas = min(n_sondas, len(centroides))
+    sondas = np.empty((n, n_sondas), dtype=np.int64)
+    for inicio in range(0, n, 10_000):
+        sim_c = Xq[inicio:inicio + 10_000] @ centroides.T
+        sondas[inicio:inicio + 10_000] = np.argpartition(-sim_c, n_sondas - 1, axis=1)[:, :n_sondas]
+
+    mejor_sim = np.full((n, k), -np.inf, dtype=np.float32)
+    mejor_idx = np.zeros((n, k), dtype=np.int64)
+    miembros_por_celda = pd.Series(np.arange(len(celda))).groupby(celda).agg(list)
+    consultas_por_celda = pd.Series(np.repeat(np.arange(n), n_sondas)).groupby(sondas.ravel()).agg(list)
+    for c, consultas in consultas_por_celda.items():
+        if c not in miembros_por_celda.index:
+            continue
+        miembros = np.asarray(miembros_por_celda[c])
+        consultas = np.asarray(consultas)
+        sim = Xq[consultas] @ Xn[miembros].T
+        if mismo:
+            sim[consultas[:, None] == miembros[None, :]] = -np.inf # Sin autoenlaces
+        kc = min(k, len(miembros))
+        top = np.argpartition(-sim, kc - 1, axis=1)[:, :kc]
+        mejor_sim[consultas], mejor_idx[consultas] = _fusionar_top(
+            mejor_sim[consultas], mejor_idx[consultas],
+            np.take_along_axis(sim, top, 1), miembros[top], k)
+    return mejor_sim, mejor_idx
+
+
+def _vecinos_ivf(Xn, k, n_sondas=N_SONDAS, semilla=42):
+    """k-NN aproximado: ~sqrt(n) celdas k-means; cada usuario se compara con las n_sondas más cercanas."""
+    centroides, celda = _indice_ivf(Xn, semilla)
+    return _buscar_ivf(Xn, Xn, centroides, celda, k, n_sondas, mismo=True)
+
+
+def vecinos_aproximados(X_embeddings, k=VECINOS):
+    """
+    Los k usuarios más parecidos (coseno) a cada usuario, sin incluirse a sí mismo.
+    Devuelve (similitudes, índices), ambas n × k; -inf donde no hay vecino.
+    """
+    Xn = _normalizar(X_embeddings)
+    n = len(Xn)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.float32), np.zeros((n, 0), dtype=np.int64)
+    if n < MIN_USUARIOS_ANN:
+        sim, idx = _vecinos_exactos(Xn, k)
+        # Quitar al propio usuario (no siempre queda primero si hay vectores duplicados)
+        propio = idx == np.arange(n)[:, None]
+        sim = np.where(propio, -np.inf, sim)
+        orden = np.argsort(-sim, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(sim, orden, 1), np.take_along_axis(idx, orden, 1)
+    return _vecinos_ivf(Xn, k)
+
+
+def referencia_coordinacion(X_embeddings, inicio, fin, user_ids, max_usuarios=MAX_REFERENCIA, semilla=42):
+    """
+    Muestra de hasta max_usuarios usuarios de entrenamiento para el artefacto: user_id,
+    embeddings normalizados (float16), ventana de actividad y, si son muchos, su índice IVF.
+    """
+    n = len(X_embeddings)
+    muestra = np.arange(n)
+    if n > max_usuarios:
+        muestra = np.sort(np.random.default_rng(semilla).choice(n, max_usuarios, replace=False))
+    Xn = _normalizar(np.asarray(X_embeddings)[muestra])
+    centroides, celda = _indice_ivf(Xn, semilla) if len(Xn) >= MIN_USUARIOS_ANN else (None, None)
+    return {'user_id': np.asarray(user_ids, dtype=object)[muestra], 'X': Xn.astype(np.float16), 'inicio': np.asarray(inicio, dtype=np.float64)[muestra],
+            'fin': np.asarray(fin, dtype=np.float64)[muestra], 'centroides': centroides, 'celda': celda}
+
+
+def en_carga(referencia, user_ids):
+    """Máscara sobre las filas de la referencia: usuarios que también están en `user_ids`."""
+    # Como texto: el CSV de entrenamiento puede traer ids numéricos y el monitor los recibe como str
+    return pd.Index(referencia['user_id']).astype(str).isin(pd.Index(list(user_ids)).astype(str))
+
+
+def vecinos_en_referencia(X_embeddings, referencia, k=VECINOS):
+    """
+    Los k usuarios de referencia_coordinacion más parecidos (coseno) a cada usuario.
+    Devuelve (similitudes, índices en la referencia), ambas n × k; -inf donde no hay vecino.
+    """
+    Xq = _normalizar(X_embeddings)
+    Xr = referencia['X'].astype(np.float32)
+    k = min(k, len(Xr))
+    if k <= 0 or len(Xq) == 0:
+        return np.zeros((len(Xq), 0), dtype=np.float32), np.zeros((len(Xq), 0), dtype=np.int64)
+    if referencia['centroides'] is not None:
+        return _buscar_ivf(Xq, Xr, referencia['centroides'], referencia['celda'], k)
+    sim = np.empty((len(Xq), k), dtype=np.float32)
+    idx = np.empty((len(Xq), k), dtype=np.int64)
+    for inicio in range(0, len(Xq), 1_000): # Exacta por bloques: como mucho 1000 × MIN_USUARIOS_ANN similitudes
+        bloque = Xq[inicio:inicio + 1_000] @ Xr.T
+        top = np.argpartition(-bloque, k - 1, axis=1)[:, :k]
+        sim[inicio:inicio + 1_000] = np.take_along_axis(bloque, top, 1)
+        idx[inicio:inicio + 1_000] = top
+    return sim, idx
+
+
+def grafo_coordinacion(X_embeddings, inicio, fin, k=VECINOS, ventana_horas=VENTANA_HORAS, referencia=None,
+                       user_ids=None):
+    """
+    Grafo disperso (CSR, pesos = similitud coseno) de los k vecinos semánticos de cada
+    usuario cuya actividad [inicio, fin] (segundos epoch, 0 = desconocida) está a menos de
+    `ventana_horas` de la suya. Sin `referencia` es simétrica, n × n. Con `referencia`
+    (referencia_coordinacion de un artefacto) los vecinos se eligen entre estos usuarios
+    y los de referencia: n × (n + n_referencia), simétrica sólo en el bloque n × n; con
+    `user_ids`, las filas de referencia de usuarios presentes en esta carga se descartan
+    (ya cuentan como vecinos de la carga: no se cuentan dos veces ni uno consigo mismo).
+    """
+    n = len(X_embeddings)
+    sim, idx = vecinos_aproximados(X_embeddings, k * CANDIDATOS_POR_VECINO)
+    inicio = np.asarray(inicio, dtype=np.float64)
+    fin = np.asarray(fin, dtype=np.float64)
+    n_total = n
+    if referencia is not None:
+        sim_r, idx_r = vecinos_en_referencia(X_embeddings, referencia, k * CANDIDATOS_POR_VECINO)
+        if user_ids is not None:
+            sim_r[en_carga(referencia, user_ids)[idx_r]] = -np.inf
+        sim, idx = np.hstack([sim, sim_r]), np.hstack([idx, idx_r + n])
+        inicio, fin = np.r_[inicio, referencia['inicio']], np.r_[fin, referencia['fin']]
+        n_total += len(referencia['X'])
+    ventana = ventana_horas * 3600
+
+    filas = np.repeat(np.arange(n), sim.shape[1])
+    cols = idx.ravel()
+    pesos = sim.ravel()
+    conocidos = (inicio[filas] > 0) & (inicio[cols] > 0)
+    solapan = (inicio[cols] <= fin[filas] + ventana) & (inicio[filas] <= fin[cols] + ventana)
+    validos = np.isfinite(pesos) & conocidos & solapan
+
+    # Los k mejores vecinos dentro de la ventana (los candidatos ya vienen ordenados
+    # sólo en la búsqueda exacta: se reordena por similitud)
+    orden = np.lexsort((-pesos, filas))
+    filas, cols, pesos, validos = filas[orden], cols[orden], pesos[orden], validos[orden]
+    filas, cols, pesos = filas[validos], cols[validos], pesos[validos]
+    rango = np.arange(len(filas)) - np.searchsorted(filas, filas)
+    filas, cols, pesos = filas[rango < k], cols[rango < k], pesos[rango < k]
+
+    grafo = sparse.csr_matrix((pesos.astype(np.float32), (filas, cols)), shape=(n, n_total))
+    if n_total == n:
+        return grafo.maximum(grafo.T).tocsr()
+    propio = grafo[:, :n]
+    return sparse.hstack([propio.maximum(propio.T), grafo[:, n:]]).tocsr()
+
+
+def rasgos_coordinacion(X_embeddings, inicio, fin, k=VECINOS, ventana_horas=VENTANA_HORAS,
+                        umbral=UMBRAL_SIMILITUD, referencia=None, user_ids=None):
+    """
+    Por usuario (mismo orden que X_embeddings):
+    - vecinos_coordinados: vecinos del grafo con similitud >= umbral;
+    - similitud_vecinos: similitud media con sus vecinos del grafo (densidad semántica).
+    Con `referencia` los vecinos pueden ser también usuarios de entrenamiento (ver
+    grafo_coordinacion). Devuelve (DataFrame, grafo).
+    """
+    grafo = grafo_coordinacion(X_embeddings, inicio, fin, k, ventana_horas, referencia, user_ids)
+    grado = np.diff(grafo.indptr)
+    fuertes = grafo.multiply(grafo >= umbral)
+    suma = np.asarray(grafo.sum(axis=1)).ravel()
+    df = pd.DataFrame({
+        'vecinos_coordinados': np.diff(fuertes.tocsr().indptr),
+        'similitud_vecinos': np.divide(suma, grado, out=np.zeros(len(grado)), where=grado > 0),
+    })
+    return df, grafo
@@ -0,0 +1,132 @@
+# src/embeddings.py
+import numpy as np
+from .instrumentacion import medir
+
+DIM_EMBEDDING = 768  # Dimensión de salida de BETO
+BATCH_SIZE = 256
+# Padding máximo por lote, en caracteres (aprox. proporcional a tokens): los textos
+# cortos van en lotes de BATCH_SIZE y los largos en lotes más pequeños.
+PRESUPUESTO_CARACTERES = BATCH_SIZE * 200
+
+
+def _dimension_modelo(model):
+    """Obtiene la dimensión de los embeddings del modelo (768 para BETO)."""
+    obtener_dim = getattr(model, "get_sentence_embedding_dimension", None)
+    dim = obtener_dim() if obtener_dim is not None else None
+    return dim or DIM_EMBEDDING
+
+
+def aplanar_textos(textos_por_usuario):
+    """
+    Aplana las listas de textos de cada usuario en un único corpus.
+    Devuelve el corpus y los offsets (estilo CSR): los textos del usuario i
+    son corpus[offsets[i]:offsets[i + 1]]. Un TextosUsuarios ya está en ese formato.
+    """
+    if hasattr(textos_por_usuario, 'offsets'):
+        return textos_por_usuario.textos, textos_por_usuario.offsets
+    conteos = np.fromiter((len(t) for t in textos_por_usuario), dtype=np.int64,
+                          count=len(textos_por_usuario))
+    offsets = np.zeros(len(conteos) + 1, dtype=np.int64)
+    np.cumsum(conteos, out=offsets[1:])
+    corpus = [texto for textos in textos_por_usuario for texto in textos]
+    return corpus, offsets
+
+
+def lotes_por_longitud(longitudes, presupuesto=PRESUPUESTO_CARACTERES, max_lote=BATCH_SIZE):
+    """
+    Corta una secuencia de longitudes ya ordenada (ascendente) en cubetas [(inicio, fin)]
+    de textos de longitud parecida, donde n_textos * longitud_máxima <= presupuesto.
+    """
+    lotes = []
+    inicio, n = 0, len(longitudes)
+    while inicio < n:
+        fin = inicio + 1
+        while fin < n and fin - inicio < max_lote and (fin - inicio + 1) * max(int(longitudes[fin]), 1) <= presupuesto:
+            fin += 1
+        lotes.append((inicio, fin))
+        inicio = fin
+    return lotes
+
+
+def codificar_corpus(model, corpus, batch_size=BATCH_SIZE):
+    """
+    Codifica todo el corpus en cubetas de longitud parecida (menos padding)
+    y devuelve los vectores en el orden original.
+    Si el modelo ofrece encode_lotes(lista_de_lotes) (p. ej. el codificador
+    multiproceso) recibe todas las cubetas de una vez y debe devolverlas en orden.
+    """
+    if len(corpus) == 0:
+        return np.zeros((0, _dimension_modelo(model)), dtype=np.float32)
+
+    longitudes = np.fromiter((len(t) for t in corpus), dtype=np.int64, count=len(corpus))
+    orden = np.argsort(longitudes, kind="stable")
+    ordenados = [corpus[i] for i in orden]
+    lotes = [ordenados[i:j] for i, j in lotes_por_longitud(longitudes[orden], max_lote=batch_size)]
+
+    if hasattr(model, "encode_lotes"):
+        partes = model.encode_lotes(lotes)
+    else:
+        partes = [model.encode(lote, batch_size=len(lote), convert_to_numpy=True) for lote in lotes]
+    vectores = np.vstack([np.asarray(p) for p in partes])
+
+    salida = np.empty_like(vectores)
+    salida[orden] = vectores
+    return salida
+
+
+def promediar_por_usuario(vectores, offsets):
+    """Reduce los vectores del corpus a la media por usuario con operaciones por segmento."""
+    n_usuarios = len(offsets) - 1
+    dim = vectores.shape[1]
+    conteos = np.diff(offsets)
+    con_textos = conteos > 0
+
+    medias = np.zeros((n_usuarios, dim), dtype=np.float64)
+    if con_textos.any():
+        # reduceat sólo es correcto en segmentos no vacíos
+        sumas = np.add.reduceat(vectores.astype(np.float64, copy=False),
+                                offsets[:-1][con_textos], axis=0)
+        medias[con_textos] = sumas / conteos[con_textos, None]
+    return medias
+
+
+def deduplicar(corpus):
+    """Devuelve los textos distintos (en orden de aparición) y el índice inverso."""
+    indices = {}
+    inverso = np.fromiter((indices.setdefault(t, len(indices)) for t in corpus),
+                          dtype=np.int64, count=len(corpus))
+    return list(indices), inverso
+
+
+def codificar_con_cache(model, textos, batch_size=BATCH_SIZE, cache=None):
+    """Codifica sólo los textos que no estén ya en la caché persistente."""
+    if cache is None:
+        return codificar_corpus(model, textos, batch_size=batch_size)
+
+    vectores, encontrados = cache.buscar(textos)
+    faltantes = np.flatnonzero(~encontrados)
+    if len(faltantes) > 0:
+        textos_faltantes = [textos[i] for i in faltantes]
+        nuevos = codificar_corpus(model, textos_faltantes, batch_size=batch_size)
+        vectores[faltantes] = nuevos
+        cache.guardar(textos_faltantes, nuevos)
+    return vectores
+
+
+def generar_embeddings(model, textos_por_usuario, batch_size=BATCH_SIZE, cache=None):
+    """
+    Embedding promedio de cada usuario codificando todo el corpus de una vez,
+    en lugar de una llamada a model.encode por usuario.
+    textos_por_usuario: TextosUsuarios (CSR) o una lista de listas de textos.
+    Cada texto distinto se codifica una sola vez y, si se pasa una caché,
+    sólo si nunca se había visto antes.
+    Los usuarios sin textos reciben un vector de ceros.
+    """
+    corpus, offsets = aplanar_textos(textos_por_usuario)
+    if len(corpus) == 0:
+        return np.zeros((len(offsets) - 1, _dimension_modelo(model)))
+
+    unicos, inverso = deduplicar(corpus)
+    with medir('codificacion', filas=len(unicos), cache=cache):
+        vectores_unicos = codificar_con_cache(model, unicos, batch_size=batch_size, cache=cache)
+    return promediar_por_usuario(vectores_unicos[inverso], offsets)
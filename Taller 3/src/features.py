@@ -1,75 +1,137 @@
 # src/features.py
 import pandas as pd
-import numpy as np
-import re
-from .preprocess import limpiar_texto, calcular_ttr, detectar_repeticion
+from .preprocess import limpiar_textos
+from .lexico import metricas_lexicas
+from .campanas import rasgos_campanas
+from .temporal import rasgos_temporales, COLUMNAS_TEMPORALES
+from .instrumentacion import medir, medido
 
+COLUMNAS_METRICAS = [
+    'user_id', 'num_posts', 'intervalo_medio', 'frecuencia_diaria', 'nocturnidad',
+    *COLUMNAS_TEMPORALES,
+    'avg_likes', 'avg_replies', 'ttr', 'tasa_repeticion', 'longitud_promedio',
+    'posts_campana', 'cuentas_campana', 'inicio_actividad', 'fin_actividad'
+]
+# Desfase al final de un timestamp de texto con hora ('...T03:00:00+02:00', '... 03:00-0500')
+_DESFASE = r'\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*([+-])(\d{2}):?(\d{2})$'
+
+
+def parsear_tiempos(valores):
+    """
+    Timestamps -> (instantes en UTC sin zona, hora del día local). La hora local es la
+    del reloj de quien escribió el timestamp: la de su propio desfase, o tal cual si no
+    trae zona. Batch, por bloques y en vivo usan esta misma convención; los desfases
+    mezclados no fallan. No parseables -> NaT / NaN.
+    """
+    serie = pd.Series(valores)
+    try:
+        tiempos = pd.to_datetime(serie, errors='coerce')
+    except ValueError: # Desfases distintos en la misma serie
+        tiempos = None
+    if tiempos is not None:
+        instantes = tiempos.dt.tz_convert(None) if tiempos.dt.tz is not None else tiempos
+        return instantes, tiempos.dt.hour
+    instantes = pd.to_datetime(serie, errors='coerce', utc=True).dt.tz_convert(None)
+    desfase = serie.astype(str).str.extract(_DESFASE)
+    minutos = (desfase[1].astype(float) * 60 + desfase[2].astype(float)) * desfase[0].map({'+': 1, '-': -1})
+    locales = instantes + pd.to_timedelta(minutos.fillna(0).values, unit='min')
+    return instantes, locales.dt.hour
+
+
+def segundos_epoch(tiempos):
+    """Timestamps a segundos desde 1970 (float; NaT -> NaN)."""
+    if tiempos.dt.tz is not None:
+        tiempos = tiempos.dt.tz_convert(None)
+    return (tiempos - pd.Timestamp(0)).dt.total_seconds()
+
+@medido('procesar_datos')
 def procesar_datos(df_input):
     """
     Realiza la limpieza de textos, calcula las métricas conductuales y léxicas,
-    y devuelve dos DataFrames: uno agrupado por usuario (df_users) y uno 
-    detallado por post (df_processed_posts).
+    y devuelve dos DataFrames: uno agrupado por usuario (df_users) y uno
+    detallado por post (df_processed_posts), con los posts agrupados por usuario
+    en el orden de df_users: TextosUsuarios.desde_posts los usa sin copiarlos.
+    Todas las métricas se calculan con pasadas sobre el DataFrame completo
+    (groupby + agg), sin bucles de Python por usuario.
     """
-    df = df_input.copy() 
-    
+    df = df_input[['user_id', 'text', 'timestamp', 'likes', 'replies']].copy()
+    df = df[df['user_id'].notna()] # groupby descarta los user_id nulos
+
     # Limpieza inicial
-    df["text_limpio"] = df["text"].apply(limpiar_texto)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    
-    # --- A. Rasgos de Comportamiento (Agrupación) ---
-    metrics = []
-    processed_posts = []
-
-    for user_id, group in df.groupby('user_id'):
-        # 1. Temporales
-        tiempos = group['timestamp'].sort_values()
-        if len(tiempos) > 1:
-            diffs = tiempos.diff().dt.total_seconds().dropna() / 60 # Minutos
-            intervalo_medio = diffs.mean()
-            # Frecuencia: Posts por día (aprox)
-            rango_dias = (tiempos.max() - tiempos.min()).days
-            frecuencia = len(tiempos) / (rango_dias if rango_dias > 0 else 1)
-        else:
-            intervalo_medio = 0
-            frecuencia = 1 # 1 post en 1 dia hipotético
-
-        # 2. Actividad Nocturna (00:00 - 06:00)
-        horas = tiempos.dt.hour
-        nocturnidad = ((horas >= 0) & (horas < 6)).sum() / len(tiempos)
-
-        # 3. Interacciones
-        avg_likes = group['likes'].mean()
-        avg_replies = group['replies'].mean()
-
-        # 4. Léxicos
-        textos = group['text_limpio'].tolist()
-        ttr = calcular_ttr(textos)
-        repeticion = detectar_repeticion(textos)
-        avg_len = np.mean([len(t.split()) for t in textos]) if textos else 0
-
-        metrics.append({
-            'user_id': user_id,
-            'num_posts': len(group),
-            'intervalo_medio': intervalo_medio,
-            'frecuencia_diaria': frecuencia,
-            'nocturnidad': nocturnidad,
-            'avg_likes': avg_likes,
-            'avg_replies': avg_replies,
-            'ttr': ttr, 
-            'tasa_repeticion': repeticion, 
-            'longitud_promedio': avg_len,
-            'textos_raw': textos # Guardamos para embeddings
-        })
-        
-        # Almacenar posts limpios para la tabla didáctica (un post por fila)
-        for original_text, clean_text in zip(group['text'], group['text_limpio']):
-            processed_posts.append({
-                'user_id': user_id,
-                'texto_original': original_text,
-                'texto_limpio': clean_text,
-            })
-    
-    df_metrics = pd.DataFrame(metrics).fillna(0) # Aplicar fillna(0) aquí
-    df_processed_posts = pd.DataFrame(processed_posts)
-
-    return df_metrics, df_processed_posts
\ No newline at end of file
+    with medir('limpieza', filas=len(df)):
+        df["text_limpio"] = limpiar_textos(df["text"])
+    df['timestamp'], df['hora'] = parsear_tiempos(df['timestamp'])
+
+    if df.empty:
+        return (pd.DataFrame(columns=COLUMNAS_METRICAS),
+                pd.DataFrame(columns=['user_id', 'texto_original', 'texto_limpio']))
+
+    # Posts agrupados por usuario manteniendo el orden original dentro de cada uno
+    df = df.sort_values('user_id', kind='stable')
+    por_usuario = df.groupby('user_id', sort=True)
+    num_posts = por_usuario.size()
+
+    # --- A. Rasgos de Comportamiento ---
+    # 1. Temporales: un único orden global por (user_id, timestamp); NaT al final
+    tiempos = df[['user_id', 'timestamp']].sort_values(['user_id', 'timestamp'], kind='stable')
+    por_usuario_t = tiempos.groupby('user_id', sort=True)['timestamp']
+    diffs = por_usuario_t.diff().dt.total_seconds() / 60 # Minutos
+    intervalo_medio = diffs.groupby(tiempos['user_id'], sort=True).mean()
+    intervalo_medio = intervalo_medio.where(num_posts > 1, 0)
+
+    # Frecuencia: Posts por día (aprox); 1 post en 1 día hipotético
+    rango_dias = (por_usuario_t.max() - por_usuario_t.min()).dt.days
+    frecuencia = num_posts / rango_dias.where(rango_dias > 0, 1)
+    frecuencia = frecuencia.where(num_posts > 1, 1)
+
+    # 2. Actividad Nocturna (00:00 - 06:00)
+    horas = df['hora']
+    es_nocturno = ((horas >= 0) & (horas < 6))
+    nocturnidad = es_nocturno.groupby(df['user_id'], sort=True).sum() / num_posts
+
+    # Ráfagas y cadencia (picos por ventana, regularidad de intervalos, entropía horaria)
+    with medir('rafagas', filas=len(tiempos)):
+        df_temporal = rasgos_temporales(por_usuario_t.ngroup().values, tiempos['timestamp'].values, len(num_posts))
+    df_temporal.index = num_posts.index
+
+    # 3. Interacciones
+    interacciones = por_usuario[['likes', 'replies']].mean()
+
+    # 4. Léxicos: TTR, repetición y longitud desde una matriz dispersa usuario×token
+    with medir('lexico', filas=len(df)):
+        df_lexico, _, _ = metricas_lexicas(por_usuario.ngroup().values, df['text_limpio'], len(num_posts))
+    df_lexico.index = num_posts.index
+
+    # 5. Campañas: textos casi duplicados publicados desde varias cuentas (MinHash/LSH)
+    with medir('campanas', filas=len(df)):
+        campanas = rasgos_campanas(df['user_id'].values, df['text_limpio'].values)
+    campanas = campanas.reindex(num_posts.index, fill_value=0)
+
+    df_metrics = pd.DataFrame({
+        'num_posts': num_posts,
+        'intervalo_medio': intervalo_medio,
+        'frecuencia_diaria': frecuencia,
+        'nocturnidad': nocturnidad,
+        **{c: df_temporal[c] for c in COLUMNAS_TEMPORALES},
+        'avg_likes': interacciones['likes'],
+        'avg_replies': interacciones['replies'],
+        'ttr': df_lexico['ttr'],
+        'tasa_repeticion': df_lexico['tasa_repeticion'],
+        'longitud_promedio': df_lexico['longitud_promedio'],
+        'posts_campana': campanas['posts_campana'],
+        'cuentas_campana': campanas['cuentas_campana'],
+        # Ventana de actividad (epoch, 0 = sin timestamps válidos) para el grafo de coordinación
+        'inicio_actividad': segundos_epoch(por_usuario_t.min()),
+        'fin_actividad': segundos_epoch(por_usuario_t.max()),
+    })
+    df_metrics.index.name = 'user_id'
+    df_metrics = df_metrics.reset_index()[COLUMNAS_METRICAS].fillna(0)
+
+    # Posts limpios para la tabla didáctica (un post por fila)
+    df_processed_posts = pd.DataFrame({
+        'user_id': df['user_id'].values,
+        'texto_original': df['text'].values,
+        'texto_limpio': df['text_limpio'].values,
+    })
+
+    return df_metrics, df_processed_posts
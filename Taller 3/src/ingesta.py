@@ -0,0 +1,231 @@
+# src/ingesta.py
+from itertools import chain
+import numpy as np
+import pandas as pd
+from .preprocess import limpiar_textos
+from .lexico import hashes_estables, ConteoDistintos
+from .features import COLUMNAS_METRICAS, parsear_tiempos, segundos_epoch
+from .campanas import IndiceCampanas
+from .temporal import rasgos_temporales, TiemposRecientes, COLUMNAS_TEMPORALES
+from .embeddings import _dimension_modelo, deduplicar, codificar_con_cache
+from .model import muestra_por_hash
+
+COLUMNAS_ENTRADA = ['user_id', 'text', 'timestamp', 'likes', 'replies']
+TAM_BLOQUE = 100_000
+K_DISTINTOS = 4096  # Hashes por boceto de tokens/textos distintos de cada usuario
+
+# Estadísticos sumables por usuario y cómo se fusionan dos acumuladores
+AGREGACION = {
+    'num_posts': 'sum', 'n_validos': 'sum', 'ts_min': 'min', 'ts_max': 'max',
+    'nocturnos': 'sum', 'suma_likes': 'sum', 'n_likes': 'sum',
+    'suma_replies': 'sum', 'n_replies': 'sum', 'n_tokens': 'sum',
+}
+
+
+def leer_csv_por_bloques(ruta, tam_bloque=TAM_BLOQUE):
+    """Lee sólo las columnas necesarias del CSV en bloques de `tam_bloque` filas."""
+    return pd.read_csv(ruta, usecols=COLUMNAS_ENTRADA, chunksize=tam_bloque)
+
+
+class AcumuladorUsuarios:
+    """
+    Estado fusionable por usuario para calcular las métricas de procesar_datos
+    sin tener todos los comentarios en memoria: conteos, sumas, timestamps
+    mínimo/máximo, posts nocturnos, tokens, bocetos KMV de tokens/textos distintos
+    (para TTR y repetición: exactos hasta K_DISTINTOS distintos por usuario, como
+    mucho 32 KB cada uno), firmas MinHash de los textos (para campañas) y los
+    últimos MAX_TIEMPOS_USUARIO timestamps de cada usuario (para ráfagas y cadencia,
+    ver TiemposRecientes: exactos salvo en usuarios con más timestamps que el tope).
+    Cada usuario recibe un código entero al aparecer; tiempos y embeddings se indexan
+    por ese código. Cada bloque se descarta después de actualizar().
+
+    Si se pasa un modelo, también acumula la suma de embeddings por usuario
+    para obtener X_embeddings al final sin guardar los textos.
+    """
+
+    def __init__(self, model=None, cache=None):
+        self.model = model
+        self.cache = cache
+        self._stats = pd.DataFrame(columns=list(AGREGACION))
+        self._tokens = {}  # user_id -> ConteoDistintos(hash de token)
+        self._textos = {}  # user_id -> ConteoDistintos(hash de texto limpio)
+        self._campanas = IndiceCampanas(en_disco=True)
+        self._codigo = {}  # user_id -> código entero (orden de aparición)
+        self._tiempos = TiemposRecientes()
+        self._suma_emb = np.zeros((0, _dimension_modelo(model) if model is not None else 0))
+
+    # ----------------- Actualización por bloque -----------------
+    def actualizar(self, bloque):
+        """Incorpora un bloque de comentarios crudos (columnas user_id, text, timestamp, likes, replies)."""
+        bloque = bloque[bloque['user_id'].notna()]
+        if bloque.empty:
+            return self
+        user_id = bloque['user_id']
+        codigos = self._codigos_usuario(user_id.values)
+        textos = limpiar_textos(bloque['text'])
+        tiempos, horas = parsear_tiempos(bloque['timestamp'])
+        listas = [t.split() for t in textos]
+        n_tokens = np.fromiter((len(l) for l in listas), dtype=np.int64, count=len(listas))
+
+        stats = pd.DataFrame({
+            'num_posts': 1,
+            'n_validos': tiempos.notna().values,
+            'ts_min': tiempos.values,
+            'ts_max': tiempos.values,
+            'nocturnos': ((horas >= 0) & (horas < 6)).values,
+            'suma_likes': bloque['likes'].fillna(0).values,
+            'n_likes': bloque['likes'].notna().values,
+            'suma_replies': bloque['replies'].fillna(0).values,
+            'n_replies': bloque['replies'].notna().values,
+            'n_tokens': n_tokens,
+        }, index=user_id.values).groupby(level=0).agg(AGREGACION)
+        self._fusionar_stats(stats)
+
+        # Hashes distintos (usuario, token) y (usuario, texto); se deduplican por bloque antes del bucle
+        tokens = pd.DataFrame({
+            'user_id': np.repeat(user_id.values, n_tokens),
+            'h': hashes_estables(list(chain.from_iterable(listas))),
+        }).drop_duplicates()
+        self._agregar_hashes(self._tokens, tokens)
+        textos_h = pd.DataFrame({
+            'user_id': user_id.values,
+            'h': hashes_estables(textos.values),
+        }).drop_duplicates()
+        self._agregar_hashes(self._textos, textos_h)
+        self._campanas.agregar(user_id.values, textos.values)
+        validos = tiempos.notna().values
+        self._tiempos.agregar(codigos[validos], tiempos.values[validos].astype('datetime64[ms]').astype(np.int64))
+
+        if self.model is not None:
+            self._acumular_embeddings(codigos, textos.tolist())
+        return self
+
+    def _fusionar_stats(self, stats):
+        if self._stats.empty:
+            self._stats = stats
+        else:
+            self._stats = pd.concat([self._stats, stats]).groupby(level=0).agg(AGREGACION)
+
+    @staticmethod
+    def _agregar_hashes(destino, pares):
+        for user_id, hashes in pares.groupby('user_id', sort=False)['h']:
+            destino.setdefault(user_id, ConteoDistintos(K_DISTINTOS)).agregar(hashes.values)
+
+    def _codigos_usuario(self, user_ids):
+        """Código entero de cada user_id; los nuevos reciben el siguiente libre."""
+        posiciones, usuarios = pd.factorize(pd.Series(user_ids, dtype=object))
+        for u in usuarios:
+            self._codigo.setdefault(u, len(self._codigo))
+        return np.fromiter((self._codigo[u] for u in usuarios), dtype=np.int64, count=len(usuarios))[posiciones]
+
+    def _crecer_embeddings(self):
+        """Una fila de _suma_emb por código de usuario."""
+        faltan = len(self._codigo) - len(self._suma_emb)
+        if faltan > 0:
+            self._suma_emb = np.vstack([self._suma_emb, np.zeros((faltan, self._suma_emb.shape[1]))])
+
+    def _acumular_embeddings(self, codigos, textos):
+        unicos, inverso = deduplicar(textos)
+        vectores = codificar_con_cache(self.model, unicos, cache=self.cache)[inverso]
+        orden = np.argsort(codigos, kind='stable')
+        inicios = np.flatnonzero(np.r_[True, np.diff(codigos[orden]) != 0])
+        sumas = np.add.reduceat(vectores[orden].astype(np.float64), inicios, axis=0)
+        self._crecer_embeddings()
+        self._suma_emb[codigos[orden][inicios]] += sumas
+
+    # ----------------- Fusión y resultado -----------------
+    def fusionar(self, otro):
+        """Combina el estado de otro acumulador (p. ej. de otro archivo o proceso)."""
+        self._fusionar_stats(otro._stats)
+        for propio, ajeno in ((self._tokens, otro._tokens), (self._textos, otro._textos)):
+            for user_id, conteo in ajeno.items():
+                propio.setdefault(user_id, ConteoDistintos(K_DISTINTOS)).agregar(conteo.hashes)
+        self._campanas.fusionar(otro._campanas)
+        mapa = self._codigos_usuario(np.array(list(otro._codigo), dtype=object))  # código de otro -> propio
+        self._tiempos.fusionar(otro._tiempos, mapa)
+        if otro.model is not None and len(otro._suma_emb):
+            if self._suma_emb.shape[1] == 0:
+                self._suma_emb = np.zeros((0, otro._suma_emb.shape[1]))
+            self._crecer_embeddings()
+            self._suma_emb[mapa[:len(otro._suma_emb)]] += otro._suma_emb
+        return self
+
+    def resultado(self):
+        """
+        Devuelve df_users con las mismas métricas que procesar_datos
+        y, si se acumularon embeddings, X_embeddings alineado con sus filas.
+        """
+        stats = self._stats.sort_index()
+        num_posts = stats['num_posts'].astype(np.int64)
+
+        # intervalo medio = media de diferencias consecutivas = rango / (n - 1)
+        rango = stats['ts_max'] - stats['ts_min']
+        intervalo = rango.dt.total_seconds() / 60 / (stats['n_validos'] - 1)
+        intervalo = intervalo.where((num_posts > 1) & (stats['n_validos'] > 1), 0)
+        rango_dias = rango.dt.days
+        frecuencia = (num_posts / rango_dias.where(rango_dias > 0, 1)).where(num_posts > 1, 1)
+
+        n_tipos = pd.Series({u: len(h) for u, h in self._tokens.items()}, dtype=np.int64)
+        n_distintos = pd.Series({u: len(h) for u, h in self._textos.items()}, dtype=np.int64)
+        n_tokens = stats['n_tokens']
+        # Por encima de K_DISTINTOS el boceto estima: nunca más distintos que tokens o posts
+        n_tipos = np.minimum(n_tipos.reindex(stats.index, fill_value=0), n_tokens)
+        n_distintos = np.minimum(n_distintos.reindex(stats.index, fill_value=0), num_posts)
+        campanas = self._campanas.rasgos_por_usuario().reindex(stats.index, fill_value=0)
+        fila = np.empty(len(self._codigo), dtype=np.int64)  # código -> fila de stats
+        fila[[self._codigo[u] for u in stats.index]] = np.arange(len(stats))
+        codigos, ms = self._tiempos.arrays()
+        df_temporal = rasgos_temporales(fila[codigos], ms.astype('datetime64[ms]'), len(stats))
+        df_temporal.index = stats.index
+
+        df_users = pd.DataFrame({
+            'num_posts': num_posts,
+            'intervalo_medio': intervalo,
+            'frecuencia_diaria': frecuencia,
+            'nocturnidad': stats['nocturnos'] / num_posts,
+            **{c: df_temporal[c] for c in COLUMNAS_TEMPORALES},
+            'avg_likes': stats['suma_likes'] / stats['n_likes'],
+            'avg_replies': stats['suma_replies'] / stats['n_replies'],
+            'ttr': (n_tipos / n_tokens).where(n_tokens > 0, 0),
+            'tasa_repeticion': ((num_posts - n_distintos) / num_posts).where(num_posts >= 2, 0),
+            'longitud_promedio': n_tokens / num_posts,
+            'posts_campana': campanas['posts_campana'],
+            'cuentas_campana': campanas['cuentas_campana'],
+            'inicio_actividad': segundos_epoch(stats['ts_min']),
+            'fin_actividad': segundos_epoch(stats['ts_max']),
+        }, index=stats.index)
+        df_users.index.name = 'user_id'
+        df_users = df_users.reset_index()[COLUMNAS_METRICAS].fillna(0)
+
+        X_embeddings = None
+        if self.model is not None:
+            filas = [self._codigo[u] for u in df_users['user_id']]
+            X_embeddings = self._suma_emb[filas] / num_posts.values[:, None]
+        return df_users, X_embeddings
+
+
+def muestra_textos_csv(ruta, tam_bloque=TAM_BLOQUE, k=2000):
+    """
+    Pasada previa de memoria acotada: muestra_por_hash de los textos limpios de todo el CSV
+    (la misma muestra que toma el modo batch sobre el corpus completo).
+    """
+    muestra = []
+    for bloque in pd.read_csv(ruta, usecols=['user_id', 'text'], chunksize=tam_bloque):
+        textos = limpiar_textos(bloque.loc[bloque['user_id'].notna(), 'text'])
+        muestra = muestra_por_hash(muestra + textos.tolist(), k)
+    return muestra
+
+
+def procesar_csv_por_bloques(ruta, tam_bloque=TAM_BLOQUE, model=None, cache=None):
+    """
+    Modo streaming de procesar_datos: lee el CSV por bloques y sólo mantiene el
+    estado por usuario, así la memoria pico depende del número de usuarios y no
+    del de comentarios. Devuelve (df_users, X_embeddings o None).
+    """
+    if getattr(model, 'necesita_ajuste', False):
+        # Base dependiente del corpus (hash-svd): se ajusta con la muestra de todo el archivo, no del primer bloque
+        model.ajustar(muestra_textos_csv(ruta, tam_bloque, model.MAX_TEXTOS_AJUSTE))
+    acumulador = AcumuladorUsuarios(model=model, cache=cache)
+    for bloque in leer_csv_por_bloques(ruta, tam_bloque):
+        acumulador.actualizar(bloque)
+    return acumulador.resultado()
@@ -0,0 +1,191 @@
+# src/instrumentacion.py
+import cProfile
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# Instrumentación por etapa: tiempo de pared, filas/s, RSS pico y aciertos de caché.
+# Las etapas del pipeline llaman a medir(...); si no hay un RegistroEtapas activo en el
+# contexto (hilo/sesión) actual, medir no hace nada y el coste es despreciable.
+
+_registro_actual = ContextVar('registro_etapas', default=None)
+
+
+# --- Memoria del proceso ---
+def _leer_status(campo):
+    """Valor en MB de un campo de /proc/self/status (VmRSS, VmHWM), o None fuera de Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith(campo + ':'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reiniciar_pico():
+    """Reinicia el pico de RSS del proceso (Linux: clear_refs 5). Devuelve si fue posible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_pico_mb():
+    """Pico de RSS (MB) desde el último reinicio, o desde el arranque si no se puede reiniciar."""
+    pico = _leer_status('VmHWM')
+    if pico is not None:
+        return pico
+    try:
+        import resource
+        import sys
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 2**20 if sys.platform == 'darwin' else maximo / 1024 # macOS: bytes
+    except ImportError: # Windows
+        return None
+
+
+class RegistroEtapas:
+    """
+    Registro de las etapas de una ejecución. Cada etapa queda como un dict:
+    etapa, segundos, filas, filas_por_s, rss_pico_mb y, si se pasó una caché,
+    aciertos_cache, fallos_cache y tasa_aciertos. Las etapas anidadas se nombran
+    'padre/hija'.
+    """
+
+    def __init__(self, **contexto):
+        self.contexto = contexto  # p. ej. archivo, backend: se añade a cada línea JSON
+        self.etapas = []
+        self._pila = []
+        self._pico_reiniciable = None
+
+    @contextmanager
+    def activar(self):
+        """Hace de este registro el destino de medir() en el contexto actual."""
+        token = _registro_actual.set(self)
+        try:
+            yield self
+        finally:
+            _registro_actual.reset(token)
+
+    def fijar_como_actual(self):
+        """Como activar(), sin bloque with: para scripts (Streamlit) que se re-ejecutan enteros."""
+        _registro_actual.set(self)
+        return self
+
+    @contextmanager
+    def etapa(self, nombre, filas=None, cache=None):
+        """Mide el bloque. El dict devuelto admite fijar 'filas' u otros campos dentro del bloque."""
+        padre = self._pila[-1] if self._pila else None
+        registro = {'etapa': f"{padre['etapa']}/{nombre}" if padre else nombre, 'filas': filas}
+        registro['_pico_hijas'] = 0.0
+        if self._pico_reiniciable is None:
+            self._pico_reiniciable = _reiniciar_pico()
+        elif self._pico_reiniciable:
+            _reiniciar_pico()
+        aciertos0 = getattr(cache, 'aciertos', 0)
+        fallos0 = getattr(cache, 'fallos', 0)
+
+        self._pila.append(registro)
+        self.etapas.append(registro) # Orden de inicio: las madres antes que sus hijas
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = time.perf_counter() - inicio
+            self._pila.pop()
+            # Un reinicio en una etapa hija borra el pico de la madre: se propaga hacia arriba
+            pico = rss_pico_mb()
+            if pico is not None:
+                pico = max(pico, registro.pop('_pico_hijas'))
+                if padre is not None:
+                    padre['_pico_hijas'] = max(padre['_pico_hijas'], pico)
+            else:
+                registro.pop('_pico_hijas')
+            registro['rss_pico_mb'] = pico
+            filas = registro['filas']
+            registro['filas_por_s'] = filas / registro['segundos'] if filas and registro['segundos'] > 0 else None
+            if cache is not None:
+                aciertos = cache.aciertos - aciertos0
+                fallos = cache.fallos - fallos0
+                registro['aciertos_cache'] = aciertos
+                registro['fallos_cache'] = fallos
+                registro['tasa_aciertos'] = aciertos / (aciertos + fallos) if aciertos + fallos else None
+
+    def tabla(self):
+        """DataFrame de las etapas en orden de inicio (las madres antes que sus hijas)."""
+        import pandas as pd
+        return pd.DataFrame(self.etapas)
+
+    def escribir_jsonl(self, ruta):
+        """Añade una línea JSON por etapa (modo append: varios procesos pueden compartir archivo)."""
+        marca = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        lineas = [json.dumps({'fecha': marca, 'pid': os.getpid(), **self.contexto, **e},
+                             ensure_ascii=False, default=str) for e in self.etapas]
+        with open(ruta, 'a', encoding='utf-8') as f:
+            f.write(''.join(l + '\n' for l in lineas))
+        return ruta
+
+
+@contextmanager
+def medir(nombre, filas=None, cache=None):
+    """Etapa en el registro activo; sin registro activo, no mide nada (devuelve un dict suelto)."""
+    registro = _registro_actual.get()
+    if registro is None:
+        yield {}
+        return
+    with registro.etapa(nombre, filas, cache) as etapa:
+        yield etapa
+
+
+def medido(nombre):
+    """Decorador: cada llamada es la etapa `nombre` (filas = len del primer argumento)."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            filas = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with medir(nombre, filas):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def iniciar_perfil():
+    """Arranca un cProfile (p. ej. para toda una pasada del script de Streamlit)."""
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def volcar_perfil(perfil, ruta=None):
+    """Detiene el perfil y lo guarda en `ruta` (.prof); sin ruta devuelve los bytes."""
+    perfil.disable()
+    if ruta:
+        perfil.dump_stats(ruta)
+        return ruta
+    import tempfile
+    with tempfile.TemporaryDirectory() as directorio:
+        temporal = os.path.join(directorio, 'perfil.prof')
+        perfil.dump_stats(temporal)
+        with open(temporal, 'rb') as f:
+            return f.read()
+
+
+@contextmanager
+def perfilar(ruta):
+    """cProfile de todo el bloque, volcado en `ruta` (.prof, legible con pstats o snakeviz)."""
+    if not ruta:
+        yield None
+        return
+    perfil = iniciar_perfil()
+    try:
+        yield perfil
+    finally:
+        volcar_perfil(perfil, ruta)
@@ -0,0 +1,98 @@
+# src/lexico.py
+from itertools import chain
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def hashes_estables(valores):
+    """Hash estable (uint64) de cada valor, el mismo en todos los procesos."""
+    return pd.util.hash_array(np.asarray(valores, dtype=object))
+
+
+class ConteoDistintos:
+    """
+    Boceto KMV (k valores mínimos) del número de hashes distintos vistos: guarda como
+    mucho los k menores, así que el conteo es exacto hasta k distintos y por encima se
+    estima como (k - 1) / (k-ésimo menor / 2^64). Memoria O(k) sea cual sea el flujo.
+    Dos bocetos se fusionan agregando los hashes de uno al otro.
+    """
+    __slots__ = ('k', 'hashes', 'techo')
+
+    def __init__(self, k):
+        self.k = k
+        self.hashes = np.zeros(0, dtype=np.uint64)  # Ordenados
+        self.techo = None                           # k-ésimo menor hash una vez lleno
+
+    def agregar(self, hashes):
+        if self.techo is not None:
+            hashes = hashes[hashes < self.techo]
+        if len(hashes):
+            self.hashes = np.union1d(self.hashes, hashes)[:self.k]
+            if len(self.hashes) == self.k:
+                self.techo = self.hashes[-1]
+
+    def __len__(self):
+        if self.techo is None:
+            return len(self.hashes)
+        return int(round((self.k - 1) * 2.0**64 / (float(self.techo) + 1)))
+
+
+def tokenizar_corpus(textos):
+    """
+    Tokeniza (split por espacios) todo el corpus una sola vez.
+    Devuelve el número de tokens de cada texto, el id de cada token y el vocabulario compartido.
+    """
+    listas = [t.split() for t in textos]
+    n_tokens = np.fromiter((len(l) for l in listas), dtype=np.int64, count=len(listas))
+    codigos, vocabulario = pd.factorize(pd.Series(list(chain.from_iterable(listas)), dtype=object))
+    return n_tokens, codigos, vocabulario
+
+
+def matriz_conteos(filas, columnas, n_filas, n_columnas):
+    """Matriz dispersa CSR de conteos (las parejas repetidas se suman)."""
+    datos = np.ones(len(filas), dtype=np.int32)
+    return sparse.csr_matrix((datos, (filas, columnas)), shape=(n_filas, n_columnas))
+
+
+def metricas_lexicas(codigos_usuario, textos, n_usuarios):
+    """
+    Métricas léxicas de todos los usuarios en una pasada, a partir de una matriz
+    dispersa usuario×token (única implementación de estas métricas):
+    - ttr: tokens distintos / tokens de todos los posts del usuario (0 si no hay tokens);
+    - tasa_repeticion: (posts - posts distintos) / posts, 0 con menos de 2 posts;
+    - longitud_promedio: palabras por post.
+
+    codigos_usuario: índice 0..n_usuarios-1 del usuario de cada texto.
+    Devuelve (DataFrame con una fila por usuario, matriz usuario×token, vocabulario).
+    """
+    codigos_usuario = np.asarray(codigos_usuario, dtype=np.int64)
+    textos = list(textos)
+
+    # --- Matriz usuario×token ---
+    n_tokens, codigos_token, vocabulario = tokenizar_corpus(textos)
+    filas = np.repeat(codigos_usuario, n_tokens)
+    matriz_tokens = matriz_conteos(filas, codigos_token, n_usuarios, len(vocabulario))
+
+    tokens_usuario = np.asarray(matriz_tokens.sum(axis=1)).ravel()
+    tipos_usuario = np.diff(matriz_tokens.indptr) # tokens distintos = no nulos por fila
+    ttr = np.divide(tipos_usuario, tokens_usuario, out=np.zeros(n_usuarios),
+                    where=tokens_usuario > 0)
+
+    # --- Repetición exacta de posts (matriz usuario×texto) ---
+    codigos_texto, textos_unicos = pd.factorize(pd.Series(textos, dtype=object))
+    matriz_textos = matriz_conteos(codigos_usuario, codigos_texto, n_usuarios, len(textos_unicos))
+    posts_usuario = np.bincount(codigos_usuario, minlength=n_usuarios)
+    distintos_usuario = np.diff(matriz_textos.indptr)
+    repeticion = np.divide(posts_usuario - distintos_usuario, posts_usuario,
+                           out=np.zeros(n_usuarios), where=posts_usuario >= 2)
+
+    longitud = np.divide(tokens_usuario, posts_usuario, out=np.zeros(n_usuarios),
+                         where=posts_usuario > 0)
+
+    df_lexico = pd.DataFrame({
+        'ttr': ttr,
+        'tasa_repeticion': repeticion,
+        'longitud_promedio': longitud,
+    })
+    return df_lexico, matriz_tokens, vocabulario
@@ -1,60 +1,404 @@
 # src/model.py
-import streamlit as st
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.decomposition import PCA
+from .embeddings import generar_embeddings, codificar_corpus, DIM_EMBEDDING, BATCH_SIZE
+from .cache_embeddings import CacheEmbeddings
+from .anomalias import MotorAnomalias
+from .coordinacion import rasgos_coordinacion, referencia_coordinacion, COLUMNAS_COORDINACION
+from .temporal import COLUMNAS_TEMPORALES
+from .instrumentacion import medir, medido
+
+NOMBRE_MODELO = "dccuchile/bert-base-spanish-wwm-cased"
+VERSION_ARTEFACTO = 1
+
+# Importaciones pesadas (sentence_transformers -> torch/transformers, sklearn, joblib)
+# se hacen dentro de las funciones que las usan: importar este módulo (y app.py)
+# no debe costar segundos cuando todavía no hay nada que puntuar.
+
+# ================= 1. BACKENDS DE EMBEDDINGS Y CARGA (CACHÉ) =================
+# Todos los backends exponen la interfaz de SentenceTransformer que usa embeddings.py
+# (encode(textos, batch_size=..., convert_to_numpy=True) y
+# get_sentence_embedding_dimension()), así X_embeddings mantiene el mismo contrato:
+# una fila por usuario, dimensión fija por backend.
+# clave de caché None = vectores dependientes del corpus, no se cachean en disco.
+MAX_SEQ_TRUNCADO = 128
+BACKENDS = {
+    'beto': ('BETO completo (float32)', NOMBRE_MODELO),
+    'beto-int8': ('BETO cuantizado dinámicamente a int8 (CPU)', NOMBRE_MODELO + '#int8'),
+    'beto-128': (f'BETO truncado a {MAX_SEQ_TRUNCADO} tokens', NOMBRE_MODELO + f'#max{MAX_SEQ_TRUNCADO}'),
+    'hash-svd': ('N-gramas de caracteres hasheados + TruncatedSVD (sin red neuronal)', None),
+}
+BACKEND_POR_DEFECTO = 'beto'
+
+class BackendHashSVD:
+    """
+    Fallback barato sin red neuronal: n-gramas de caracteres (2-4) con HashingVectorizer
+    proyectados con TruncatedSVD. La base SVD se ajusta con muestra_por_hash del corpus,
+    en ajustar() o en la primera llamada a encode (en generar_embeddings, el corpus
+    completo), y queda fija para las siguientes; pipeline.py la guarda en el artefacto
+    para puntuar con la misma base. La ingesta por bloques llama a ajustar() con la
+    muestra de todo el archivo antes de codificar el primer bloque.
+    """
+    MAX_TEXTOS_AJUSTE = 2000 # El coste del SVD crece con la muestra; 2k textos bastan para la base
+
+    def __init__(self, dim=128, n_features=2**15):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.dim = dim
+        self._vectorizador = HashingVectorizer(analyzer='char_wb', ngram_range=(2, 4), n_features=n_features,
+                                               alternate_sign=False, norm='l2')
+        self._svd = None
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    @property
+    def necesita_ajuste(self):
+        return self._svd is None
+
+    def ajustar(self, textos):
+        """Ajusta la base SVD con muestra_por_hash(textos)."""
+        from sklearn.decomposition import TruncatedSVD
+        muestra = muestra_por_hash(textos, self.MAX_TEXTOS_AJUSTE)
+        k = max(1, min(self.dim, len(muestra) - 1))
+        self._svd = TruncatedSVD(n_components=k, n_iter=2, random_state=42).fit(self._vectorizador.transform(muestra))
+        return self
+
+    def encode(self, textos, batch_size=None, convert_to_numpy=True, **kwargs):
+        if self._svd is None:
+            self.ajustar(textos)
+        X = self._vectorizador.transform(textos)
+        vectores = np.zeros((X.shape[0], self.dim), dtype=np.float32)
+        vectores[:, :self._svd.n_components] = self._svd.transform(X) # Relleno con ceros si el corpus es pequeño
+        return vectores
+
+    def encode_lotes(self, lotes):
+        """La base se ajusta con todas las cubetas juntas, no sólo con la primera."""
+        vectores = self.encode([t for lote in lotes for t in lote])
+        return np.split(vectores, np.cumsum([len(lote) for lote in lotes])[:-1])
+
+def muestra_por_hash(textos, k):
+    """
+    Los k textos distintos de menor hash estable, ordenados por hash. No depende del
+    orden ni de cómo se trocee el corpus: muestra_por_hash(muestra_por_hash(a, k) + b, k)
+    es muestra_por_hash(a + b, k), así que se puede acumular bloque a bloque.
+    """
+    unicos = np.unique(np.asarray(textos, dtype=object))
+    return unicos[np.argsort(pd.util.hash_array(unicos), kind='stable')[:k]].tolist()
+
+# --- Codificación multiproceso: una copia del modelo por proceso trabajador ---
+_CODIFICADOR_TRABAJADOR = None
+
+def _iniciar_trabajador(backend, hilos):
+    global _CODIFICADOR_TRABAJADOR
+    try:
+        import torch
+        torch.set_num_threads(hilos) # Sin sobresuscribir núcleos entre procesos
+    except ImportError:
+        pass
+    _CODIFICADOR_TRABAJADOR = cargar_backend(backend)
+
+def _codificar_en_trabajador(lote):
+    return np.asarray(_CODIFICADOR_TRABAJADOR.encode(lote, batch_size=len(lote), convert_to_numpy=True))
+
+class CodificadorParalelo:
+    """
+    Reparte las cubetas de longitud de codificar_corpus entre un pool de procesos
+    (uno por núcleo por defecto), cada uno con su propia copia del modelo.
+    pool.map conserva el orden, así que los vectores vuelven en el orden original.
+    El pool se cierra con cerrar(), al salir de un bloque with o al terminar el proceso.
+    """
+    def __init__(self, backend=None, n_procesos=None):
+        backend = backend or BACKEND_POR_DEFECTO
+        if BACKENDS[backend][1] is None:
+            raise ValueError(f"El backend '{backend}' depende del corpus y no se puede repartir entre procesos")
+        self.backend_embeddings = backend
+        self.n_procesos = n_procesos or os.cpu_count() or 1
+        self._pool = None
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            hilos = max(1, (os.cpu_count() or 1) // self.n_procesos)
+            self._pool = ProcessPoolExecutor(max_workers=self.n_procesos, initializer=_iniciar_trabajador,
+                                             initargs=(self.backend_embeddings, hilos))
+            atexit.register(self.cerrar)
+        return self._pool
+
+    def get_sentence_embedding_dimension(self):
+        return DIM_EMBEDDING
+
+    def encode(self, textos, batch_size=BATCH_SIZE, convert_to_numpy=True, **kwargs):
+        return codificar_corpus(self, list(textos), batch_size=batch_size)
+
+    def encode_lotes(self, lotes):
+        # Las cubetas más largas primero: el pool termina más parejo
+        orden = sorted(range(len(lotes)), key=lambda i: -len(lotes[i]) * max(map(len, lotes[i])))
+        resultados = self._obtener_pool().map(_codificar_en_trabajador, [lotes[i] for i in orden])
+        partes = [None] * len(lotes)
+        for i, vectores in zip(orden, resultados):
+            partes[i] = vectores
+        return partes
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            atexit.unregister(self.cerrar)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+def _construir_backend(backend):
+    from sentence_transformers import SentenceTransformer
+    if backend == 'beto':
+        return SentenceTransformer(NOMBRE_MODELO)
+    if backend == 'beto-int8':
+        import torch
+        modelo = SentenceTransformer(NOMBRE_MODELO, device='cpu')
+        return torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == 'beto-128':
+        modelo = SentenceTransformer(NOMBRE_MODELO)
+        modelo.max_seq_length = MAX_SEQ_TRUNCADO
+        return modelo
+    raise ValueError(f"Backend de embeddings desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+# lru_cache en lugar de st.cache_resource: el módulo no depende de Streamlit
+# y el modelo se comparte igual entre reruns (una sola carga por proceso).
+_LOCK_CARGA = threading.Lock() # Evita cargar BETO dos veces si la precarga sigue en curso
+
+@lru_cache(maxsize=None)
+def _cargar_backend_compartido(backend):
+    modelo = _construir_backend(backend)
+    modelo.backend_embeddings = backend # Identifica al codificador propio del backend (ver cache_del_codificador)
+    return modelo
+
+def cargar_backend(backend=BACKEND_POR_DEFECTO, n_procesos=1):
+    """
+    Devuelve el codificador del backend (los neuronales se cargan una sola vez por proceso).
+    Con n_procesos > 1 (None = todos los núcleos) se devuelve un CodificadorParalelo.
+    """
+    if n_procesos != 1 and backend != 'hash-svd':
+        return _codificador_paralelo(backend, n_procesos or os.cpu_count() or 1)
+    if backend == 'hash-svd':
+        return BackendHashSVD() # Sin estado compartido: cada corpus ajusta su propia base
+    with _LOCK_CARGA:
+        return _cargar_backend_compartido(backend)
+
+_PARALELO = {} # (backend, n_procesos) -> CodificadorParalelo: uno solo vivo, el anterior se cierra
+
+def _codificador_paralelo(backend, n_procesos):
+    clave = (backend, n_procesos)
+    with _LOCK_CARGA:
+        if clave not in _PARALELO:
+            for anterior in _PARALELO.values():
+                anterior.cerrar() # Sin procesos trabajadores huérfanos al cambiar de configuración
+            _PARALELO.clear()
+            _PARALELO[clave] = CodificadorParalelo(backend, n_procesos)
+        return _PARALELO[clave]
 
-# ================= 1. CARGA EFICIENTE DEL MODELO (CACHÉ) =================
-@st.cache_resource
 def cargar_modelo_beto():
     """Carga el modelo una sola vez para evitar recargas lentas."""
-    return SentenceTransformer("dccuchile/bert-base-spanish-wwm-cased")
-
-def entrenar_y_predecir(df_users, umbral_risk_score):
-    """Genera embeddings, entrena Isolation Forest, predice y calcula el Risk Score."""
-    
-    model = cargar_modelo_beto()
-    
-    # --- 1. Generación de Embeddings ---
-    user_embeddings = []
-    with st.spinner('🧠 Generando Embeddings con BETO (esto puede tardar)...'):
-        for textos in df_users['textos_raw']:
-            if len(textos) > 0:
-                vectors = model.encode(textos) 
-                user_avg_vector = np.mean(vectors, axis=0)
-                user_embeddings.append(user_avg_vector)
-            else:
-                user_embeddings.append(np.zeros(768))
-        
-        X_embeddings = np.array(user_embeddings)
-
-    # --- 2. Modelado ---
+    return cargar_backend('beto')
+
+def _precargar(backend):
+    try:
+        cargar_backend(backend)
+    except Exception:
+        pass # El error se verá (y reportará) en la carga real
+
+def precargar_modelo_beto(backend=BACKEND_POR_DEFECTO):
+    """Empieza a cargar el backend (BETO por defecto) en un hilo de fondo y devuelve el hilo."""
+    hilo = threading.Thread(target=_precargar, args=(backend,), name="precarga-beto", daemon=True)
+    hilo.start()
+    return hilo
+
+@lru_cache(maxsize=None)
+def cargar_cache_embeddings(backend=BACKEND_POR_DEFECTO):
+    """Abre la caché persistente de embeddings del backend (None si no aplica o el disco no lo permite)."""
+    clave = BACKENDS[backend][1]
+    if clave is None:
+        return None
+    try:
+        return CacheEmbeddings(clave, DIM_EMBEDDING)
+    except OSError:
+        return None
+
+def cache_del_codificador(model, backend=BACKEND_POR_DEFECTO):
+    """
+    Caché persistente para los vectores de `model`: la del backend sólo si `model` es None
+    o su propio codificador. Uno externo (sintético, de pruebas) no la comparte, así sus
+    vectores nunca se guardan ni se leen como si fueran del backend.
+    """
+    if model is None or getattr(model, 'backend_embeddings', None) == backend:
+        return cargar_cache_embeddings(backend)
+    return None
+
+FEATURES_CONDUCTA = ['num_posts', 'intervalo_medio', 'frecuencia_diaria', 'nocturnidad', 'ttr', 'tasa_repeticion', 'avg_likes', 'avg_replies', 'longitud_promedio',
+                     'posts_campana', 'cuentas_campana'] + COLUMNAS_TEMPORALES + COLUMNAS_COORDINACION
+
+# ================= 2. ETAPAS DEL PIPELINE =================
+# Cada etapa es independiente para que app.py pueda cachearlas por separado:
+# mover el slider del umbral sólo debe re-ejecutar aplicar_umbral.
+
+def calcular_embeddings(textos, backend=BACKEND_POR_DEFECTO, model=None):
+    """
+    Embedding promedio (BETO u otro backend) de los textos de cada usuario.
+    `textos` es un TextosUsuarios (ver TextosUsuarios.desde_posts).
+    `model` permite reutilizar un codificador ya ajustado (p. ej. el de un artefacto).
+    """
+    with medir('embeddings', filas=len(textos.textos)):
+        cache = cache_del_codificador(model, backend)
+        with medir('carga_modelo'):
+            model = model if model is not None else cargar_backend(backend)
+        # Un único corpus deduplicado, sólo se codifica lo que no está en caché
+        return generar_embeddings(model, textos, cache=cache)
+
+@medido('coordinacion')
+def agregar_rasgos_coordinacion(df_users, X_embeddings, referencia=None):
+    """
+    Añade vecinos_coordinados y similitud_vecinos: grafo k-NN aproximado sobre los
+    embeddings completos, restringido a usuarios activos en la misma ventana de tiempo.
+    `referencia` (la de un artefacto) añade como posibles vecinos a los usuarios de
+    entrenamiento: así un lote pequeño, o un único usuario, no se compara sólo consigo mismo.
+    """
+    df_coordinacion, _ = rasgos_coordinacion(X_embeddings, df_users['inicio_actividad'].values,
+                                             df_users['fin_actividad'].values, referencia=referencia,
+                                             user_ids=df_users['user_id'].values)
+    df_users = df_users.copy()
+    df_users[COLUMNAS_COORDINACION] = df_coordinacion[COLUMNAS_COORDINACION].values
+    return df_users
+
+@medido('ajuste_modelo')
+def ajustar_modelo(df_users, X_embeddings, backend=BACKEND_POR_DEFECTO, config_anomalias=None):
+    """
+    Ajusta PCA, StandardScaler, Isolation Forest y el MinMaxScaler del Risk Score.
+    `config_anomalias` son parámetros de MotorAnomalias (submuestra, nº de bosques...).
+    El artefacto guarda además una muestra de estos usuarios (referencia_coordinacion)
+    para calcular la coordinación de usuarios nuevos al puntuar sin reentrenar.
+    """
+    import sklearn
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
     # 1. Reducción de dimensiones de Texto (PCA)
-    pca = PCA(n_components=2)
+    pca = PCA(n_components=2, random_state=42)
     X_text_pca = pca.fit_transform(X_embeddings)
-    
+
     # 2. Selección y Escalado de Features de Conducta
-    features_conducta = ['num_posts', 'intervalo_medio', 'frecuencia_diaria', 'nocturnidad', 'ttr', 'tasa_repeticion', 'avg_likes', 'avg_replies', 'longitud_promedio']
-    X_conducta = df_users[features_conducta].values
     scaler = StandardScaler()
-    X_conducta_scaled = scaler.fit_transform(X_conducta)
+    X_conducta_scaled = scaler.fit_transform(df_users[FEATURES_CONDUCTA].values)
 
     # 3. Isolation Forest (Ensemble: Conducta + Texto)
     X_final = np.hstack([X_conducta_scaled, X_text_pca])
-    
-    iso_forest = IsolationForest(n_estimators=100, contamination=0.2, random_state=42)
+    iso_forest = MotorAnomalias(**(config_anomalias or {}))
     iso_forest.fit(X_final)
-    df_users['anomaly_score'] = iso_forest.predict(X_final)
-    df_users['decision_function'] = iso_forest.decision_function(X_final)
-    
-    # Convertir a Risk Score (0 a 1)
+
+    # 4. Escala del Risk Score (0 a 1)
     scaler_score = MinMaxScaler()
-    df_users['risk_score'] = 1 - scaler_score.fit_transform(df_users[['decision_function']]) # Invertimos: alto score = alto riesgo
-    
+    scaler_score.fit(iso_forest.decision_function(X_final).reshape(-1, 1))
+
+    return {
+        'version': VERSION_ARTEFACTO,
+        'pca': pca,
+        'scaler': scaler,
+        'iso_forest': iso_forest,
+        'scaler_score': scaler_score,
+        'features': list(FEATURES_CONDUCTA),
+        'referencia_coordinacion': referencia_coordinacion(X_embeddings, df_users['inicio_actividad'].values,
+                                                           df_users['fin_actividad'].values,
+                                                           df_users['user_id'].values),
+        'modelo_embeddings': identificador_backend(backend),
+        'backend_embeddings': backend,
+        'n_usuarios_entrenamiento': len(X_final),
+        'entrenado_en': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'version_sklearn': sklearn.__version__,
+    }
+
+@medido('scoring')
+def puntuar(df_users, X_embeddings, modelo):
+    """Aplica un modelo ya ajustado y añade anomaly_score, decision_function y risk_score."""
+    X_text_pca = modelo['pca'].transform(X_embeddings)
+    X_conducta_scaled = modelo['scaler'].transform(df_users[modelo['features']].values)
+    X_final = np.hstack([X_conducta_scaled, X_text_pca])
+
+    # Una sola pasada por el bosque: predict es decision_function < 0
+    decision = modelo['iso_forest'].decision_function(X_final)
+    df_users['anomaly_score'] = np.where(decision < 0, -1, 1)
+    df_users['decision_function'] = decision
+
+    # Convertir a Risk Score (0 a 1)
+    riesgo = 1 - modelo['scaler_score'].transform(df_users[['decision_function']].values) # Invertimos: alto score = alto riesgo
+    # Usuarios nuevos pueden quedar fuera del rango visto al entrenar
+    df_users['risk_score'] = np.clip(riesgo.ravel(), 0, 1)
+    return df_users
+
+def identificador_backend(backend):
+    """Qué embeddings produce un backend (modelo y variante); lo registra el artefacto."""
+    return BACKENDS[backend][1] or backend
+
+# ================= 3. PERSISTENCIA DEL MODELO =================
+# Un artefacto versionado con los cuatro componentes ajustados y la lista de features:
+# permite puntuar usuarios nuevos sólo con transform/decision_function (scores estables)
+# y reentrenar únicamente cuando se decida.
+
+def guardar_modelo(modelo, ruta):
+    """Serializa el modelo ajustado (salida de ajustar_modelo) con joblib."""
+    import joblib
+    joblib.dump(modelo, ruta)
+    return ruta
+
+def cargar_modelo(ruta):
+    """Carga un artefacto guardado con guardar_modelo y valida su versión y sus embeddings."""
+    import joblib
+    modelo = joblib.load(ruta)
+    version = modelo.get('version') if isinstance(modelo, dict) else None
+    if version != VERSION_ARTEFACTO:
+        raise ValueError(f"Artefacto de modelo incompatible (versión {version}, se esperaba {VERSION_ARTEFACTO}): {ruta}")
+    faltantes = {'pca', 'scaler', 'iso_forest', 'scaler_score', 'features'} - set(modelo)
+    if faltantes:
+        raise ValueError(f"Artefacto de modelo incompleto, faltan: {sorted(faltantes)}")
+    registrado = modelo.get('modelo_embeddings')
+    if 'backend_embeddings' not in modelo:
+        modelo['backend_embeddings'] = {identificador_backend(b): b for b in BACKENDS}.get(registrado, BACKEND_POR_DEFECTO)
+    backend = modelo['backend_embeddings']
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de embeddings desconocido en el artefacto: '{backend}'")
+    # Los artefactos anteriores registraban siempre NOMBRE_MODELO: para ellos queda la comprobación de dimensión
+    if registrado not in (None, NOMBRE_MODELO, identificador_backend(backend)):
+        raise ValueError(f"El artefacto declara el backend '{backend}' pero sus embeddings son de '{registrado}'")
+    if BACKENDS[backend][1] is None and modelo.get('codificador') is None:
+        raise ValueError(f"Artefacto '{backend}' sin su codificador: la base depende del corpus de entrenamiento")
+    dim = modelo['codificador'].get_sentence_embedding_dimension() if modelo.get('codificador') else DIM_EMBEDDING
+    if getattr(modelo['pca'], 'n_features_in_', dim) != dim:
+        raise ValueError(f"El PCA del artefacto espera embeddings de dimensión {modelo['pca'].n_features_in_}, "
+                         f"el backend '{backend}' produce {dim}")
+    return modelo
+
+def aplicar_umbral(df_users, umbral_risk_score):
+    """Clasificación final: única etapa que depende del slider."""
+    df_users['es_bot'] = df_users['risk_score'] > umbral_risk_score
+    return df_users
+
+def entrenar_y_predecir(df_users, textos, umbral_risk_score, backend=BACKEND_POR_DEFECTO, model=None):
+    """
+    Genera embeddings, entrena Isolation Forest, predice y calcula el Risk Score.
+    `textos`: TextosUsuarios de df_users. `model` permite pasar otro codificador
+    (p. ej. el sintético de los benchmarks).
+    """
+    X_embeddings = calcular_embeddings(textos, backend, model)
+    df_users = agregar_rasgos_coordinacion(df_users, X_embeddings)
+    modelo = ajustar_modelo(df_users, X_embeddings, backend)
+    df_users = puntuar(df_users, X_embeddings, modelo)
+
     # Aplicar el umbral DINÁMICO del slider
-    df_users['es_bot'] = df_users['risk_score'] > umbral_risk_score 
+    df_users = aplicar_umbral(df_users, umbral_risk_score)
 
-    return df_users, features_conducta
\ No newline at end of file
+    return df_users, FEATURES_CONDUCTA
\ No newline at end of file
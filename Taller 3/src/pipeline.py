@@ -0,0 +1,161 @@
+# src/pipeline.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import pandas as pd
+from .features import procesar_datos
+from .ingesta import procesar_csv_por_bloques, TAM_BLOQUE
+from .model import (calcular_embeddings, agregar_rasgos_coordinacion, ajustar_modelo, puntuar,
+                    aplicar_umbral, cargar_backend, cache_del_codificador, cargar_modelo, guardar_modelo,
+                    precargar_modelo_beto, BACKENDS, BACKEND_POR_DEFECTO)
+from .instrumentacion import RegistroEtapas, medir
+from .textos import TextosUsuarios
+
+# API de scoring sin Streamlit: procesar_datos -> embeddings -> Isolation Forest.
+
+EXTENSIONES = ('.csv', '.parquet', '.jsonl')
+UMBRAL_POR_DEFECTO = 0.75
+
+
+def leer_entrada(ruta):
+    """Lee un CSV, Parquet o JSON lines con las columnas user_id, text, timestamp, likes, replies."""
+    if ruta.lower().endswith('.parquet'):
+        return pd.read_parquet(ruta)
+    if ruta.lower().endswith('.jsonl'): # Salida de recolectar_youtube.py
+        return pd.read_json(ruta, lines=True, convert_dates=False, dtype={'user_id': str, 'text': str})
+    return pd.read_csv(ruta)
+
+
+def listar_entradas(ruta):
+    """Un archivo, o todos los CSV/Parquet/JSONL de un directorio (ordenados)."""
+    if os.path.isdir(ruta):
+        return sorted(os.path.join(ruta, f) for f in os.listdir(ruta)
+                      if f.lower().endswith(EXTENSIONES))
+    return [ruta]
+
+
+def resolver_backend(backend, modelo=None):
+    """Con un artefacto cargado manda su backend: PCA espera embeddings de esa dimensión."""
+    if modelo is None:
+        return backend or BACKEND_POR_DEFECTO
+    del_artefacto = modelo['backend_embeddings']
+    if backend and backend != del_artefacto:
+        raise ValueError(f"El modelo se entrenó con el backend '{del_artefacto}', no con '{backend}'")
+    return del_artefacto
+
+
+def obtener_codificador(backend, modelo=None, procesos_embeddings=1):
+    """
+    Codificador de embeddings para el backend. Los que dependen del corpus (hash-svd)
+    se reutilizan del artefacto para que los usuarios nuevos caigan en la misma base.
+    Con procesos_embeddings > 1 la codificación se reparte entre procesos.
+    """
+    if modelo is not None and modelo.get('codificador') is not None:
+        return modelo['codificador']
+    return cargar_backend(backend, procesos_embeddings)
+
+
+def puntuar_usuarios(df_users, X_embeddings, umbral=UMBRAL_POR_DEFECTO, modelo=None,
+                     ruta_guardar_modelo=None, backend=BACKEND_POR_DEFECTO, codificador=None,
+                     config_anomalias=None):
+    """
+    Añade risk_score y es_bot. Sin `modelo` se ajusta uno nuevo sobre estos usuarios
+    (y se guarda en ruta_guardar_modelo si se indica); con `modelo` (artefacto cargado)
+    sólo se puntúa, sin reentrenar. `config_anomalias` configura el Isolation Forest
+    (ver MotorAnomalias) y sólo se usa al entrenar. Al puntuar contra un artefacto, la
+    coordinación se calcula frente a estos usuarios y la referencia de entrenamiento.
+    """
+    referencia = modelo.get('referencia_coordinacion') if modelo is not None else None
+    df_users = agregar_rasgos_coordinacion(df_users, X_embeddings, referencia)
+    if modelo is None:
+        modelo = ajustar_modelo(df_users, X_embeddings, backend, config_anomalias)
+        if BACKENDS[backend][1] is None:
+            modelo['codificador'] = codificador # Base ajustada a este corpus: va con el artefacto
+        if ruta_guardar_modelo:
+            guardar_modelo(modelo, ruta_guardar_modelo)
+    df_users = puntuar(df_users, X_embeddings, modelo)
+    return aplicar_umbral(df_users, umbral)
+
+
+def puntuar_dataframe(df_raw, umbral=UMBRAL_POR_DEFECTO, modelo=None, ruta_guardar_modelo=None,
+                      backend=None, procesos_embeddings=1, config_anomalias=None):
+    """Pipeline completo sobre un DataFrame crudo. Devuelve df_users puntuado."""
+    backend = resolver_backend(backend, modelo)
+    if procesos_embeddings == 1:
+        precargar_modelo_beto(backend) # El modelo carga en paralelo con la ingeniería de rasgos
+    df_users, df_posts = procesar_datos(df_raw)
+    df_users = df_users.fillna(0)
+    codificador = obtener_codificador(backend, modelo, procesos_embeddings)
+    X_embeddings = calcular_embeddings(TextosUsuarios.desde_posts(df_users, df_posts), backend, codificador)
+    return puntuar_usuarios(df_users, X_embeddings, umbral, modelo, ruta_guardar_modelo, backend, codificador,
+                            config_anomalias)
+
+
+def puntuar_archivo(ruta, dir_salida, umbral=UMBRAL_POR_DEFECTO, formato='csv',
+                    por_bloques=False, tam_bloque=TAM_BLOQUE, ruta_modelo=None,
+                    ruta_guardar_modelo=None, backend=None, procesos_embeddings=1,
+                    config_anomalias=None, ruta_metricas=None):
+    """
+    Puntúa un archivo y escribe los usuarios en dir_salida/<nombre>_scores.<formato>.
+    Con por_bloques=True (sólo CSV) se usa la ingesta por bloques de memoria acotada.
+    Con ruta_modelo se puntúa contra un artefacto guardado (modo sólo-scoring).
+    Con ruta_metricas se añaden las métricas por etapa (JSON lines) a ese archivo.
+    Devuelve la ruta escrita.
+    """
+    registro = RegistroEtapas(archivo=ruta) if ruta_metricas else None
+    with registro.activar() if registro else nullcontext(), medir('archivo') as total:
+        modelo = cargar_modelo(ruta_modelo) if ruta_modelo else None
+        backend = resolver_backend(backend, modelo)
+        if por_bloques and ruta.lower().endswith('.csv'):
+            codificador = obtener_codificador(backend, modelo, procesos_embeddings)
+            with medir('ingesta_por_bloques'):
+                df_users, X_embeddings = procesar_csv_por_bloques(
+                    ruta, tam_bloque, model=codificador, cache=cache_del_codificador(codificador, backend))
+            df_users = puntuar_usuarios(df_users, X_embeddings, umbral, modelo, ruta_guardar_modelo,
+                                        backend, codificador, config_anomalias)
+        else:
+            with medir('lectura'):
+                df_raw = leer_entrada(ruta)
+            df_users = puntuar_dataframe(df_raw, umbral, modelo, ruta_guardar_modelo, backend,
+                                         procesos_embeddings, config_anomalias)
+        total['filas'] = len(df_users)
+
+        with medir('escritura', filas=len(df_users)):
+            df_salida = df_users.sort_values('risk_score', ascending=False)
+
+            os.makedirs(dir_salida, exist_ok=True)
+            nombre = os.path.splitext(os.path.basename(ruta))[0]
+            salida = os.path.join(dir_salida, f"{nombre}_scores.{formato}")
+            if formato == 'parquet':
+                df_salida.to_parquet(salida, index=False)
+            else:
+                df_salida.to_csv(salida, index=False)
+
+    if registro:
+        registro.contexto['backend'] = backend
+        registro.escribir_jsonl(ruta_metricas)
+    return salida
+
+
+def _limitar_hilos(n_procesos):
+    """Reparte los núcleos entre procesos para que torch no los sobresuscriba."""
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // n_procesos))
+    except ImportError:
+        pass
+
+
+def puntuar_archivos(rutas, dir_salida, n_procesos=None, **kwargs):
+    """
+    Puntúa varios archivos en paralelo (un proceso por archivo, cada uno con su
+    copia del modelo). Devuelve las rutas de salida en el mismo orden.
+    """
+    n_procesos = min(n_procesos or os.cpu_count() or 1, len(rutas))
+    if n_procesos <= 1:
+        return [puntuar_archivo(r, dir_salida, **kwargs) for r in rutas]
+
+    with ProcessPoolExecutor(max_workers=n_procesos, initializer=_limitar_hilos,
+                             initargs=(n_procesos,)) as pool:
+        futuros = [pool.submit(puntuar_archivo, r, dir_salida, **kwargs) for r in rutas]
+        return [f.result() for f in futuros]
@@ -1,32 +1,72 @@
 # src/preprocess.py
+import os
 import pandas as pd
+import numpy as np
 import re
 import emoji
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 
-def limpiar_texto(texto):
-    if pd.isnull(texto): return ""
-    texto = str(texto)
-    # Normalización Unicode
-    texto = unicodedata.normalize("NFKC", texto)
+# Patrones precompilados (se aplican en el mismo orden que antes: URLs y luego menciones)
+PATRON_URL = re.compile(r"http\S+|www\S+")
+PATRON_MENCION = re.compile(r"@\w+")
+# Caracteres no ASCII que aparecen en algún emoji: si un texto (o palabra) no
+# contiene ninguno, emoji.replace_emoji no tiene nada que quitar y se puede saltar.
+CARACTERES_EMOJI = frozenset(c for e in emoji.EMOJI_DATA for c in e if not c.isascii())
+
+MIN_TEXTOS_POOL = 50_000  # Por debajo de esto no compensa lanzar procesos
+
+def _limpiar(texto):
+    """Limpieza de un texto ya convertido a str."""
+    # Normalización Unicode (casi todo el texto ya es ASCII o NFKC)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKC", texto)
     # Eliminar URLs y menciones
-    texto = re.sub(r"http\S+|www\S+", "", texto)
-    texto = re.sub(r"@\w+", "", texto)
+    texto = PATRON_URL.sub("", texto)
+    texto = PATRON_MENCION.sub("", texto)
     # Emojis a texto o eliminar (aquí los eliminamos para BERT puro)
-    texto = emoji.replace_emoji(texto, replace="")
-    # Limpiar espacios extra
-    texto = re.sub(r"\s+", " ", texto).strip()
-    return texto
-
-def calcular_ttr(text_list):
-    """Calcula Type-Token Ratio (Riqueza léxica) de todos los textos unidos."""
-    full_text = " ".join(text_list)
-    tokens = full_text.split()
-    if not tokens: return 0
-    return len(set(tokens)) / len(tokens)
-
-def detectar_repeticion(text_list):
-    """Detecta si el usuario repite exactamente los mismos comentarios."""
-    if len(text_list) < 2: return 0
-    duplicados = len(text_list) - len(set(text_list))
-    return duplicados / len(text_list)
\ No newline at end of file
+    if not CARACTERES_EMOJI.isdisjoint(texto):
+        # Ningún emoji contiene espacios: sólo se procesan las palabras que puedan tenerlo
+        texto = " ".join(
+            emoji.replace_emoji(p, replace="") if not CARACTERES_EMOJI.isdisjoint(p) else p
+            for p in texto.split()
+        )
+    # Limpiar espacios extra (split() usa la misma definición de espacio que \s)
+    return " ".join(texto.split())
+
+def limpiar_texto(texto):
+    if pd.isnull(texto): return ""
+    return _limpiar(str(texto))
+
+def _limpiar_lote(textos):
+    return [_limpiar(t) for t in textos]
+
+def limpiar_textos(textos, n_procesos=1):
+    """
+    Versión por lotes de limpiar_texto para una Series o array completo.
+    Cada texto distinto se limpia una sola vez; con n_procesos > 1 (o None = todos
+    los núcleos) los lotes grandes se reparten en un pool de procesos.
+    Devuelve una Series con el mismo índice (o un array si la entrada no es Series).
+    """
+    serie = textos if isinstance(textos, pd.Series) else pd.Series(textos, dtype=object)
+    codigos, unicos = pd.factorize(serie) # Los nulos reciben código -1
+    unicos = [str(t) for t in unicos]
+
+    n_procesos = n_procesos or os.cpu_count() or 1
+    if n_procesos > 1 and len(unicos) >= MIN_TEXTOS_POOL:
+        tam = -(-len(unicos) // (n_procesos * 4))
+        lotes = [unicos[i:i + tam] for i in range(0, len(unicos), tam)]
+        with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            limpios = [t for lote in pool.map(_limpiar_lote, lotes) for t in lote]
+    else:
+        limpios = _limpiar_lote(unicos)
+
+    # Posición extra al final para los nulos (código -1)
+    tabla = np.empty(len(limpios) + 1, dtype=object)
+    tabla[:-1] = limpios
+    tabla[-1] = ""
+    resultado = tabla[codigos]
+
+    if isinstance(textos, pd.Series):
+        return pd.Series(resultado, index=textos.index, name=textos.name)
+    return resultado
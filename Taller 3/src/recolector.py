@@ -0,0 +1,260 @@
+# src/recolector.py
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# Recolector de comentarios de YouTube concurrente, reanudable y de sólo-añadir:
+# - varios vídeos a la vez (hilos: el trabajo es esperar a la red) bajo un único
+#   limitador de peticiones/s compartido, así la cuota de la API se respeta igual;
+# - cada página se añade a la salida ya con el esquema de la app (user_id, text,
+#   timestamp, likes, replies), sin reescribir lo anterior ni concatenar en memoria;
+# - tras cada página se guarda el pageToken siguiente del vídeo: una ejecución
+#   interrumpida continúa donde se quedó.
+# El cliente sólo necesita commentThreads().list(...).execute(): sirve el de
+# googleapiclient o YouTubeFalso (abajo) para probar sin red ni API key.
+
+TAM_PAGINA = 100            # Máximo que admite commentThreads().list
+PETICIONES_POR_S = 5.0
+MAX_REINTENTOS = 4
+ESPERA_BASE_S = 2.0         # Reintentos con espera exponencial: 2, 4, 8, 16 s
+COLUMNAS_RECOLECCION = ['user_id', 'text', 'timestamp', 'likes', 'replies', 'video_id', 'comment_id']
+
+
+class LimitadorTasa:
+    """Limitador de peticiones/s compartido entre hilos (cada petición reserva su turno)."""
+
+    def __init__(self, por_segundo=PETICIONES_POR_S, rafaga=1):
+        self.intervalo = 1 / por_segundo
+        self.rafaga = rafaga
+        self._siguiente = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(self._siguiente, ahora - (self.rafaga - 1) * self.intervalo)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def filas_de_pagina(respuesta, video_id):
+    """Una respuesta de commentThreads().list en el esquema de la app (más video_id y comment_id)."""
+    filas = []
+    for item in respuesta.get('items', []):
+        comentario = item['snippet']['topLevelComment']
+        snippet = comentario['snippet']
+        filas.append((snippet.get('authorDisplayName'), snippet.get('textDisplay'), snippet.get('publishedAt'),
+                      snippet.get('likeCount', 0), item['snippet'].get('totalReplyCount', 0),
+                      video_id, comentario.get('id', item.get('id'))))
+    return pd.DataFrame(filas, columns=COLUMNAS_RECOLECCION)
+
+
+# ================= SALIDAS (SÓLO AÑADIR) =================
+class SalidaJSONL:
+    """Un único archivo JSON lines; cada página se añade al final."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def agregar(self, df, video_id, pagina):
+        texto = df.to_json(orient='records', lines=True, force_ascii=False)
+        with self._lock, open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(texto if texto.endswith('\n') else texto + '\n')
+
+    def leer(self):
+        return pd.read_json(self.ruta, lines=True, convert_dates=False, dtype={'user_id': str, 'text': str, 'timestamp': str})
+
+
+class SalidaParquet:
+    """Un directorio con un archivo Parquet por página (<video>-<página>.parquet)."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def agregar(self, df, video_id, pagina):
+        ruta = os.path.join(self.directorio, f"{video_id}-{pagina:05d}.parquet")
+        df.to_parquet(ruta + '.tmp', index=False)
+        os.replace(ruta + '.tmp', ruta) # Una página a medio escribir nunca queda visible
+
+    def leer(self):
+        partes = sorted(f for f in os.listdir(self.directorio) if f.endswith('.parquet'))
+        if not partes:
+            return pd.DataFrame(columns=COLUMNAS_RECOLECCION)
+        return pd.concat([pd.read_parquet(os.path.join(self.directorio, f)) for f in partes], ignore_index=True)
+
+
+def abrir_salida(ruta):
+    """Parquet si la ruta termina en .parquet (directorio de páginas); si no, JSON lines."""
+    return SalidaParquet(ruta) if ruta.rstrip('/\\').endswith('.parquet') else SalidaJSONL(ruta)
+
+
+def consolidar(salida):
+    """Toda la recolección sin duplicados (una página puede repetirse si se cortó justo al guardarla)."""
+    return salida.leer().drop_duplicates('comment_id', keep='last').reset_index(drop=True)
+
+
+# ================= CHECKPOINT =================
+class Checkpoint:
+    """
+    Estado por vídeo en un JSON: pageToken siguiente, páginas, comentarios, terminado y
+    último error. Se reescribe de forma atómica (archivo temporal + os.replace).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self.videos = {}
+        if ruta and os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                self.videos = json.load(f)
+
+    def estado(self, video_id):
+        return dict(self.videos.get(video_id, {'pageToken': None, 'paginas': 0, 'comentarios': 0, 'terminado': False}))
+
+    def actualizar(self, video_id, **campos):
+        with self._lock:
+            estado = self.estado(video_id)
+            estado.update(campos)
+            self.videos[video_id] = estado
+            if self.ruta:
+                with open(self.ruta + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(self.videos, f, indent=1)
+                os.replace(self.ruta + '.tmp', self.ruta)
+
+
+# ================= RECOLECCIÓN =================
+def recolectar_video(cliente, video_id, salida, checkpoint, limitador, max_paginas=None,
+                     max_reintentos=MAX_REINTENTOS, espera_base=ESPERA_BASE_S):
+    """
+    Recorre las páginas pendientes de un vídeo: añade cada una a la salida y después
+    guarda su pageToken siguiente. Devuelve el estado final del vídeo.
+    """
+    estado = checkpoint.estado(video_id)
+    paginas_ahora = 0
+    while not estado['terminado'] and (max_paginas is None or paginas_ahora < max_paginas):
+        parametros = dict(part='snippet', videoId=video_id, textFormat='plainText', maxResults=TAM_PAGINA)
+        if estado['pageToken']:
+            parametros['pageToken'] = estado['pageToken']
+        for intento in range(max_reintentos + 1):
+            limitador.esperar()
+            try:
+                respuesta = cliente.commentThreads().list(**parametros).execute()
+                break
+            except Exception as e:
+                if intento == max_reintentos:
+                    checkpoint.actualizar(video_id, error=f"{type(e).__name__}: {e}")
+                    return checkpoint.estado(video_id)
+                time.sleep(espera_base * 2 ** intento)
+
+        df = filas_de_pagina(respuesta, video_id)
+        if len(df):
+            salida.agregar(df, video_id, estado['paginas'])
+        siguiente = respuesta.get('nextPageToken')
+        checkpoint.actualizar(video_id, pageToken=siguiente, paginas=estado['paginas'] + 1,
+                              comentarios=estado['comentarios'] + len(df), terminado=siguiente is None, error=None)
+        estado = checkpoint.estado(video_id)
+        paginas_ahora += 1
+    return estado
+
+
+def recolectar(crear_cliente, video_ids, salida, checkpoint, n_hilos=4, peticiones_por_s=PETICIONES_POR_S,
+               **kwargs):
+    """
+    Recolecta varios vídeos en paralelo. crear_cliente() se llama una vez por hilo
+    (el cliente de googleapiclient no es seguro entre hilos). Los vídeos ya terminados
+    según el checkpoint se saltan. Devuelve {video_id: estado}.
+    """
+    limitador = LimitadorTasa(peticiones_por_s)
+    locales = threading.local()
+
+    def trabajo(video_id):
+        if not hasattr(locales, 'cliente'):
+            locales.cliente = crear_cliente()
+        return video_id, recolectar_video(locales.cliente, video_id, salida, checkpoint, limitador, **kwargs)
+
+    pendientes = [v for v in dict.fromkeys(video_ids) if not checkpoint.estado(v)['terminado']]
+    with ThreadPoolExecutor(max_workers=max(1, n_hilos)) as pool:
+        resultados = dict(pool.map(trabajo, pendientes))
+    return {v: resultados.get(v, checkpoint.estado(v)) for v in dict.fromkeys(video_ids)}
+
+
+def cliente_youtube(api_key):
+    """Fábrica del cliente real de la API (googleapiclient sólo se importa aquí)."""
+    from googleapiclient.discovery import build
+    return lambda: build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
+
+
+# ================= API FALSA (PRUEBAS SIN RED) =================
+class YouTubeFalso:
+    """
+    Imitación local de youtube.commentThreads().list(...).execute(): comentarios
+    sintéticos deterministas por vídeo, paginados con nextPageToken opaco.
+    latencia simula la red; tasa_errores hace fallar peticiones al azar (reintentos).
+    """
+
+    def __init__(self, comentarios_por_video=500, latencia=0.0, tasa_errores=0.0, semilla=0):
+        self.comentarios_por_video = comentarios_por_video
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+        self.peticiones = 0
+        self._rng = random.Random(semilla)
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def _comentarios(self, video_id):
+        with self._lock:
+            if video_id not in self._datos:
+                from .sintetico import generar_dataset
+                n = self.comentarios_por_video
+                df = generar_dataset(max(1, n // 5), semilla=zlib.crc32(video_id.encode())).head(n)
+                df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+                self._datos[video_id] = df.reset_index(drop=True)
+            return self._datos[video_id]
+
+    def commentThreads(self):
+        return self
+
+    def list(self, part, videoId, maxResults=20, pageToken=None, **kwargs):
+        return _PeticionFalsa(self, videoId, maxResults, pageToken)
+
+    def _responder(self, video_id, tam, token):
+        with self._lock:
+            self.peticiones += 1
+            falla = self._rng.random() < self.tasa_errores
+        if self.latencia:
+            time.sleep(self.latencia)
+        if falla:
+            raise ConnectionError("error simulado de la API")
+        df = self._comentarios(video_id)
+        inicio = int(token[1:]) if token else 0
+        pagina = df.iloc[inicio:inicio + tam]
+        items = [{
+            'id': f"{video_id}.{inicio + i}",
+            'snippet': {
+                'videoId': video_id,
+                'totalReplyCount': int(fila.replies),
+                'topLevelComment': {'id': f"{video_id}.{inicio + i}", 'snippet': {
+                    'authorDisplayName': fila.user_id, 'textDisplay': fila.text,
+                    'publishedAt': fila.timestamp, 'likeCount': int(fila.likes)}},
+            },
+        } for i, fila in enumerate(pagina.itertuples(index=False))]
+        respuesta = {'items': items}
+        if inicio + tam < len(df):
+            respuesta['nextPageToken'] = f"p{inicio + tam}"
+        return respuesta
+
+
+class _PeticionFalsa:
+    def __init__(self, api, video_id, tam, token):
+        self.api, self.video_id, self.tam, self.token = api, video_id, tam, token
+
+    def execute(self):
+        return self.api._responder(self.video_id, self.tam, self.token)
@@ -0,0 +1,229 @@
+# src/servicio.py
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from .features import procesar_datos
+from .ingesta import COLUMNAS_ENTRADA
+from .embeddings import BATCH_SIZE, _dimension_modelo, deduplicar, codificar_con_cache, generar_embeddings
+from .model import cache_del_codificador
+from .pipeline import obtener_codificador, puntuar_usuarios, UMBRAL_POR_DEFECTO
+from .textos import TextosUsuarios
+
+# Servicio de scoring local y de larga duración: el codificador (BETO u otro backend) y el
+# artefacto se cargan una vez al arrancar y cada petición HTTP sólo paga su propio trabajo.
+# Las peticiones concurrentes no llaman a model.encode por separado: CodificadorAgrupado
+# junta los textos que llegan dentro de una ventana corta (max_espera_ms) en una única
+# llamada (micro-lotes dinámicos), que es donde BETO aprovecha el batching.
+#   POST /puntuar   {"posts": [{"user_id", "text", "timestamp", "likes", "replies"}, ...]}
+#   GET  /metricas  latencia p50/p99, throughput y tamaño medio de los lotes de codificación
+#   GET  /salud
+
+MAX_ESPERA_MS = 5.0        # Presupuesto de espera para juntar peticiones en un lote
+MAX_TEXTOS_LOTE = 1024     # Un lote se cierra antes si ya acumula estos textos
+MUESTRAS_LATENCIA = 10_000
+PUERTO = 8765
+
+
+class CodificadorAgrupado:
+    """
+    Envoltorio con la interfaz de SentenceTransformer que agrupa las llamadas concurrentes
+    a encode: cada hilo deja sus textos en una cola y espera; un hilo codificador toma lo
+    acumulado durante max_espera_ms (o hasta max_textos), deduplica, consulta la caché de
+    embeddings, hace una sola codificación y devuelve a cada llamada sus vectores.
+    """
+
+    def __init__(self, model, max_espera_ms=MAX_ESPERA_MS, max_textos=MAX_TEXTOS_LOTE, cache=None,
+                 batch_size=BATCH_SIZE):
+        self.model = model
+        self.max_espera_s = max_espera_ms / 1000
+        self.max_textos = max_textos
+        self.cache = cache
+        self.batch_size = batch_size
+        self.contadores = {'lotes': 0, 'llamadas': 0, 'textos': 0, 'textos_unicos': 0}
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="codificador-agrupado", daemon=True)
+        self._hilo.start()
+
+    def get_sentence_embedding_dimension(self):
+        return _dimension_modelo(self.model)
+
+    def encode(self, textos, batch_size=None, convert_to_numpy=True, **kwargs):
+        textos = list(textos)
+        if not textos:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        futuro = Future()
+        self._cola.put((textos, futuro))
+        return futuro.result()
+
+    def encode_lotes(self, lotes):
+        """Las cubetas de codificar_corpus viajan juntas; el agrupador rehace las suyas."""
+        vectores = self.encode([t for lote in lotes for t in lote])
+        return np.split(vectores, np.cumsum([len(lote) for lote in lotes])[:-1])
+
+    def _bucle(self):
+        while True:
+            pendientes = [self._cola.get()]
+            if pendientes[0] is None:
+                return
+            n_textos = len(pendientes[0][0])
+            limite = time.perf_counter() + self.max_espera_s
+            while n_textos < self.max_textos:
+                restante = limite - time.perf_counter()
+                try:
+                    siguiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._cola.put(None) # Terminar después de atender este lote
+                    break
+                pendientes.append(siguiente)
+                n_textos += len(siguiente[0])
+            self._codificar(pendientes)
+
+    def _codificar(self, pendientes):
+        corpus = [t for textos, _ in pendientes for t in textos]
+        unicos, inverso = deduplicar(corpus)
+        try:
+            vectores = codificar_con_cache(self.model, unicos, self.batch_size, self.cache)[inverso]
+        except Exception as e:
+            for _, futuro in pendientes:
+                futuro.set_exception(e)
+            return
+        self.contadores['lotes'] += 1
+        self.contadores['llamadas'] += len(pendientes)
+        self.contadores['textos'] += len(corpus)
+        self.contadores['textos_unicos'] += len(unicos)
+        inicio = 0
+        for textos, futuro in pendientes:
+            futuro.set_result(vectores[inicio:inicio + len(textos)])
+            inicio += len(textos)
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+
+class ServicioPuntuacion:
+    """
+    Scoring sin reentrenar contra un artefacto cargado (cargar_modelo), con los mismos
+    pasos que puntuar_dataframe: procesar_datos, embeddings (agrupados entre peticiones),
+    rasgos de coordinación, puntuar y aplicar_umbral. Seguro entre hilos.
+    """
+
+    def __init__(self, modelo, umbral=UMBRAL_POR_DEFECTO, codificador=None, max_espera_ms=MAX_ESPERA_MS,
+                 max_textos=MAX_TEXTOS_LOTE):
+        backend = modelo['backend_embeddings']
+        self.modelo = modelo
+        self.umbral = umbral
+        self.backend = backend
+        base = codificador if codificador is not None else obtener_codificador(backend, modelo)
+        self.codificador = CodificadorAgrupado(base, max_espera_ms, max_textos, cache=cache_del_codificador(base, backend))
+        self._latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self._lock = threading.Lock()
+        self.contadores = {'peticiones': 0, 'usuarios': 0, 'posts': 0, 'errores': 0}
+        self._primera = None
+
+    def puntuar_posts(self, posts):
+        """Posts crudos (dicts con las columnas de la app) -> lista de usuarios puntuados."""
+        inicio = time.perf_counter()
+        df_raw = pd.DataFrame.from_records(posts).reindex(columns=COLUMNAS_ENTRADA)
+        df_users, df_posts = procesar_datos(df_raw)
+        df_users = df_users.fillna(0)
+        resultado = []
+        if len(df_users):
+            X_embeddings = generar_embeddings(self.codificador, TextosUsuarios.desde_posts(df_users, df_posts))
+            df_users = puntuar_usuarios(df_users, X_embeddings, self.umbral, self.modelo)
+            resultado = df_users[['user_id', 'risk_score', 'es_bot', 'num_posts']].to_dict(orient='records')
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self._primera = self._primera or inicio
+            self._latencias.append(latencia_ms)
+            self.contadores['peticiones'] += 1
+            self.contadores['usuarios'] += len(resultado)
+            self.contadores['posts'] += len(df_raw)
+        return resultado, latencia_ms
+
+    def registrar_error(self):
+        with self._lock:
+            self.contadores['errores'] += 1
+
+    def metricas(self):
+        """Latencia (ms) de servidor por petición, throughput desde la primera y lotes de codificación."""
+        with self._lock:
+            latencias = np.asarray(self._latencias)
+            contadores = dict(self.contadores)
+            segundos = time.perf_counter() - self._primera if self._primera else 0
+        codificacion = dict(self.codificador.contadores)
+        lotes = codificacion['lotes']
+        return {
+            **contadores,
+            'latencia_p50_ms': round(float(np.percentile(latencias, 50)), 1) if len(latencias) else None,
+            'latencia_p99_ms': round(float(np.percentile(latencias, 99)), 1) if len(latencias) else None,
+            'peticiones_por_s': round(contadores['peticiones'] / segundos, 1) if segundos else None,
+            'usuarios_por_s': round(contadores['usuarios'] / segundos, 1) if segundos else None,
+            'lotes_codificacion': lotes,
+            'peticiones_por_lote': round(codificacion['llamadas'] / lotes, 2) if lotes else None,
+            'textos_por_lote': round(codificacion['textos'] / lotes, 1) if lotes else None,
+            'textos_unicos_por_lote': round(codificacion['textos_unicos'] / lotes, 1) if lotes else None,
+            'backend': self.backend,
+        }
+
+
+# ================= HTTP =================
+class _Manejador(BaseHTTPRequestHandler):
+    servicio = None  # ServicioPuntuacion (lo fija crear_servidor)
+    protocol_version = 'HTTP/1.1'  # Conexiones persistentes: el cliente no reabre TCP por petición
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == '/metricas':
+            self._responder(200, self.servicio.metricas())
+        elif self.path == '/salud':
+            self._responder(200, {'estado': 'ok', 'backend': self.servicio.backend})
+        else:
+            self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/puntuar':
+            self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+            return
+        try:
+            cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            posts = cuerpo.get('posts') if isinstance(cuerpo, dict) else cuerpo
+            if not isinstance(posts, list) or not all(isinstance(p, dict) for p in posts):
+                raise ValueError("Se esperaba {\"posts\": [{\"user_id\", \"text\", \"timestamp\", \"likes\", \"replies\"}, ...]}")
+        except ValueError as e:
+            self.servicio.registrar_error()
+            self._responder(400, {'error': str(e)})
+            return
+        try:
+            usuarios, latencia_ms = self.servicio.puntuar_posts(posts)
+        except Exception as e:
+            self.servicio.registrar_error()
+            self._responder(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._responder(200, {'usuarios': usuarios, 'latencia_ms': round(latencia_ms, 1)})
+
+    def log_message(self, formato, *args):
+        pass # Sin una línea por petición: las métricas están en /metricas
+
+
+def crear_servidor(servicio, host='127.0.0.1', puerto=PUERTO):
+    """Servidor HTTP con un hilo por conexión (puerto 0 = uno libre). Arrancar con serve_forever()."""
+    manejador = type('Manejador', (_Manejador,), {'servicio': servicio})
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
@@ -0,0 +1,131 @@
+# src/sintetico.py
+import zlib
+import numpy as np
+import pandas as pd
+from .embeddings import DIM_EMBEDDING
+
+# Generador de cargas sintéticas bots/humanos con las mismas columnas que un scrape
+# (user_id, text, timestamp, likes, replies), para benchmarks y demos reproducibles.
+# Los bots se reconocen por el prefijo "bot_" del user_id (etiqueta de referencia).
+#   Humanos: nº de posts de cola larga (lognormal), textos variados, horario diurno, interacciones.
+#   Bots: muchos posts, copias casi idénticas de unas pocas campañas, ráfagas de segundos
+#   o cadencia de reloj, casi sin likes ni respuestas.
+
+SILABAS = ['ma', 'pe', 'lo', 'ti', 'sa', 'ra', 'de', 'con', 'vi', 'da', 'mu', 'cho', 'ne', 'gra',
+           'por', 'que', 'ba', 'le', 'zo', 'fi', 'tre', 'gu', 'no', 'es', 'pla', 'in', 'ca', 'so']
+N_PALABRAS = 3000              # Tamaño del vocabulario sintético
+ADORNOS = ['👍', '😂', '🔥', '@usuario', 'http://enlace.com/x', '#tema', '!!', '?']
+PROPORCION_ADORNOS = 0.15      # Posts con emoji, mención, URL o hashtag (ejercitan limpiar_texto)
+HORAS_HUMANO = np.array([1, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 6, 7, 7, 6, 6, 6, 7, 8, 9, 9, 7, 4, 2], dtype=float)
+
+
+def _vocabulario(rng):
+    n_silabas = rng.integers(1, 4, N_PALABRAS)
+    indices = rng.integers(0, len(SILABAS), (N_PALABRAS, 3))
+    return np.array([''.join(SILABAS[j] for j in fila[:n]) for fila, n in zip(indices, n_silabas)], dtype=object)
+
+
+def _frases(rng, vocabulario, longitudes):
+    """Un texto por elemento de `longitudes` (caracteres aproximados, ~5 por palabra)."""
+    n_palabras = np.maximum(1, longitudes // 5)
+    palabras = vocabulario[rng.integers(0, len(vocabulario), n_palabras.sum())]
+    fines = np.cumsum(n_palabras)
+    return [' '.join(palabras[fin - n:fin]) for fin, n in zip(fines, n_palabras)]
+
+
+def generar_dataset(n_usuarios=1_000, proporcion_bots=0.1, media_posts_humano=5, media_posts_bot=40,
+                    proporcion_spam=0.7, proporcion_rafagas=0.5, n_campanas=5, longitud_media=80,
+                    dias=30, inicio='2024-01-01', semilla=0):
+    """
+    DataFrame de posts sintéticos (orden aleatorio, como un scrape real).
+    - media_posts_humano / media_posts_bot: media del nº de posts por cuenta
+      (lognormal para humanos, Poisson para bots);
+    - proporcion_spam: fracción de posts de bot que copian (con pequeñas variaciones)
+      uno de los n_campanas mensajes de campaña;
+    - proporcion_rafagas: bots que publican en ráfagas de segundos; el resto sigue una
+      cadencia fija (cada 5-60 min);
+    - longitud_media: caracteres medios por texto (lognormal).
+    """
+    rng = np.random.default_rng(semilla)
+    vocabulario = _vocabulario(rng)
+    n_bots = int(round(n_usuarios * proporcion_bots))
+    n_humanos = n_usuarios - n_bots
+    t0 = pd.Timestamp(inicio).value // 10**6  # ms
+    ms_dia = 86_400_000
+
+    # --- Nº de posts por cuenta ---
+    sigma = 1.0
+    posts_h = np.maximum(1, rng.lognormal(np.log(media_posts_humano) - sigma**2 / 2, sigma, n_humanos).round()).astype(np.int64)
+    posts_b = 1 + rng.poisson(max(media_posts_bot - 1, 0), n_bots)
+    ids_h = np.char.add('user_', np.arange(n_humanos).astype(str)).astype(object)
+    ids_b = np.char.add('bot_', np.arange(n_bots).astype(str)).astype(object)
+
+    # --- Humanos: textos variados, horario diurno, interacciones ---
+    total_h = posts_h.sum()
+    longitudes = np.maximum(5, rng.lognormal(np.log(longitud_media) - 0.18, 0.6, total_h)).astype(np.int64)
+    textos_h = _frases(rng, vocabulario, longitudes)
+    dia = rng.integers(0, dias, total_h)
+    hora = rng.choice(24, total_h, p=HORAS_HUMANO / HORAS_HUMANO.sum())
+    ms_h = t0 + dia * ms_dia + hora * 3_600_000 + rng.integers(0, 3_600_000, total_h)
+    humanos = pd.DataFrame({
+        'user_id': np.repeat(ids_h, posts_h),
+        'text': textos_h,
+        'timestamp': ms_h,
+        'likes': rng.poisson(6, total_h),
+        'replies': rng.poisson(1.5, total_h),
+    })
+
+    # --- Bots: campañas casi duplicadas, ráfagas o cadencia de reloj ---
+    total_b = posts_b.sum()
+    campanas = _frases(rng, vocabulario, np.full(n_campanas, max(longitud_media, 40)))
+    es_spam = rng.random(total_b) < proporcion_spam
+    campana = rng.integers(0, n_campanas, total_b)
+    propios = iter(_frases(rng, vocabulario, np.full(total_b - es_spam.sum(), longitud_media)))
+    sufijos = vocabulario[rng.integers(0, len(vocabulario), total_b)]
+    textos_b = [f"{campanas[c]} {s}" if spam else next(propios)
+                for spam, c, s in zip(es_spam, campana, sufijos)]
+
+    cuenta = np.repeat(np.arange(n_bots), posts_b)
+    orden_en_cuenta = np.arange(total_b) - np.repeat(np.cumsum(posts_b) - posts_b, posts_b)
+    rafaguero = rng.random(n_bots) < proporcion_rafagas
+    arranque = t0 + rng.integers(0, dias * ms_dia, n_bots)
+    paso = np.where(rafaguero, 0, rng.integers(5, 61, n_bots) * 60_000) # Cadencia fija (ms)
+    # Ráfagas: huecos exponenciales de ~5 s; cadencia: el paso fijo con ±1 s de jitter
+    huecos = np.where(rafaguero[cuenta], rng.exponential(5_000, total_b), paso[cuenta] + rng.integers(-1000, 1001, total_b))
+    huecos[orden_en_cuenta == 0] = 0
+    acumulado = np.cumsum(huecos)
+    acumulado -= np.repeat(acumulado[np.cumsum(posts_b) - posts_b], posts_b)
+    bots = pd.DataFrame({
+        'user_id': ids_b[cuenta],
+        'text': textos_b,
+        'timestamp': (arranque[cuenta] + acumulado).astype(np.int64),
+        'likes': rng.poisson(0.2, total_b),
+        'replies': rng.poisson(0.05, total_b),
+    })
+
+    df = pd.concat([humanos, bots], ignore_index=True)
+    adornar = rng.random(len(df)) < PROPORCION_ADORNOS
+    adornos = np.array(ADORNOS, dtype=object)[rng.integers(0, len(ADORNOS), adornar.sum())]
+    df.loc[adornar, 'text'] = df.loc[adornar, 'text'].values + ' ' + adornos
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+class CodificadorSintetico:
+    """
+    Codificador de juguete con la interfaz de SentenceTransformer: cada texto recibe un
+    vector pseudoaleatorio fijo (crc32 del texto). Sin red neuronal ni descargas, para
+    medir el resto del pipeline sin el coste (ni la variabilidad) del modelo.
+    """
+    N_BASE = 4096
+
+    def __init__(self, dim=DIM_EMBEDDING, semilla=0):
+        self.dim = dim
+        self._base = np.random.default_rng(semilla).standard_normal((self.N_BASE, dim)).astype(np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, textos, batch_size=None, convert_to_numpy=True, **kwargs):
+        claves = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in textos), dtype=np.int64, count=len(textos))
+        return self._base[claves % self.N_BASE] + self._base[(claves >> 12) % self.N_BASE] * 0.5
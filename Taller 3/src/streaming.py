@@ -0,0 +1,511 @@
+# src/streaming.py
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from .preprocess import limpiar_textos
+from .lexico import hashes_estables, ConteoDistintos
+from .ingesta import COLUMNAS_ENTRADA
+from .features import COLUMNAS_METRICAS, parsear_tiempos
+from .temporal import rasgos_temporales, COLUMNAS_TEMPORALES
+from .campanas import firmas_minhash, N_BANDAS, MIN_CARACTERES, UMBRAL_SIMILITUD as UMBRAL_CAMPANA
+from .coordinacion import (vecinos_en_referencia, en_carga, VECINOS, CANDIDATOS_POR_VECINO, VENTANA_HORAS,
+                           UMBRAL_SIMILITUD as UMBRAL_COORDINACION, COLUMNAS_COORDINACION)
+from .embeddings import _dimension_modelo, deduplicar, codificar_con_cache
+from .model import puntuar
+from .pipeline import UMBRAL_POR_DEFECTO
+
+# Modo en vivo: se sigue un JSON lines (o un directorio de ellos, p. ej. la salida de
+# recolectar_youtube.py) y cada comentario nuevo actualiza el estado incremental de su
+# usuario (los estadísticos de AcumuladorUsuarios, la suma de embeddings y bocetos de
+# tokens/textos distintos). Sólo los usuarios afectados se vuelven a puntuar contra un
+# artefacto ya entrenado (cargar_modelo): no se reentrena.
+# La memoria está acotada: como mucho max_usuarios en estado (LRU) y los inactivos
+# más de ttl_s se desalojan; un usuario desalojado que vuelve empieza de cero. Dentro de
+# cada usuario tampoco crece nada sin límite: los distintos (ttr, tasa_repeticion y cuentas
+# por grupo de campaña) se cuentan con bocetos KMV de K_DISTINTOS hashes, exactos hasta
+# K_DISTINTOS valores distintos, y sólo se recuerdan sus MAX_GRUPOS_USUARIO grupos recientes.
+# Los hashes son los estables de pd.util.hash_array (como en ingesta), no hash(), que
+# cambia entre procesos: dos ejecuciones sobre los mismos comentarios dan los mismos scores.
+# Rasgos que en el batch dependen del corpus completo, aproximados en vivo:
+# - temporales: sobre los últimos MAX_TIEMPOS timestamps de cada usuario;
+# - campañas: LSH incremental (cada texto se une al primer grupo con firma similar);
+# - coordinación: k vecinos más similares entre los usuarios en estado y la muestra de
+#   entrenamiento del artefacto (referencia_coordinacion), sin simetrizar.
+
+MAX_USUARIOS = 20_000
+TTL_S = 6 * 3600            # Inactividad (reloj del proceso) tras la que se desaloja un usuario
+MAX_TIEMPOS = 500           # Timestamps recientes por usuario para los rasgos temporales
+MAX_GRUPOS = 100_000        # Grupos de campaña en memoria (LRU)
+MAX_GRUPOS_USUARIO = 64     # Grupos de campaña recientes recordados por usuario
+K_DISTINTOS = 512           # Hashes por boceto de distintos (error ~1/sqrt(K) por encima)
+MAX_IDS_VISTOS = 200_000    # comment_id recientes para descartar comentarios repetidos
+MUESTRAS_LATENCIA = 10_000  # Latencias recientes para p50/p99
+TAM_LOTE = 500              # Comentarios por micro-lote de scoring
+BYTES_POR_LECTURA = 8 * 2**20
+INTERVALO_S = 1.0
+N_TOP = 20
+
+
+# ================= SEGUIMIENTO DE ARCHIVOS =================
+class SeguidorJSONL:
+    """
+    Lee las líneas nuevas de un archivo JSON lines o de los *.jsonl de un directorio,
+    recordando la posición de cada archivo. Una línea sólo se consume cuando está
+    completa (termina en salto de línea); si un archivo se trunca, se relee desde el inicio.
+    Una línea más larga que max_bytes se sigue leyendo hasta su salto de línea.
+    Por defecto empieza al final de lo ya escrito (como tail -f).
+    """
+
+    def __init__(self, ruta, desde_inicio=False):
+        self.ruta = ruta
+        self.lineas_invalidas = 0
+        self._posiciones = {}
+        if not desde_inicio:
+            self._posiciones = {a: os.path.getsize(a) for a in self.archivos()}
+
+    def archivos(self):
+        if os.path.isdir(self.ruta):
+            return sorted(os.path.join(self.ruta, f) for f in os.listdir(self.ruta)
+                          if f.lower().endswith('.jsonl'))
+        return [self.ruta] if os.path.exists(self.ruta) else []
+
+    def leer(self, max_bytes=BYTES_POR_LECTURA):
+        """Registros (dicts) de las líneas completas añadidas desde la última lectura."""
+        registros = []
+        for archivo in self.archivos():
+            posicion = self._posiciones.get(archivo, 0)
+            if os.path.getsize(archivo) < posicion:
+                posicion = 0
+            with open(archivo, 'rb') as f:
+                f.seek(posicion)
+                partes = [f.read(max_bytes)]
+                while partes[-1] and b'\n' not in partes[-1]: # Sin línea completa todavía
+                    partes.append(f.read(max_bytes))
+            datos = b''.join(partes)
+            fin = datos.rfind(b'\n') + 1
+            self._posiciones[archivo] = posicion + fin
+            for linea in datos[:fin].splitlines():
+                if not linea.strip():
+                    continue
+                try:
+                    registros.append(json.loads(linea))
+                except ValueError:
+                    self.lineas_invalidas += 1
+        return registros
+
+
+# ================= ESTADO INCREMENTAL =================
+class _Usuario:
+    """Estado de un usuario: los estadísticos de AGREGACION, bocetos de distintos y timestamps recientes."""
+    __slots__ = ('fila', 'num_posts', 'n_validos', 'ts_min', 'ts_max', 'nocturnos', 'suma_likes', 'n_likes',
+                 'suma_replies', 'n_replies', 'n_tokens', 'tokens', 'textos', 'grupos', 'tiempos',
+                 'ultimo_uso', 'risk_score', 'es_bot')
+
+    def __init__(self, fila, max_tiempos):
+        self.fila = fila
+        self.num_posts = self.n_validos = self.nocturnos = self.n_likes = self.n_replies = self.n_tokens = 0
+        self.suma_likes = self.suma_replies = 0.0
+        self.ts_min = self.ts_max = None  # ms epoch
+        self.tokens, self.textos = ConteoDistintos(K_DISTINTOS), ConteoDistintos(K_DISTINTOS)
+        self.grupos = OrderedDict()     # Grupos de campaña recientes (conjunto LRU)
+        self.tiempos = deque(maxlen=max_tiempos)
+        self.ultimo_uso = 0.0
+        self.risk_score = None
+        self.es_bot = False
+
+
+class CampanasEnVivo:
+    """
+    Versión incremental de IndiceCampanas: cada texto largo se asigna al primer grupo
+    que comparte una banda LSH con él y cuya firma representante tiene Jaccard estimada
+    >= UMBRAL_CAMPANA; si no hay ninguno, abre un grupo nuevo. Grupos LRU acotados.
+    """
+
+    def __init__(self, max_grupos=MAX_GRUPOS):
+        self.max_grupos = max_grupos
+        self._cubos = {}                # (banda, clave) -> grupo
+        self._grupos = OrderedDict()    # grupo -> [firma, claves, posts, ConteoDistintos de cuentas]
+        self._siguiente = 0
+
+    def __len__(self):
+        return len(self._grupos)
+
+    def agregar(self, user_ids, textos):
+        """Grupo de cada post (-1 si es corto)."""
+        grupos = np.full(len(textos), -1, dtype=np.int64)
+        largos = [i for i, t in enumerate(textos) if len(t) >= MIN_CARACTERES]
+        if not largos:
+            return grupos
+        firmas = firmas_minhash([textos[i] for i in largos])
+        hashes_usuario = hashes_estables([user_ids[i] for i in largos])
+        for i, firma, hash_usuario in zip(largos, firmas, hashes_usuario):
+            claves = [(b, banda.tobytes()) for b, banda in enumerate(np.split(firma, N_BANDAS))]
+            grupo = self._buscar(firma, claves)
+            if grupo is None:
+                grupo = self._nuevo(firma, claves)
+            datos = self._grupos[grupo]
+            self._grupos.move_to_end(grupo)
+            datos[2] += 1
+            datos[3].agregar(hash_usuario[None])
+            grupos[i] = grupo
+        return grupos
+
+    def _buscar(self, firma, claves):
+        for clave in claves:
+            grupo = self._cubos.get(clave)
+            if grupo is not None and np.mean(self._grupos[grupo][0] == firma) >= UMBRAL_CAMPANA:
+                return grupo
+        return None
+
+    def _nuevo(self, firma, claves):
+        if len(self._grupos) >= self.max_grupos:
+            _, (_, viejas, _, _) = self._grupos.popitem(last=False)
+            for clave in viejas:
+                self._cubos.pop(clave, None)
+        grupo = self._siguiente
+        self._siguiente += 1
+        libres = [c for c in claves if c not in self._cubos]
+        self._cubos.update((c, grupo) for c in libres)
+        self._grupos[grupo] = [firma, libres, 0, ConteoDistintos(K_DISTINTOS)]
+        return grupo
+
+    def rasgos(self, grupos):
+        """(posts_campana, cuentas_campana) del grupo con más posts entre `grupos`."""
+        mejor = (0, 0)
+        for grupo in grupos:
+            datos = self._grupos.get(grupo)
+            if datos is not None:
+                mejor = max(mejor, (datos[2], len(datos[3])))
+        return mejor
+
+
+class MonitorEnVivo:
+    """
+    Estado por usuario con memoria acotada y re-scoring incremental contra un artefacto
+    cargado. procesar() recibe comentarios crudos (dicts con user_id, text, timestamp,
+    likes, replies y opcionalmente comment_id) y devuelve los usuarios re-puntuados.
+    Los usuarios que cruzan el umbral se añaden a ruta_alertas (JSON lines, sólo añadir).
+    """
+
+    def __init__(self, modelo, codificador, umbral=UMBRAL_POR_DEFECTO, max_usuarios=MAX_USUARIOS, ttl_s=TTL_S,
+                 max_tiempos=MAX_TIEMPOS, cache=None, ruta_alertas=None, reloj=time.monotonic):
+        self.modelo = modelo
+        self.codificador = codificador
+        self.umbral = umbral
+        self.max_usuarios = max_usuarios
+        self.ttl_s = ttl_s
+        self.max_tiempos = max_tiempos
+        self.cache = cache
+        self.ruta_alertas = ruta_alertas
+        self.reloj = reloj
+        self.campanas = CampanasEnVivo()
+        self._usuarios = OrderedDict()  # user_id -> _Usuario, del menos al más reciente
+        self._libres = []               # Filas de _suma_emb liberadas por desalojos
+        dim = _dimension_modelo(codificador)
+        self._suma_emb = np.zeros((0, dim), dtype=np.float32)
+        self._inicio = np.zeros(0)      # Actividad (segundos epoch) por fila, para la ventana de coordinación
+        self._fin = np.zeros(0)
+        self._activa = np.zeros(0, dtype=bool)
+        self._n_filas = 0
+        self._vistos = OrderedDict()
+        self._latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self.contadores = {'comentarios': 0, 'repetidos': 0, 'lotes': 0, 'desalojados': 0, 'alertas': 0}
+
+    def __len__(self):
+        return len(self._usuarios)
+
+    # ----------------- Estado por usuario -----------------
+    def _fila_libre(self):
+        if self._libres:
+            return self._libres.pop()
+        fila = self._n_filas
+        if fila == len(self._activa): # Crece por duplicación hasta max_usuarios filas
+            extra = min(max(2 * fila, 1024), self.max_usuarios) - fila
+            self._suma_emb = np.vstack([self._suma_emb, np.zeros((extra, self._suma_emb.shape[1]), dtype=np.float32)])
+            self._inicio = np.r_[self._inicio, np.zeros(extra)]
+            self._fin = np.r_[self._fin, np.zeros(extra)]
+            self._activa = np.r_[self._activa, np.zeros(extra, dtype=bool)]
+        self._n_filas += 1
+        return fila
+
+    def _usuario(self, user_id, ahora):
+        usuario = self._usuarios.get(user_id)
+        if usuario is None:
+            if len(self._usuarios) >= self.max_usuarios:
+                self._desalojar(next(iter(self._usuarios)))
+            usuario = _Usuario(self._fila_libre(), self.max_tiempos)
+            self._suma_emb[usuario.fila] = 0
+            self._activa[usuario.fila] = True
+            self._usuarios[user_id] = usuario
+        else:
+            self._usuarios.move_to_end(user_id)
+        usuario.ultimo_uso = ahora
+        return usuario
+
+    def _desalojar(self, user_id):
+        usuario = self._usuarios.pop(user_id)
+        self._activa[usuario.fila] = False
+        self._inicio[usuario.fila] = self._fin[usuario.fila] = 0
+        self._libres.append(usuario.fila)
+        self.contadores['desalojados'] += 1
+
+    def desalojar_inactivos(self, ahora=None):
+        """Desaloja los usuarios sin actividad en los últimos ttl_s segundos."""
+        ahora = self.reloj() if ahora is None else ahora
+        while self._usuarios:
+            user_id, usuario = next(iter(self._usuarios.items()))
+            if usuario.ultimo_uso >= ahora - self.ttl_s:
+                break
+            self._desalojar(user_id)
+
+    def _nuevo_comentario(self, comment_id):
+        """False si el comment_id ya se vio (la recolección puede repetir una página)."""
+        if comment_id is None or (isinstance(comment_id, float) and np.isnan(comment_id)):
+            return True
+        if comment_id in self._vistos:
+            return False
+        self._vistos[comment_id] = None
+        if len(self._vistos) > MAX_IDS_VISTOS:
+            self._vistos.popitem(last=False)
+        return True
+
+    # ----------------- Procesamiento -----------------
+    def procesar(self, registros, recibido=None):
+        """
+        Incorpora un micro-lote de comentarios y re-puntúa a sus autores.
+        `recibido` (time.perf_counter) es el momento en que se leyeron: la latencia de
+        cada comentario se mide desde ahí hasta tener el nuevo score de su usuario.
+        Devuelve un DataFrame (user_id, risk_score, es_bot, ...) de los usuarios afectados.
+        """
+        recibido = time.perf_counter() if recibido is None else recibido
+        nuevos = [r for r in registros if self._nuevo_comentario(r.get('comment_id'))]
+        self.contadores['repetidos'] += len(registros) - len(nuevos)
+        df = pd.DataFrame.from_records(nuevos).reindex(columns=COLUMNAS_ENTRADA)
+        df = df[df['user_id'].notna()]
+        if df.empty:
+            return pd.DataFrame(columns=['user_id', 'risk_score', 'es_bot'])
+
+        user_ids = df['user_id'].astype(str).tolist()
+        textos = limpiar_textos(df['text']).tolist()
+        tiempos, horas = parsear_tiempos(df['timestamp'])
+        validos = tiempos.notna().values
+        ms = np.where(validos, tiempos.values.astype('datetime64[ms]').astype(np.int64), 0)
+        nocturnos = validos & (horas.fillna(12).values < 6)
+        likes = pd.to_numeric(df['likes'], errors='coerce').values
+        replies = pd.to_numeric(df['replies'], errors='coerce').values
+
+        unicos, inverso = deduplicar(textos)
+        vectores = codificar_con_cache(self.codificador, unicos, cache=self.cache)[inverso]
+        grupos = self.campanas.agregar(user_ids, textos)
+        hashes_textos = hashes_estables(unicos)[inverso]
+        tokens = [t.split() for t in textos]
+        fin_tokens = np.cumsum([len(t) for t in tokens])
+        hashes_tokens = hashes_estables([tok for t in tokens for tok in t])
+
+        ahora = self.reloj()
+        for i, user_id in enumerate(user_ids):
+            u = self._usuario(user_id, ahora)
+            u.num_posts += 1
+            if validos[i]:
+                u.n_validos += 1
+                u.ts_min = ms[i] if u.ts_min is None else min(u.ts_min, ms[i])
+                u.ts_max = ms[i] if u.ts_max is None else max(u.ts_max, ms[i])
+                u.tiempos.append(ms[i])
+            u.nocturnos += int(nocturnos[i])
+            if not np.isnan(likes[i]):
+                u.suma_likes += likes[i]
+                u.n_likes += 1
+            if not np.isnan(replies[i]):
+                u.suma_replies += replies[i]
+                u.n_replies += 1
+            u.n_tokens += len(tokens[i])
+            u.tokens.agregar(hashes_tokens[fin_tokens[i] - len(tokens[i]):fin_tokens[i]])
+            u.textos.agregar(hashes_textos[i:i + 1])
+            if grupos[i] >= 0:
+                u.grupos[int(grupos[i])] = None
+                u.grupos.move_to_end(int(grupos[i]))
+                if len(u.grupos) > MAX_GRUPOS_USUARIO:
+                    u.grupos.popitem(last=False)
+            self._suma_emb[u.fila] += vectores[i]
+            if u.ts_min is not None:
+                self._inicio[u.fila], self._fin[u.fila] = u.ts_min / 1000, u.ts_max / 1000
+
+        afectados = [u for u in dict.fromkeys(user_ids) if u in self._usuarios]
+        df_users, X_embeddings = self._rasgos(afectados)
+        df_users = puntuar(df_users, X_embeddings, self.modelo)
+        df_users['es_bot'] = df_users['risk_score'] > self.umbral
+        self._registrar_scores(df_users)
+
+        latencia_ms = (time.perf_counter() - recibido) * 1000
+        self._latencias.extend([latencia_ms] * len(user_ids))
+        self.contadores['comentarios'] += len(user_ids)
+        self.contadores['lotes'] += 1
+        self.desalojar_inactivos(ahora)
+        return df_users
+
+    def _rasgos(self, user_ids):
+        """df_users (COLUMNAS_METRICAS + coordinación) y X_embeddings de los usuarios indicados."""
+        usuarios = [self._usuarios[u] for u in user_ids]
+        n = len(usuarios)
+        num_posts = np.array([u.num_posts for u in usuarios], dtype=np.int64)
+        n_validos = np.array([u.n_validos for u in usuarios])
+        ts_min = np.array([u.ts_min if u.ts_min is not None else np.nan for u in usuarios], dtype=np.float64)
+        ts_max = np.array([u.ts_max if u.ts_max is not None else np.nan for u in usuarios], dtype=np.float64)
+        n_tokens = np.array([u.n_tokens for u in usuarios], dtype=np.float64)
+
+        # Mismas fórmulas que AcumuladorUsuarios.resultado()
+        rango_ms = np.nan_to_num(ts_max - ts_min)
+        intervalo = np.divide(rango_ms / 60_000, n_validos - 1, out=np.zeros(n), where=n_validos > 1)
+        rango_dias = rango_ms // 86_400_000
+        frecuencia = np.where(num_posts > 1, num_posts / np.where(rango_dias > 0, rango_dias, 1), 1)
+        n_likes = np.array([u.n_likes for u in usuarios])
+        n_replies = np.array([u.n_replies for u in usuarios])
+        campanas = np.array([self.campanas.rasgos(u.grupos) for u in usuarios], dtype=np.int64).reshape(n, 2)
+
+        longitudes = [len(u.tiempos) for u in usuarios]
+        tiempos = np.fromiter((t for u in usuarios for t in u.tiempos), dtype=np.int64, count=sum(longitudes))
+        df_temporal = rasgos_temporales(np.repeat(np.arange(n), longitudes), tiempos.astype('datetime64[ms]'), n)
+
+        df_users = pd.DataFrame({
+            'user_id': user_ids,
+            'num_posts': num_posts,
+            'intervalo_medio': intervalo,
+            'frecuencia_diaria': frecuencia,
+            'nocturnidad': [u.nocturnos / u.num_posts for u in usuarios],
+            **{c: df_temporal[c].values for c in COLUMNAS_TEMPORALES},
+            'avg_likes': np.divide([u.suma_likes for u in usuarios], n_likes, out=np.zeros(n), where=n_likes > 0),
+            'avg_replies': np.divide([u.suma_replies for u in usuarios], n_replies, out=np.zeros(n),
+                                     where=n_replies > 0),
+            'ttr': np.divide(np.minimum([len(u.tokens) for u in usuarios], n_tokens), n_tokens, out=np.zeros(n),
+                             where=n_tokens > 0),
+            'tasa_repeticion': np.where(num_posts >= 2,
+                                        (num_posts - np.minimum([len(u.textos) for u in usuarios], num_posts))
+                                        / num_posts, 0),
+            'longitud_promedio': n_tokens / num_posts,
+            'posts_campana': campanas[:, 0],
+            'cuentas_campana': campanas[:, 1],
+            'inicio_actividad': np.nan_to_num(ts_min / 1000),
+            'fin_actividad': np.nan_to_num(ts_max / 1000),
+        })[COLUMNAS_METRICAS]
+
+        filas = np.array([u.fila for u in usuarios], dtype=np.int64)
+        df_users[COLUMNAS_COORDINACION] = self._coordinacion(filas)
+        X_embeddings = self._suma_emb[filas].astype(np.float64) / num_posts[:, None]
+        return df_users, X_embeddings
+
+    def _coordinacion(self, filas, k=VECINOS, ventana_horas=VENTANA_HORAS, umbral=UMBRAL_COORDINACION):
+        """
+        vecinos_coordinados y similitud_vecinos de `filas` frente a todos los usuarios en
+        estado y los de referencia del artefacto: sus k vecinos más similares (coseno del
+        embedding medio) cuya actividad está a menos de ventana_horas de la suya. Los de
+        referencia que también están en estado no cuentan: ya son vecinos como usuarios vivos.
+        """
+        n = self._n_filas
+        normas = np.linalg.norm(self._suma_emb[:n], axis=1)
+        Xn = self._suma_emb[:n] / np.where(normas > 0, normas, 1)[:, None]
+        sim = Xn[filas] @ Xn.T
+        inicio, fin = self._inicio[:n], self._fin[:n]
+        ventana = ventana_horas * 3600
+        validos = (self._activa[:n] & (inicio > 0))[None, :] & (self._inicio[filas] > 0)[:, None]
+        validos &= (inicio[None, :] <= self._fin[filas][:, None] + ventana)
+        validos &= (self._inicio[filas][:, None] <= fin[None, :] + ventana)
+        validos[np.arange(len(filas)), filas] = False
+        sim = np.where(validos, sim, -np.inf)
+        referencia = self.modelo.get('referencia_coordinacion')
+        if referencia is not None:
+            sim_r, idx_r = vecinos_en_referencia(Xn[filas], referencia, k * CANDIDATOS_POR_VECINO)
+            sim_r[en_carga(referencia, self._usuarios.keys())[idx_r]] = -np.inf
+            inicio_r, fin_r = referencia['inicio'][idx_r], referencia['fin'][idx_r]
+            validos_r = (inicio_r > 0) & (self._inicio[filas] > 0)[:, None]
+            validos_r &= (inicio_r <= self._fin[filas][:, None] + ventana)
+            validos_r &= (self._inicio[filas][:, None] <= fin_r + ventana)
+            sim = np.hstack([sim, np.where(validos_r, sim_r, -np.inf)])
+
+        k = min(k, sim.shape[1])
+        top = np.partition(sim, sim.shape[1] - k, axis=1)[:, -k:] if k else np.zeros((len(filas), 0))
+        finitos = np.isfinite(top)
+        grado = finitos.sum(axis=1)
+        suma = np.where(finitos, top, 0).sum(axis=1)
+        return np.column_stack([(finitos & (top >= umbral)).sum(axis=1),
+                                np.divide(suma, grado, out=np.zeros(len(filas)), where=grado > 0)])
+
+    def _registrar_scores(self, df_users):
+        """Guarda el último score de cada usuario y registra las alertas (cruces del umbral)."""
+        alertas = []
+        fecha = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        for fila in df_users[['user_id', 'risk_score', 'es_bot', 'num_posts', 'posts_campana',
+                              'vecinos_coordinados']].itertuples(index=False):
+            usuario = self._usuarios[fila.user_id]
+            if fila.es_bot and not usuario.es_bot:
+                alertas.append({'fecha': fecha, 'user_id': fila.user_id, 'risk_score': round(float(fila.risk_score), 4),
+                                'num_posts': int(fila.num_posts), 'posts_campana': int(fila.posts_campana),
+                                'vecinos_coordinados': int(fila.vecinos_coordinados)})
+            usuario.risk_score = float(fila.risk_score)
+            usuario.es_bot = bool(fila.es_bot)
+        self.contadores['alertas'] += len(alertas)
+        if alertas and self.ruta_alertas:
+            with open(self.ruta_alertas, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(a, ensure_ascii=False) + '\n' for a in alertas)
+        return alertas
+
+    # ----------------- Consultas -----------------
+    def top_sospechosos(self, n=N_TOP):
+        """Los n usuarios en estado con mayor Risk Score."""
+        filas = [(user_id, u.risk_score, u.es_bot, u.num_posts) for user_id, u in self._usuarios.items()
+                 if u.risk_score is not None]
+        df = pd.DataFrame(filas, columns=['user_id', 'risk_score', 'es_bot', 'num_posts'])
+        return df.nlargest(n, 'risk_score').reset_index(drop=True)
+
+    def estadisticas(self):
+        latencias = np.asarray(self._latencias)
+        return {
+            **self.contadores,
+            'usuarios_en_estado': len(self._usuarios),
+            'grupos_campana': len(self.campanas),
+            'latencia_p50_ms': round(float(np.percentile(latencias, 50)), 1) if len(latencias) else None,
+            'latencia_p99_ms': round(float(np.percentile(latencias, 99)), 1) if len(latencias) else None,
+        }
+
+    def guardar_instantanea(self, ruta, n=N_TOP):
+        """Top Sospechosos y estadísticas en un JSON reescrito de forma atómica (lo lee la app)."""
+        instantanea = {
+            'actualizado': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'umbral': self.umbral,
+            **self.estadisticas(),
+            'top': self.top_sospechosos(n).to_dict(orient='records'),
+        }
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(instantanea, f, ensure_ascii=False, indent=1)
+        os.replace(ruta + '.tmp', ruta)
+        return ruta
+
+
+def vigilar(seguidor, monitor, intervalo=INTERVALO_S, ruta_top=None, n_top=N_TOP, tam_lote=TAM_LOTE,
+            max_ciclos=None, hasta_agotar=False, al_procesar=None):
+    """
+    Bucle del modo en vivo: lee lo nuevo, lo procesa en micro-lotes de tam_lote,
+    actualiza la instantánea del Top Sospechosos y espera `intervalo` si no había nada.
+    Con hasta_agotar=True termina en cuanto no quedan líneas nuevas (reproducir un archivo).
+    al_procesar(monitor, df_lote) se llama tras cada micro-lote.
+    """
+    ciclos = 0
+    while max_ciclos is None or ciclos < max_ciclos:
+        ciclos += 1
+        registros = seguidor.leer()
+        recibido = time.perf_counter()
+        for inicio in range(0, len(registros), tam_lote):
+            df_lote = monitor.procesar(registros[inicio:inicio + tam_lote], recibido)
+            if al_procesar:
+                al_procesar(monitor, df_lote)
+        if registros and ruta_top:
+            monitor.guardar_instantanea(ruta_top, n_top)
+        if not registros:
+            monitor.desalojar_inactivos()
+            if hasta_agotar:
+                break
+            time.sleep(intervalo)
+    return monitor
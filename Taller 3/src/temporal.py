@@ -0,0 +1,132 @@
+# src/temporal.py
+import numpy as np
+import pandas as pd
+
+# Rasgos de ráfaga y cadencia sobre los arrays (usuario, timestamp) ordenados globalmente
+# (un único lexsort). Todo con NumPy sobre el corpus completo (searchsorted, reduceat,
+# bincount): O(n log n) en total y sin bucles de Python por usuario.
+
+VENTANAS_MIN = [1, 10, 60]  # Ventanas deslizantes para el pico de posts
+# Bordes (s) del histograma de intervalos entre posts: ráfaga, minutos, horas, días
+BORDES_INTERVALOS = np.array([1, 10, 60, 600, 3600, 6 * 3600, 86400])
+
+COLUMNAS_TEMPORALES = ['max_posts_1min', 'max_posts_10min', 'max_posts_60min',
+                       'cv_intervalos', 'entropia_intervalos', 'entropia_horas']
+MAX_TIEMPOS_USUARIO = 1000  # Timestamps recientes por usuario en la ingesta por bloques
+MIN_COMPACTAR = 1 << 16
+
+
+def _entropia_filas(conteos):
+    """Entropía de Shannon (bits) de cada fila de una matriz de conteos."""
+    totales = conteos.sum(axis=1, keepdims=True)
+    p = np.divide(conteos, totales, out=np.zeros(conteos.shape), where=totales > 0)
+    logp = np.log2(p, out=np.zeros(p.shape), where=p > 0)
+    return 0.0 - (p * logp).sum(axis=1) # 0.0 - x evita -0.0
+
+
+class TiemposRecientes:
+    """
+    Los últimos max_por_usuario timestamps (ms epoch) de cada usuario como dos arrays
+    (código entero del usuario en int32, ms en int64: 12 bytes por timestamp), no como
+    pares por post: la memoria queda en O(usuarios * max_por_usuario) sea cual sea el
+    volumen. Lo añadido se compacta (ordenar y recortar por usuario) cuando supera a lo
+    ya guardado. Para usuarios con <= max_por_usuario timestamps los rasgos son exactos.
+    """
+
+    def __init__(self, max_por_usuario=MAX_TIEMPOS_USUARIO):
+        self.max_por_usuario = max_por_usuario
+        self._codigos = []
+        self._ms = []
+        self._guardados = 0
+        self._pendientes = 0
+
+    def agregar(self, codigos, ms):
+        self._codigos.append(np.asarray(codigos, dtype=np.int32))
+        self._ms.append(np.asarray(ms, dtype=np.int64))
+        self._pendientes += len(self._ms[-1])
+        if self._pendientes > max(self._guardados, MIN_COMPACTAR):
+            self._compactar()
+        return self
+
+    def _compactar(self):
+        codigos = np.concatenate(self._codigos) if self._codigos else np.zeros(0, dtype=np.int32)
+        ms = np.concatenate(self._ms) if self._ms else np.zeros(0, dtype=np.int64)
+        orden = np.lexsort((ms, codigos))
+        codigos, ms = codigos[orden], ms[orden]
+        # Posición contada desde el final del grupo de cada usuario: se conservan los max_por_usuario últimos
+        fin_grupo = np.searchsorted(codigos, codigos, side='right')
+        conservar = fin_grupo - np.arange(len(codigos)) <= self.max_por_usuario
+        self._codigos, self._ms = [codigos[conservar]], [ms[conservar]]
+        self._guardados, self._pendientes = int(conservar.sum()), 0
+
+    def arrays(self):
+        """(códigos de usuario, ms) de todo lo guardado, ordenados por usuario y tiempo."""
+        self._compactar()
+        return self._codigos[0], self._ms[0]
+
+    def fusionar(self, otro, mapa):
+        """Añade los timestamps de otro; mapa[código de otro] = código propio del mismo usuario."""
+        codigos, ms = otro.arrays()
+        return self.agregar(np.asarray(mapa)[codigos], ms)
+
+
+def rasgos_temporales(codigos_usuario, tiempos, n_usuarios):
+    """
+    codigos_usuario: índice 0..n_usuarios-1 del usuario de cada post.
+    tiempos: timestamps (datetime64, NaT permitido) de cada post.
+    Devuelve un DataFrame con una fila por usuario:
+    - max_posts_1min/10min/60min: máximo de posts en cualquier ventana de ese ancho;
+    - cv_intervalos: coeficiente de variación de los intervalos entre posts
+      (≈0 = cadencia de reloj, típica de bots programados);
+    - entropia_intervalos: entropía del histograma logarítmico de intervalos;
+    - entropia_horas: entropía del histograma de hora del día (0 = siempre a la misma hora).
+    Los posts sin timestamp no cuentan; un usuario sin ninguno queda en 0.
+    """
+    codigos = np.asarray(codigos_usuario, dtype=np.int64)
+    tiempos = pd.to_datetime(pd.Series(tiempos)).values.astype('datetime64[ms]')
+    validos = ~np.isnat(tiempos)
+    codigos = codigos[validos]
+    ms = tiempos[validos].astype(np.int64)
+
+    df = pd.DataFrame(0.0, index=np.arange(n_usuarios), columns=COLUMNAS_TEMPORALES)
+    if len(ms) == 0:
+        return df
+
+    # Orden global por (usuario, tiempo) y clave compuesta monótona: usuario * desplazamiento + t
+    orden = np.lexsort((ms, codigos))
+    t0 = ms.min()
+    codigos, ms = codigos[orden], ms[orden] - t0
+    ventana_max = max(VENTANAS_MIN) * 60_000
+    desplazamiento = ms.max() + ventana_max + 1
+    clave = codigos * desplazamiento + ms
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    usuarios = codigos[inicios]
+
+    # --- Picos en ventanas deslizantes: posts en [t_i, t_i + w) para cada post i ---
+    posicion = np.arange(len(clave))
+    for minutos in VENTANAS_MIN:
+        fin = np.searchsorted(clave, clave + minutos * 60_000, side='left')
+        df.loc[usuarios, f'max_posts_{minutos}min'] = np.maximum.reduceat(fin - posicion, inicios)
+
+    # --- Intervalos entre posts consecutivos del mismo usuario ---
+    mismo = np.r_[False, codigos[1:] == codigos[:-1]]
+    intervalos = (np.diff(ms, prepend=0)[mismo]) / 1000 # Segundos
+    cod_int = codigos[mismo]
+    n_int = np.bincount(cod_int, minlength=n_usuarios)
+    suma = np.bincount(cod_int, weights=intervalos, minlength=n_usuarios)
+    media = np.divide(suma, n_int, out=np.zeros(n_usuarios), where=n_int > 0)
+    # Dos pasadas (desvíos respecto a la media): exacto también para cadencias casi constantes
+    suma2 = np.bincount(cod_int, weights=(intervalos - media[cod_int]) ** 2, minlength=n_usuarios)
+    desviacion = np.sqrt(np.divide(suma2, n_int, out=np.zeros(n_usuarios), where=n_int > 0))
+    df['cv_intervalos'] = np.divide(desviacion, media, out=np.zeros(n_usuarios), where=(n_int > 1) & (media > 0))
+
+    n_bins = len(BORDES_INTERVALOS) + 1
+    bins = np.searchsorted(BORDES_INTERVALOS, intervalos, side='right')
+    conteo_int = np.bincount(cod_int * n_bins + bins, minlength=n_usuarios * n_bins).reshape(n_usuarios, n_bins)
+    df['entropia_intervalos'] = _entropia_filas(conteo_int)
+
+    # --- Hora del día ---
+    horas = (ms + t0) // 3_600_000 % 24
+    conteo_horas = np.bincount(codigos * 24 + horas, minlength=n_usuarios * 24).reshape(n_usuarios, 24)
+    df['entropia_horas'] = _entropia_filas(conteo_horas)
+    return df
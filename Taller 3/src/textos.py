@@ -0,0 +1,42 @@
+# src/textos.py
+import numpy as np
+
+# Textos por usuario en formato CSR: un único array con todos los textos limpios,
+# agrupados por usuario, y offsets tales que los textos del usuario i son
+# textos[offsets[i]:offsets[i + 1]]. Sustituye a la columna textos_raw (una lista de
+# Python por fila de df_users): df_users queda sólo numérico, barato de copiar,
+# hashear y cachear, y la etapa de embeddings recorta por offsets sin aplanar listas.
+
+
+class TextosUsuarios:
+    """Textos limpios de cada usuario (mismo orden que las filas de df_users)."""
+
+    def __init__(self, user_ids, textos, offsets):
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.textos = np.asarray(textos, dtype=object)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self.offsets) != len(self.user_ids) + 1 or self.offsets[-1] != len(self.textos):
+            raise ValueError("Offsets incompatibles con los usuarios o los textos")
+
+    @classmethod
+    def desde_posts(cls, df_users, df_processed_posts):
+        """
+        Vista CSR sobre los posts de procesar_datos (ya agrupados por usuario en el orden
+        de df_users): no copia los textos, sólo calcula los offsets desde num_posts.
+        """
+        conteos = df_users['num_posts'].to_numpy(dtype=np.int64)
+        offsets = np.zeros(len(conteos) + 1, dtype=np.int64)
+        np.cumsum(conteos, out=offsets[1:])
+        return cls(df_users['user_id'].to_numpy(), df_processed_posts['texto_limpio'].to_numpy(dtype=object), offsets)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __getitem__(self, i):
+        """Textos del usuario en la posición i."""
+        return self.textos[self.offsets[i]:self.offsets[i + 1]]
+
+    def de_usuario(self, user_id):
+        """Textos de un user_id (vacío si no existe)."""
+        posiciones = np.flatnonzero(self.user_ids == user_id)
+        return self[posiciones[0]] if len(posiciones) else self.textos[:0]
@@ -0,0 +1,54 @@
+import tracemalloc
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from src.anomalias import MotorAnomalias
+from bench_anomalias import datos_sinteticos, regresiones
+
+
+@pytest.fixture(scope='module')
+def X():
+    return datos_sinteticos(3_000)
+
+
+def test_configuracion_por_defecto_igual_a_isolation_forest(X):
+    original = IsolationForest(n_estimators=100, contamination=0.2, random_state=42).fit(X)
+    motor = MotorAnomalias().fit(X)
+    np.testing.assert_array_equal(motor.decision_function(X), original.decision_function(X))
+    np.testing.assert_array_equal(motor.predict(X), original.predict(X))
+
+
+@pytest.mark.parametrize('tam_bloque', [1, 7, 1_000, 10**6])
+def test_puntuar_por_bloques_no_cambia_scores(X, tam_bloque):
+    completo = MotorAnomalias(n_bosques=2).fit(X)
+    por_bloques = MotorAnomalias(n_bosques=2, tam_bloque=tam_bloque).fit(X)
+    np.testing.assert_array_equal(por_bloques.decision_function(X[:200]), completo.decision_function(X[:200]))
+
+
+def test_submuestra_y_varios_bosques(X):
+    motor = MotorAnomalias(max_muestras_ajuste=500, n_bosques=3).fit(X)
+    assert len(motor.bosques_) == 3
+    assert all(b.max_samples_ == 256 for b in motor.bosques_)
+    decision = motor.decision_function(X)
+    # Los bots (primer 5%, desplazados) quedan más anómalos que el resto
+    assert decision[:150].mean() < decision[150:].mean()
+
+
+def test_memoria_de_scoring_plana():
+    """El pico de decision_function no crece con los usuarios más allá de la salida (8 bytes por fila)."""
+    motor = MotorAnomalias(n_estimadores=20, tam_bloque=2_000, n_jobs=1).fit(datos_sinteticos(2_000))
+    picos = {}
+    for n in (20_000, 200_000):
+        X = datos_sinteticos(n)
+        tracemalloc.start()
+        motor.decision_function(X)
+        picos[n] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    assert picos[200_000] - picos[20_000] < 3 * 8 * 180_000
+
+
+def test_regresiones_de_bench():
+    base = {'10000': {'ajuste_s': 1.0, 'scoring_s': 0.1, 'pico_mb': 2.0}}
+    assert regresiones({'10000': {'ajuste_s': 1.4, 'scoring_s': 0.1, 'pico_mb': 2.0}}, base) == []
+    avisos = regresiones({'10000': {'ajuste_s': 1.6, 'scoring_s': 0.1, 'pico_mb': 3.5}}, base)
+    assert len(avisos) == 2 and 'ajuste_s' in avisos[0] and 'pico_mb' in avisos[1]
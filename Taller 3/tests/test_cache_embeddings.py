@@ -0,0 +1,45 @@
+import numpy as np
+from src.cache_embeddings import CacheEmbeddings
+
+DIM = 8
+
+
+def vectores(textos):
+    return np.array([[len(t) + i for i in range(DIM)] for t in textos], dtype=np.float32)
+
+
+def test_persiste_entre_instancias(tmp_path):
+    textos = ["hola", "que tal", "gracias"]
+    CacheEmbeddings("modelo", DIM, ruta=tmp_path).guardar(textos, vectores(textos))
+
+    otra = CacheEmbeddings("modelo", DIM, ruta=tmp_path)
+    leidos, encontrados = otra.buscar(textos + ["nuevo"])
+    assert encontrados.tolist() == [True, True, True, False]
+    np.testing.assert_array_equal(leidos[:3], vectores(textos))
+    assert not CacheEmbeddings("otro modelo", DIM, ruta=tmp_path).buscar(textos)[1].any()
+
+
+def test_desaloja_los_menos_usados_al_llegar_al_tope(tmp_path):
+    cache = CacheEmbeddings("modelo", DIM, ruta=tmp_path, max_entradas=20)
+    for i in range(20):
+        cache.guardar([f"t{i}"], vectores([f"t{i}"]))
+    cache.buscar(["t0"])  # t0 pasa a ser el más reciente
+    cache.guardar(["t20"], vectores(["t20"]))
+
+    assert len(cache) <= 20
+    encontrados = cache.buscar(["t0", "t1", "t2", "t19", "t20"])[1]
+    assert encontrados.tolist() == [True, False, False, True, True]
+    assert len(CacheEmbeddings("modelo", DIM, ruta=tmp_path, max_entradas=20)) == len(cache)
+
+
+def test_instancia_vieja_ve_lo_escrito_por_otra(tmp_path):
+    vieja = CacheEmbeddings("modelo", DIM, ruta=tmp_path)
+    vieja.guardar(["a"], vectores(["a"]))
+    otra = CacheEmbeddings("modelo", DIM, ruta=tmp_path)
+    otra.guardar(["bb"], vectores(["bb"]))
+
+    leidos, encontrados = vieja.buscar(["a", "bb"])
+    assert encontrados.all()
+    np.testing.assert_array_equal(leidos, vectores(["a", "bb"]))
+    vieja.guardar(["ccc"], vectores(["ccc"]))  # No pisa lo que escribió la otra
+    assert CacheEmbeddings("modelo", DIM, ruta=tmp_path).buscar(["a", "bb", "ccc"])[1].all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.campanas import IndiceCampanas, componentes_lsh, firmas_minhash, rasgos_campanas
+
+CAMPANA = "compra ya el producto milagroso en nuestra tienda oficial, envío gratis hoy mismo"
+VARIANTES = [CAMPANA, CAMPANA + " !!", CAMPANA.replace("hoy mismo", "hoy"), CAMPANA.upper()]
+DISTINTOS = ["ayer fui al parque con mis hijos y estuvo muy bonito el día",
+             "alguien sabe a qué hora empieza el partido de esta noche en el estadio",
+             "la receta de la abuela lleva harina, huevos, leche y un poco de canela"]
+
+
+def posts():
+    return pd.DataFrame({
+        'user_id': ['b1', 'b2', 'b3', 'b4', 'b1', 'h1', 'h2', 'h3'],
+        'text': VARIANTES + [CAMPANA] + DISTINTOS,
+    })
+
+
+def test_minusculas_no_desalinean_el_bloque():
+    texto = DISTINTOS[0]
+    aislada = firmas_minhash([texto])[0]
+    # 'İ' pasa a 2 caracteres en minúsculas: los textos siguientes del bloque no deben moverse
+    np.testing.assert_array_equal(firmas_minhash(["İstanbul " * 5, texto])[1], aislada)
+    np.testing.assert_array_equal(firmas_minhash([texto.upper()])[0], aislada)
+
+
+def test_lsh_une_casi_duplicados():
+    etiquetas = componentes_lsh(firmas_minhash(VARIANTES + DISTINTOS))
+    assert len(set(etiquetas[:len(VARIANTES)])) == 1
+    assert len(set(etiquetas)) == 1 + len(DISTINTOS)
+
+
+@pytest.mark.parametrize('en_disco', [False, True])
+def test_indice_campanas(en_disco):
+    df = posts()
+    rasgos = IndiceCampanas(en_disco=en_disco).agregar(df['user_id'], df['text']).rasgos_por_usuario()
+    assert rasgos.loc[['b1', 'b2', 'b3', 'b4'], 'posts_campana'].tolist() == [5] * 4
+    assert rasgos.loc[['b1', 'b2', 'b3', 'b4'], 'cuentas_campana'].tolist() == [4] * 4
+    assert rasgos.loc[['h1', 'h2', 'h3'], 'posts_campana'].tolist() == [1] * 3
+    assert rasgos.loc[['h1', 'h2', 'h3'], 'cuentas_campana'].tolist() == [1] * 3
+
+
+def test_fusionar_igual_a_un_solo_indice():
+    df = posts()
+    a = IndiceCampanas(en_disco=True).agregar(df['user_id'][::2], df['text'][::2])
+    b = IndiceCampanas().agregar(df['user_id'][1::2], df['text'][1::2])
+    pd.testing.assert_frame_equal(a.fusionar(b).rasgos_por_usuario(), rasgos_campanas(df['user_id'], df['text']))
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from src.coordinacion import rasgos_coordinacion, referencia_coordinacion
+from src.model import cargar_modelo
+from src.pipeline import puntuar_dataframe
+from src.sintetico import generar_dataset
+
+
+def usuarios_parecidos():
+    """u0-u2 y r casi iguales, u3 distinto; todos activos el mismo día."""
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal(16)
+    X = np.vstack([base + 0.01 * rng.standard_normal(16) for _ in range(4)] + [rng.standard_normal(16)])
+    ids = np.array(['u0', 'u1', 'u2', 'r', 'u3'], dtype=object)
+    inicio = np.full(5, 1.7e9)
+    return X, ids, inicio, inicio + 3600
+
+
+def test_usuarios_de_la_carga_no_cuentan_dos_veces():
+    X, ids, inicio, fin = usuarios_parecidos()
+    carga = [0, 1, 2, 4]
+    referencia = referencia_coordinacion(X, inicio, fin, ids)
+    sin_ref, _ = rasgos_coordinacion(X[carga], inicio[carga], fin[carga])
+    con_ref, grafo = rasgos_coordinacion(X[carga], inicio[carga], fin[carga], referencia=referencia,
+                                         user_ids=ids[carga])
+    assert sin_ref['vecinos_coordinados'].tolist()[:3] == [2, 2, 2]
+    assert con_ref['vecinos_coordinados'].tolist()[:3] == [3, 3, 3]  # + r, sin copias de u0-u2
+    columnas_ref = grafo[:, len(carga):].tocoo().col
+    assert set(ids[columnas_ref]) == {'r'}
+
+
+def test_puntuar_entrenamiento_contra_su_artefacto(tmp_path):
+    df = generar_dataset(300, semilla=1)
+    ruta = str(tmp_path / 'modelo.joblib')
+    entrenado = puntuar_dataframe(df, backend='hash-svd', ruta_guardar_modelo=ruta)
+    puntuado = puntuar_dataframe(df, modelo=cargar_modelo(ruta))
+    columnas = ['user_id', 'vecinos_coordinados', 'similitud_vecinos', 'risk_score', 'es_bot']
+    pd.testing.assert_frame_equal(puntuado[columnas].reset_index(drop=True),
+                                  entrenado[columnas].reset_index(drop=True))
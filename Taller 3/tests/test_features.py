@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.features import parsear_tiempos, procesar_datos
+from src.preprocess import limpiar_texto
+
+COLUMNAS_ORIGINALES = ['user_id', 'num_posts', 'intervalo_medio', 'frecuencia_diaria', 'nocturnidad',
+                       'avg_likes', 'avg_replies', 'ttr', 'tasa_repeticion', 'longitud_promedio']
+
+
+def procesar_referencia(df_input):
+    """El procesar_datos original: un groupby por usuario con bucles de Python."""
+    df = df_input.copy()
+    df['text_limpio'] = df['text'].apply(limpiar_texto)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    metricas, posts = [], []
+    for user_id, grupo in df.groupby('user_id'):
+        tiempos = grupo['timestamp'].sort_values()
+        if len(tiempos) > 1:
+            intervalo = (tiempos.diff().dt.total_seconds().dropna() / 60).mean()
+            rango_dias = (tiempos.max() - tiempos.min()).days
+            frecuencia = len(tiempos) / (rango_dias if rango_dias > 0 else 1)
+        else:
+            intervalo, frecuencia = 0, 1
+        horas = tiempos.dt.hour
+        textos = grupo['text_limpio'].tolist()
+        tokens = " ".join(textos).split()
+        metricas.append({
+            'user_id': user_id,
+            'num_posts': len(grupo),
+            'intervalo_medio': intervalo,
+            'frecuencia_diaria': frecuencia,
+            'nocturnidad': ((horas >= 0) & (horas < 6)).sum() / len(tiempos),
+            'avg_likes': grupo['likes'].mean(),
+            'avg_replies': grupo['replies'].mean(),
+            'ttr': len(set(tokens)) / len(tokens) if tokens else 0,
+            'tasa_repeticion': (len(textos) - len(set(textos))) / len(textos) if len(textos) >= 2 else 0,
+            'longitud_promedio': np.mean([len(t.split()) for t in textos]),
+        })
+        posts.extend({'user_id': user_id, 'texto_original': o, 'texto_limpio': l}
+                     for o, l in zip(grupo['text'], grupo['text_limpio']))
+    return pd.DataFrame(metricas).fillna(0), pd.DataFrame(posts)
+
+
+def casos_borde():
+    return pd.DataFrame({
+        'user_id': ['a', 'a', 'a', 'b', 'c', 'c', 'd', 'd', 'e', 'e', 'e', 'f'],
+        'text': ['hola mundo', 'hola mundo', '', 'un único post', '😀😀', '🔥 🔥', None, 'texto',
+                 'mira http://x.co @alguien', 'igual', 'igual', '   '],
+        'timestamp': ['2024-01-01 03:00', '2024-01-01 03:05', '2024-01-03 12:00', '2024-02-01 10:00',
+                      None, 'no es fecha', '2024-01-01 05:59', '2024-01-01 06:00',
+                      '2024-03-01 00:00', None, '2024-03-05 23:59', None],
+        'likes': [1, 2, np.nan, 0, 5, np.nan, 1, 1, 0, 0, 3, np.nan],
+        'replies': [0, np.nan, 1, 0, 0, 0, np.nan, np.nan, 2, 0, 1, 4],
+    })
+
+
+def dataset_aleatorio(n=2000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    textos = np.array(["hola", "hola mundo", "", "😀", "compra ya http://spam.co", "@u gracias", "ok ok"], dtype=object)
+    tiempos = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s')
+    tiempos = pd.Series(tiempos.astype(str), dtype=object)
+    tiempos[rng.random(n) < 0.05] = None
+    return pd.DataFrame({
+        'user_id': [f"u{i}" for i in rng.integers(0, 300, n)],
+        'text': rng.choice(textos, n),
+        'timestamp': tiempos,
+        'likes': np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 50, n)),
+        'replies': rng.integers(0, 5, n),
+    })
+
+
+@pytest.mark.parametrize('df', [casos_borde(), dataset_aleatorio()], ids=['bordes', 'aleatorio'])
+def test_procesar_datos_igual_a_referencia(df):
+    df_users, df_posts = procesar_datos(df)
+    ref_users, ref_posts = procesar_referencia(df)
+    pd.testing.assert_frame_equal(df_users[COLUMNAS_ORIGINALES].reset_index(drop=True),
+                                  ref_users[COLUMNAS_ORIGINALES], check_dtype=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(df_posts.reset_index(drop=True), ref_posts, check_dtype=False)
+
+
+def test_procesar_datos_sin_filas():
+    df_users, df_posts = procesar_datos(casos_borde().iloc[:0])
+    assert len(df_users) == 0 and len(df_posts) == 0
+
+
+def test_parsear_tiempos_hora_local():
+    instantes, horas = parsear_tiempos(pd.Series(['2024-01-01T03:00:00+02:00', '2024-01-01T05:00:00Z',
+                                                  '2024-01-01T23:30:00-05:00', 'no es fecha', None]))
+    assert horas.tolist()[:3] == [3, 5, 23] and horas[3:].isna().all()
+    assert instantes.tolist()[:3] == [pd.Timestamp('2024-01-01 01:00'), pd.Timestamp('2024-01-01 05:00'),
+                                      pd.Timestamp('2024-01-02 04:30')]
+    instantes, horas = parsear_tiempos(pd.Series(['2024-01-01 03:00', '2024-01-01 07:00']))
+    assert horas.tolist() == [3, 7] and instantes[1] == pd.Timestamp('2024-01-01 07:00')
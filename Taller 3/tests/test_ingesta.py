@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import ingesta
+from src.embeddings import generar_embeddings
+from src.features import procesar_datos
+from src.ingesta import AcumuladorUsuarios, leer_csv_por_bloques, procesar_csv_por_bloques
+from src.sintetico import CodificadorSintetico, generar_dataset
+from src.textos import TextosUsuarios
+
+
+@pytest.fixture(scope='module')
+def ruta_csv(tmp_path_factory):
+    df = generar_dataset(300, semilla=2)
+    df.loc[df.sample(frac=0.05, random_state=0).index, 'timestamp'] = None
+    df.loc[df.sample(frac=0.05, random_state=1).index, 'likes'] = np.nan
+    ruta = tmp_path_factory.mktemp('ingesta') / 'posts.csv'
+    df.to_csv(ruta, index=False)
+    return str(ruta)
+
+
+@pytest.mark.parametrize('tam_bloque', [97, 10**6])
+def test_por_bloques_igual_a_batch(ruta_csv, tam_bloque):
+    modelo = CodificadorSintetico(dim=16)
+    df_users, df_posts = procesar_datos(pd.read_csv(ruta_csv))
+    por_bloques, X = procesar_csv_por_bloques(ruta_csv, tam_bloque, model=modelo)
+    pd.testing.assert_frame_equal(por_bloques, df_users, check_dtype=False, rtol=1e-9)
+    np.testing.assert_allclose(X, generar_embeddings(modelo, TextosUsuarios.desde_posts(df_users, df_posts)),
+                               rtol=1e-6, atol=1e-6)
+
+
+def test_fusionar_acumuladores(ruta_csv):
+    a, b = AcumuladorUsuarios(), AcumuladorUsuarios()
+    for i, bloque in enumerate(leer_csv_por_bloques(ruta_csv, 500)):
+        (a if i % 2 else b).actualizar(bloque)
+    completo, _ = procesar_csv_por_bloques(ruta_csv, 500)
+    pd.testing.assert_frame_equal(a.fusionar(b).resultado()[0], completo, check_dtype=False, rtol=1e-9)
+
+
+def test_distintos_acotados_por_usuario(monkeypatch):
+    monkeypatch.setattr(ingesta, 'K_DISTINTOS', 256)
+    tokens = [f"palabra{i}" for i in range(2_000)] * 2
+    bloque = pd.DataFrame({'user_id': 'u', 'text': [" ".join(tokens[i:i + 10]) for i in range(0, 4_000, 10)],
+                           'timestamp': '2024-01-01', 'likes': 0, 'replies': 0})
+    acumulador = AcumuladorUsuarios().actualizar(bloque)
+    assert len(acumulador._tokens['u'].hashes) == 256
+    ttr = acumulador.resultado()[0].loc[0, 'ttr']
+    assert ttr == pytest.approx(0.5, rel=0.2)  # Estimado por encima de K: ~1/sqrt(K) de error
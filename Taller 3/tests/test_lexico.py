@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.lexico import metricas_lexicas
+
+
+def ttr_referencia(textos):
+    tokens = " ".join(textos).split()
+    return len(set(tokens)) / len(tokens) if tokens else 0
+
+
+def repeticion_referencia(textos):
+    if len(textos) < 2:
+        return 0
+    return (len(textos) - len(set(textos))) / len(textos)
+
+
+def longitud_referencia(textos):
+    return np.mean([len(t.split()) for t in textos]) if textos else 0
+
+
+POSTS = [
+    (0, "hola hola mundo"), (0, "hola hola mundo"), (0, ""),   # repetido y vacío
+    (1, "único post"),                                          # un solo post
+    (2, ""), (2, ""),                                           # sólo textos vacíos
+    (3, "a b c"), (3, "c b a"), (3, "a  b   c"),                # mismos tokens, textos distintos
+    (5, "Mayúsculas mayúsculas MAYÚSCULAS"),                    # usuario 4 sin posts
+]
+
+
+def test_metricas_lexicas_igual_a_referencia():
+    codigos = [u for u, _ in POSTS]
+    textos = [t for _, t in POSTS]
+    df, matriz, vocabulario = metricas_lexicas(codigos, textos, 6)
+    assert matriz.shape == (6, len(vocabulario))
+    for u in range(6):
+        propios = [t for c, t in POSTS if c == u]
+        assert df.loc[u, 'ttr'] == pytest.approx(ttr_referencia(propios))
+        assert df.loc[u, 'tasa_repeticion'] == pytest.approx(repeticion_referencia(propios))
+        assert df.loc[u, 'longitud_promedio'] == pytest.approx(longitud_referencia(propios))
+
+
+def test_metricas_lexicas_aleatorias():
+    rng = np.random.default_rng(0)
+    palabras = np.array(["a", "b", "c", "de", "ñu", "😀"])
+    textos = [" ".join(rng.choice(palabras, rng.integers(0, 5))) for _ in range(500)]
+    codigos = rng.integers(0, 40, len(textos))
+    df, _, _ = metricas_lexicas(codigos, textos, 40)
+    por_usuario = pd.Series(textos).groupby(codigos).agg(list)
+    for u, propios in por_usuario.items():
+        assert df.loc[u, 'ttr'] == pytest.approx(ttr_referencia(propios))
+        assert df.loc[u, 'tasa_repeticion'] == pytest.approx(repeticion_referencia(propios))
+        assert df.loc[u, 'longitud_promedio'] == pytest.approx(longitud_referencia(propios))
@@ -0,0 +1,52 @@
+import re
+import unicodedata
+import emoji
+import numpy as np
+import pandas as pd
+import pytest
+import src.preprocess as preprocess
+from src.preprocess import limpiar_texto, limpiar_textos
+
+
+def limpiar_referencia(texto):
+    """limpiar_texto original (re.sub en cada llamada y emoji.replace_emoji sobre todo el texto)."""
+    if pd.isnull(texto):
+        return ""
+    texto = unicodedata.normalize("NFKC", str(texto))
+    texto = re.sub(r"http\S+|www\S+", "", texto)
+    texto = re.sub(r"@\w+", "", texto)
+    texto = emoji.replace_emoji(texto, replace="")
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+CASOS = [
+    "", "   ", None, np.nan, 12345, 3.5,
+    "Hola @usuario mira http://x.co/abc y www.ejemplo.com",
+    "😀😀😀", "🔥", "👨‍👩‍👧‍👦", "🇨🇱🇨🇱", "❤️", "texto😀pegado", "#️⃣ 1️⃣ ©",
+    "ﬁn de ＡＢＣ", "é", "tabs\tsaltos\nnbsp em fin",
+    "\x1c separador \x1f", "@@doble @ suelta", "ñandú ÁRBOL", "  espacios   múltiples  ",
+]
+
+
+@pytest.mark.parametrize('texto', CASOS)
+def test_limpiar_texto_igual_a_referencia(texto):
+    assert limpiar_texto(texto) == limpiar_referencia(texto)
+
+
+def test_limpiar_textos_series_conserva_indice_y_valores():
+    serie = pd.Series(CASOS * 3, index=np.arange(len(CASOS) * 3)[::-1], name='text', dtype=object)
+    limpios = limpiar_textos(serie)
+    assert isinstance(limpios, pd.Series)
+    assert limpios.index.equals(serie.index) and limpios.name == 'text'
+    assert limpios.tolist() == [limpiar_referencia(t) for t in serie]
+
+
+def test_limpiar_textos_array_y_vacio():
+    assert list(limpiar_textos(np.array(CASOS, dtype=object))) == [limpiar_referencia(t) for t in CASOS]
+    assert len(limpiar_textos(pd.Series([], dtype=object))) == 0
+
+
+def test_limpiar_textos_con_pool(monkeypatch):
+    monkeypatch.setattr(preprocess, 'MIN_TEXTOS_POOL', 10)
+    textos = [f"{t} {i}" if isinstance(t, str) else t for i, t in enumerate(CASOS * 4)]
+    assert list(limpiar_textos(textos, n_procesos=2)) == [limpiar_referencia(t) for t in textos]
@@ -0,0 +1,58 @@
+from src.recolector import Checkpoint, SalidaJSONL, YouTubeFalso, consolidar, recolectar
+
+VIDEOS = ['video_a', 'video_b']
+
+
+def recolectar_falso(api, tmp_path, **kwargs):
+    salida = SalidaJSONL(str(tmp_path / 'comentarios.jsonl'))
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    estados = recolectar(lambda: api, VIDEOS, salida, checkpoint, n_hilos=2, peticiones_por_s=1_000, **kwargs)
+    return estados, salida
+
+
+def test_reanuda_desde_el_checkpoint(tmp_path):
+    api = YouTubeFalso(comentarios_por_video=500)
+    estados, _ = recolectar_falso(api, tmp_path, max_paginas=2)
+    assert all(e['paginas'] == 2 and not e['terminado'] for e in estados.values())
+
+    estados, salida = recolectar_falso(api, tmp_path)  # Checkpoint releído del disco
+    assert all(e['terminado'] and e['comentarios'] == 500 and e['paginas'] == 5 for e in estados.values())
+    df = salida.leer()
+    assert len(df) == 1_000 and df['comment_id'].is_unique
+    assert api.peticiones == 10
+    assert recolectar_falso(api, tmp_path)[0] == estados and api.peticiones == 10  # Terminados: sin peticiones
+
+
+def test_reintenta_los_errores(tmp_path):
+    api = YouTubeFalso(comentarios_por_video=300, tasa_errores=0.4, semilla=3)
+    estados, salida = recolectar_falso(api, tmp_path, max_reintentos=20, espera_base=0)
+    assert all(e['terminado'] and e['error'] is None for e in estados.values())
+    assert api.peticiones > 6
+    assert len(consolidar(salida)) == 600
+
+
+def test_agota_los_reintentos(tmp_path):
+    api = YouTubeFalso(tasa_errores=1.0)
+    estados, _ = recolectar_falso(api, tmp_path, max_reintentos=2, espera_base=0)
+    for estado in estados.values():
+        assert not estado['terminado'] and estado['paginas'] == 0
+        assert estado['error'] == "ConnectionError: error simulado de la API"
+    assert api.peticiones == 2 * 3
+
+
+def test_consolidar_quita_paginas_repetidas(tmp_path):
+    api = YouTubeFalso(comentarios_por_video=200)
+    recolectar_falso(api, tmp_path, max_paginas=1)
+    (tmp_path / 'checkpoint.json').unlink()  # Corte tras añadir la página y antes del checkpoint
+    _, salida = recolectar_falso(api, tmp_path)
+    assert len(salida.leer()) == 600
+    df = consolidar(salida)
+    assert len(df) == 400 and df['comment_id'].is_unique
+    assert set(df['video_id']) == set(VIDEOS)
+
+
+def test_esquema_de_la_app(tmp_path):
+    _, salida = recolectar_falso(YouTubeFalso(comentarios_por_video=50), tmp_path)
+    df = consolidar(salida)
+    assert list(df.columns[:5]) == ['user_id', 'text', 'timestamp', 'likes', 'replies']
+    assert df['text'].notna().all() and (df['likes'] >= 0).all()
@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+from src.features import procesar_datos
+from src.model import cargar_modelo
+from src.pipeline import puntuar_dataframe
+from src.sintetico import generar_dataset
+from src.streaming import MonitorEnVivo, SeguidorJSONL
+
+
+def escribir(ruta, texto):
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(texto)
+
+
+def test_linea_mas_larga_que_una_lectura(tmp_path):
+    ruta = tmp_path / 'comentarios.jsonl'
+    largo = {'user_id': 'a', 'text': 'x' * 5_000}
+    escribir(ruta, json.dumps(largo) + '\n' + json.dumps({'user_id': 'b', 'text': 'hola'}) + '\n')
+    seguidor = SeguidorJSONL(str(ruta), desde_inicio=True)
+    assert seguidor.leer(max_bytes=64) == [largo]  # Se lee hasta su salto de línea, no se atasca
+    assert seguidor.leer(max_bytes=64) == [{'user_id': 'b', 'text': 'hola'}]
+
+    escribir(ruta, json.dumps(largo)[:-10])  # Línea a medio escribir: todavía no se consume
+    assert seguidor.leer(max_bytes=64) == []
+    escribir(ruta, json.dumps(largo)[-10:] + '\n')
+    assert seguidor.leer(max_bytes=64) == [largo]
+
+
+@pytest.fixture(scope='module')
+def monitor(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp('modelo') / 'modelo.joblib')
+    puntuar_dataframe(generar_dataset(200, semilla=3), backend='hash-svd', ruta_guardar_modelo=ruta)
+    modelo = cargar_modelo(ruta)
+    return MonitorEnVivo(modelo, modelo['codificador'])
+
+
+def test_nocturnidad_en_vivo_igual_que_batch(monitor):
+    # 07:00 y 23:00 locales (+02:00) son 05:00 y 21:00 UTC: la hora que cuenta es la local
+    df = pd.DataFrame({
+        'user_id': ['a', 'a', 'a', 'b'],
+        'text': ['hola', 'buenas', 'qué tal', 'adiós'],
+        'timestamp': ['2024-01-01T07:00:00+02:00', '2024-01-01T23:00:00+02:00', '2024-01-02T03:00:00+02:00',
+                      '2024-01-01T01:00:00+02:00'],
+        'likes': [0, 1, 2, 3],
+        'replies': [0, 0, 1, 0],
+    })
+    en_vivo = monitor.procesar(df.to_dict(orient='records')).set_index('user_id')
+    batch = procesar_datos(df)[0].set_index('user_id')
+    assert en_vivo.loc[['a', 'b'], 'nocturnidad'].tolist() == batch.loc[['a', 'b'], 'nocturnidad'].tolist()
+    assert batch.loc[['a', 'b'], 'nocturnidad'].tolist() == pytest.approx([1 / 3, 1])
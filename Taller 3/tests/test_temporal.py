@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import temporal
+from src.temporal import BORDES_INTERVALOS, COLUMNAS_TEMPORALES, VENTANAS_MIN, TiemposRecientes, rasgos_temporales
+
+
+def entropia(valores):
+    _, conteos = np.unique(valores, return_counts=True)
+    p = conteos / conteos.sum()
+    return float(-(p * np.log2(p)).sum()) if len(valores) else 0.0
+
+
+def rasgos_referencia(codigos, tiempos, n_usuarios):
+    """Los mismos rasgos con un bucle por usuario."""
+    ms = pd.to_datetime(pd.Series(tiempos)).values.astype('datetime64[ms]')
+    filas = []
+    for u in range(n_usuarios):
+        t = np.sort(ms[(codigos == u) & ~np.isnat(ms)].astype(np.int64))
+        fila = {f'max_posts_{m}min': max(((t >= ti) & (t < ti + m * 60_000)).sum() for ti in t) if len(t) else 0
+                for m in VENTANAS_MIN}
+        intervalos = np.diff(t) / 1000
+        media = intervalos.mean() if len(intervalos) else 0
+        fila['cv_intervalos'] = intervalos.std() / media if len(intervalos) > 1 and media > 0 else 0
+        fila['entropia_intervalos'] = entropia(np.searchsorted(BORDES_INTERVALOS, intervalos, side='right'))
+        fila['entropia_horas'] = entropia(t // 3_600_000 % 24)
+        filas.append(fila)
+    return pd.DataFrame(filas, columns=COLUMNAS_TEMPORALES, dtype=float)
+
+
+def posts_aleatorios(n=3_000, n_usuarios=60, semilla=0):
+    rng = np.random.default_rng(semilla)
+    codigos = rng.integers(0, n_usuarios - 3, n)
+    ms = 1_704_067_200_000 + rng.integers(0, 3 * 86_400, n) * 1000
+    rafaga = codigos % 7 == 0  # Algunos usuarios publican en ráfagas de segundos
+    ms[rafaga] = 1_704_067_200_000 + codigos[rafaga] * 60_000 + rng.integers(0, 90, rafaga.sum()) * 1000
+    tiempos = pd.Series(ms.astype('datetime64[ms]'))
+    tiempos[rng.random(n) < 0.05] = pd.NaT
+    # Usuario con un único comentario, usuario sólo con NaT y usuario sin posts
+    codigos = np.r_[codigos, n_usuarios - 3, n_usuarios - 2, n_usuarios - 2]
+    tiempos = pd.concat([tiempos, pd.Series(pd.to_datetime(['2024-01-02 03:00', None, None]))], ignore_index=True)
+    return codigos, tiempos, n_usuarios
+
+
+def test_rasgos_temporales_igual_a_bucle():
+    codigos, tiempos, n_usuarios = posts_aleatorios()
+    df = rasgos_temporales(codigos, tiempos, n_usuarios)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), rasgos_referencia(codigos, tiempos, n_usuarios),
+                                  check_dtype=False, rtol=1e-9, atol=1e-12)
+    assert (df.iloc[-2:] == 0).all().all()  # Sólo NaT / sin posts
+    assert df.loc[n_usuarios - 3, 'max_posts_1min'] == 1 and df.loc[n_usuarios - 3, 'cv_intervalos'] == 0
+
+
+def test_cadencia_de_reloj_tiene_cv_cero():
+    tiempos = pd.date_range('2024-01-01', periods=50, freq='15min')
+    df = rasgos_temporales(np.zeros(50), tiempos, 1)
+    assert df.loc[0, 'cv_intervalos'] == 0
+    assert df.loc[0, 'entropia_intervalos'] == 0
+
+
+@pytest.mark.parametrize('max_por_usuario', [1, 5, 10**6])
+def test_tiempos_recientes_conserva_los_ultimos(monkeypatch, max_por_usuario):
+    monkeypatch.setattr(temporal, 'MIN_COMPACTAR', 16)  # Compactar a menudo
+    rng = np.random.default_rng(1)
+    codigos, ms = rng.integers(0, 20, 2_000), rng.integers(0, 10**9, 2_000)
+    tiempos = TiemposRecientes(max_por_usuario)
+    for inicio in range(0, 2_000, 37):
+        tiempos.agregar(codigos[inicio:inicio + 37], ms[inicio:inicio + 37])
+
+    esperado = pd.DataFrame({'c': codigos, 'ms': ms}).sort_values(['c', 'ms'], kind='stable')
+    esperado = esperado.groupby('c').tail(max_por_usuario)
+    c, t = tiempos.arrays()
+    np.testing.assert_array_equal(c, esperado['c'].values)
+    np.testing.assert_array_equal(t, esperado['ms'].values)
+
+
+def test_fusionar_tiempos_recientes():
+    a = TiemposRecientes(3).agregar([0, 0, 1, 1], [10, 20, 30, 40])
+    b = TiemposRecientes(3).agregar([0, 0, 1], [5, 50, 60])  # Código 0 de b = 1 de a; 1 de b es nuevo
+    c, t = a.fusionar(b, mapa=[1, 2]).arrays()
+    np.testing.assert_array_equal(c, [0, 0, 1, 1, 1, 2])
+    np.testing.assert_array_equal(t, [10, 20, 30, 40, 50, 60])
@@ -0,0 +1,57 @@
+import argparse
+import time
+from src.model import cargar_modelo, cache_del_codificador
+from src.pipeline import obtener_codificador, UMBRAL_POR_DEFECTO
+from src.streaming import SeguidorJSONL, MonitorEnVivo, vigilar, MAX_USUARIOS, TTL_S, INTERVALO_S, N_TOP, TAM_LOTE
+
+# Scoring en vivo de comentarios nuevos contra un modelo ya entrenado:
+#   python puntuar_lote.py referencia.csv --guardar-modelo modelo.joblib
+#   python recolectar_youtube.py VIDEO1 -o comentarios.jsonl &        (escribe comentarios nuevos)
+#   python vigilar_comentarios.py comentarios.jsonl --modelo modelo.joblib
+#   python vigilar_comentarios.py carpeta_jsonl/ --modelo modelo.joblib --desde-inicio --hasta-agotar
+# La instantánea del Top Sospechosos (--top) la muestra la app en "Monitoreo en vivo";
+# las alertas (usuarios que cruzan el umbral) se añaden a --alertas.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sigue un JSON lines de comentarios y puntúa a sus autores en vivo.")
+    parser.add_argument('entrada', help="Archivo .jsonl o directorio con varios")
+    parser.add_argument('--modelo', required=True, help="Artefacto entrenado (puntuar_lote.py --guardar-modelo)")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_POR_DEFECTO)
+    parser.add_argument('--alertas', default='alertas.jsonl', help="Log de alertas (JSON lines, sólo añadir)")
+    parser.add_argument('--top', default='top_sospechosos.json', help="Instantánea del Top Sospechosos")
+    parser.add_argument('--n-top', type=int, default=N_TOP)
+    parser.add_argument('--max-usuarios', type=int, default=MAX_USUARIOS, help="Usuarios en estado como máximo (LRU)")
+    parser.add_argument('--ttl-min', type=float, default=TTL_S / 60, help="Minutos de inactividad antes de desalojar")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_S, help="Segundos entre lecturas sin datos")
+    parser.add_argument('--tam-lote', type=int, default=TAM_LOTE, help="Comentarios por micro-lote")
+    parser.add_argument('--desde-inicio', action='store_true', help="Procesar también lo ya escrito")
+    parser.add_argument('--hasta-agotar', action='store_true', help="Terminar cuando no queden líneas nuevas")
+    args = parser.parse_args(argv)
+
+    modelo = cargar_modelo(args.modelo)
+    backend = modelo['backend_embeddings']
+    codificador = obtener_codificador(backend, modelo)
+    monitor = MonitorEnVivo(modelo, codificador, umbral=args.umbral,
+                            max_usuarios=args.max_usuarios, ttl_s=args.ttl_min * 60,
+                            cache=cache_del_codificador(codificador, backend), ruta_alertas=args.alertas)
+    seguidor = SeguidorJSONL(args.entrada, desde_inicio=args.desde_inicio)
+
+    def informar(monitor, df_lote):
+        e = monitor.estadisticas()
+        nuevos = int(df_lote['es_bot'].sum()) if len(df_lote) else 0
+        print(f"[{time.strftime('%H:%M:%S')}] {e['comentarios']} comentarios | {e['usuarios_en_estado']} usuarios "
+              f"en estado | {e['alertas']} alertas (+{nuevos} sobre el umbral en el lote) | latencia p50 "
+              f"{e['latencia_p50_ms']} ms, p99 {e['latencia_p99_ms']} ms", flush=True)
+
+    print(f"Siguiendo {args.entrada} (backend {backend}, umbral {args.umbral}). Ctrl+C para terminar.")
+    try:
+        vigilar(seguidor, monitor, args.intervalo, args.top, args.n_top, args.tam_lote,
+                hasta_agotar=args.hasta_agotar, al_procesar=informar)
+    except KeyboardInterrupt:
+        pass
+    print(monitor.top_sospechosos(args.n_top).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()